@@ -1,6 +1,6 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks, Request, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 import os
 from dotenv import load_dotenv
@@ -8,11 +8,25 @@ import uvicorn
 from typing import List, Optional
 import tempfile
 import shutil
+import asyncio
+import hashlib
+import json
+import time
 
 from services.document_processor import DocumentProcessor
 from services.vector_store import VectorStore
 from services.gemini_service import GeminiService
-from models.chat_models import ChatRequest, ChatResponse, UploadResponse
+from services.session_store import SessionStore
+from services.extractive_answerer import ExtractiveAnswerer
+from services.summary_store import SummaryStore
+from services.ingest_pipeline import IngestPipeline
+from services.profiler import ProfilingMiddleware
+from services.priority_executor import get_shared_executor
+from services.embedding_migration import EmbeddingMigration
+from services.admission import AdmissionController, AdmissionRejected
+from services.single_flight import SingleFlight
+from services.replication import CorpusPublisher, ReplicaFollower
+from models.chat_models import ChatRequest, ChatResponse, UploadResponse, BatchChatRequest, EmbeddingMigrationRequest
 
 load_dotenv()
 
@@ -36,128 +50,550 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in per-request profiling of /chat and /upload (inactive unless PROFILE_ADMIN_TOKEN is set)
+app.add_middleware(ProfilingMiddleware)
+
 # Initialize services
 document_processor = DocumentProcessor()
 vector_store = VectorStore()
 gemini_service = GeminiService()
+session_store = SessionStore()
+extractive_answerer = ExtractiveAnswerer(vector_store)
+summary_store = SummaryStore()
+ingest_pipeline = IngestPipeline(document_processor, vector_store)
+embedding_migration = EmbeddingMigration(vector_store)
+admission = AdmissionController(get_shared_executor(), gemini_service.scheduler)
+chat_flights = SingleFlight()
+# Query replicas (REPLICA_MODE=true) follow the generations a single writer node publishes to PUBLISH_DIR
+replica = ReplicaFollower(vector_store, summary_store) if vector_store.read_only else None
+publisher = CorpusPublisher(vector_store, summary_store)
+
+NO_DOCUMENTS_RESPONSE = "I don't have any relevant information in the uploaded documents to answer your question. Please upload some documents first."
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize the vector database on startup"""
     await vector_store.initialize()
 
+    if replica is not None:
+        # Serve the current published generation before taking traffic, then keep following
+        try:
+            await replica.check()
+        except Exception as e:
+            replica.last_error = str(e)
+        replica.start()
+        return
+
+    # Warm start: seed an empty store from a snapshot instead of re-ingesting source files
+    snapshot_path = os.getenv("SNAPSHOT_IMPORT_PATH")
+    if snapshot_path:
+        stats = await vector_store.get_stats()
+        if stats["total_chunks"] == 0:
+            await vector_store.import_snapshot(snapshot_path)
+    publisher.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Persist in-memory index state before exiting"""
+    vector_store.close()
+
+def require_writer():
+    """Dependency of every mutating endpoint: query replicas refuse them"""
+    if vector_store.read_only:
+        raise HTTPException(status_code=403, detail="This node is a read-only query replica; send writes to the writer node")
+
+async def summarize_source(namespace: str, source: str, content_hash: str, chunks: List[dict]):
+    """Background task: generate and store the summary for one ingested source"""
+    try:
+        summary = await gemini_service.generate_summary(chunks, raise_errors=True)
+        summary_store.set_summary(namespace, source, content_hash, summary)
+    except Exception as e:
+        summary_store.set_summary(namespace, source, content_hash, f"Error generating summary: {str(e)}", failed=True)
+
 @app.get("/")
 async def root():
     return {"message": "Hero Vida RAG API is running!"}
 
-@app.post("/upload", response_model=UploadResponse)
-async def upload_files(files: List[UploadFile] = File(...)):
-    """Upload and process documents (PDF, CSV)"""
+@app.post("/upload", response_model=UploadResponse, dependencies=[Depends(require_writer)])
+async def upload_files(background_tasks: BackgroundTasks, files: List[UploadFile] = File(...),
+                       namespace: Optional[str] = Form(None)):
+    """Upload and process documents (PDF, CSV) into a namespace"""
     try:
+        namespace = vector_store.normalize_namespace(namespace)
         uploaded_files = []
         total_chunks = 0
+        deduplicated_chunks = 0
+        pending_files = []
         
-        for file in files:
-            # Validate file type
-            if not file.filename.lower().endswith(('.pdf', '.csv')):
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Unsupported file type: {file.filename}. Only PDF and CSV files are allowed."
-                )
-            
-            # Check file size
-            file_size = 0
-            content = await file.read()
-            file_size = len(content)
-            
-            max_size = int(os.getenv("MAX_FILE_SIZE", 10485760))  # 10MB default
-            if file_size > max_size:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"File {file.filename} is too large. Maximum size: {max_size/1024/1024:.1f}MB"
-                )
-            
-            # Save temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp_file:
-                tmp_file.write(content)
-                tmp_file_path = tmp_file.name
-            
-            try:
-                # Process document
-                chunks = await document_processor.process_document(tmp_file_path, file.filename)
+        try:
+            for file in files:
+                # Validate file type
+                if not file.filename.lower().endswith(('.pdf', '.csv')):
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Unsupported file type: {file.filename}. Only PDF and CSV files are allowed."
+                    )
                 
-                # Store in vector database
-                await vector_store.add_documents(chunks, file.filename)
+                # Check file size
+                file_size = 0
+                content = await file.read()
+                file_size = len(content)
                 
-                uploaded_files.append({
-                    "filename": file.filename,
-                    "size": file_size,
-                    "chunks": len(chunks)
-                })
-                total_chunks += len(chunks)
+                max_size = int(os.getenv("MAX_FILE_SIZE", 10485760))  # 10MB default
+                if file_size > max_size:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File {file.filename} is too large. Maximum size: {max_size/1024/1024:.1f}MB"
+                    )
                 
-            finally:
-                # Clean up temporary file
-                os.unlink(tmp_file_path)
+                # Save temporary file
+                with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp_file:
+                    tmp_file.write(content)
+                    pending_files.append({
+                        "filename": file.filename,
+                        "path": tmp_file.name,
+                        "size": file_size,
+                        "content_hash": hashlib.sha256(content).hexdigest()
+                    })
+            
+            # Parse, chunk, embed and store the files concurrently
+            results, pipeline_stats = await ingest_pipeline.run(pending_files, namespace)
+        finally:
+            # Clean up temporary files
+            for pending in pending_files:
+                os.unlink(pending["path"])
+        
+        failed = [result for result in results if "error" in result]
+        if failed and len(failed) == len(results):
+            # Nothing was written: report the error as before
+            raise failed[0]["error"]
+        
+        for result in results:
+            if "error" in result:
+                continue
+            chunks = result["chunks"]
+            
+            # Summarize the source after the response is sent (skipped if this version is already summarized)
+            if summary_store.mark_ingested(namespace, result["filename"], result["content_hash"]):
+                background_tasks.add_task(summarize_source, namespace, result["filename"], result["content_hash"], chunks)
+            
+            uploaded_files.append({
+                "filename": result["filename"],
+                "size": result["size"],
+                "chunks": len(chunks),
+                "duplicate_chunks": result["duplicates"]
+            })
+            total_chunks += len(chunks)
+            deduplicated_chunks += result["duplicates"]
         
+        message = f"Successfully processed {len(uploaded_files)} files"
+        if failed:
+            message += f", {len(failed)} failed"
         return UploadResponse(
-            message=f"Successfully processed {len(uploaded_files)} files",
+            message=message,
             files=uploaded_files,
-            total_chunks=total_chunks
+            failed=[{"filename": result["filename"], "error": str(result["error"])} for result in failed],
+            total_chunks=total_chunks,
+            namespace=namespace,
+            deduplicated_chunks=deduplicated_chunks,
+            pipeline=pipeline_stats
         )
     
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing files: {str(e)}")
 
+def summary_context(relevant_docs: List[dict]) -> List[dict]:
+    """Replace each source's chunks with its stored summary where one is ready"""
+    context_docs = []
+    summarized = set()
+    for doc in relevant_docs:
+        namespace = doc.get("namespace", "default")
+        key = (namespace, doc["source"])
+        if key in summarized:
+            continue
+        summary = summary_store.ready_summaries(namespace, [doc["source"]]).get(doc["source"])
+        if summary:
+            summarized.add(key)
+            context_docs.append({"content": f"Summary of {doc['source']}:\n{summary}", "source": doc["source"]})
+        else:
+            context_docs.append(doc)
+    return context_docs
+
+async def generate_answer(query: str, retrieval_query: str, namespaces: Optional[List[str]], mode: str,
+                          is_overview: bool, history: str) -> dict:
+    """Retrieve and answer one question; returns the ChatResponse fields other than session_id"""
+    relevant_docs, query_embedding = await vector_store.similarity_search_with_embedding(
+        retrieval_query, k=5, namespaces=namespaces
+    )
+    
+    if not relevant_docs:
+        return {"response": NO_DOCUMENTS_RESPONSE, "sources": [], "mode": mode}
+    
+    if mode == "extractive":
+        # Low-latency path: rank retrieved sentences against the query, no LLM call
+        answer = await extractive_answerer.answer(query_embedding, relevant_docs)
+        return {"response": answer["response"], "sources": answer["sources"], "mode": mode,
+                "passages": answer["passages"]}
+    
+    # Extract unique sources
+    sources = list(set([source for doc in relevant_docs for source in doc.get("sources", [doc["source"]])]))
+    
+    # Overview questions: use the retrieved sources' summaries as compact context
+    context_docs = relevant_docs
+    if is_overview:
+        context_docs = summary_context(relevant_docs)
+    
+    # Generate response using Gemini
+    answer = await gemini_service.answer(query, context_docs, history)
+    return {"response": answer["response"], "sources": sources, "mode": mode, "usage": answer["usage"]}
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    """Chat endpoint for RAG queries"""
+async def chat(request: ChatRequest, http_request: Request):
+    """Chat endpoint for RAG queries, behind admission control"""
     try:
-        # Retrieve relevant documents
-        relevant_docs = await vector_store.similarity_search(request.query, k=5)
-        
-        if not relevant_docs:
-            return ChatResponse(
-                response="I don't have any relevant information in the uploaded documents to answer your question. Please upload some documents first.",
-                sources=[]
-            )
+        ticket = admission.admit(admission.client_key(http_request), uses_llm=(request.mode or "rag") == "rag")
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail,
+                            headers={"Retry-After": str(e.retry_after)})
+    with ticket:
+        return await answer_chat(request)
+
+async def answer_chat(request: ChatRequest) -> ChatResponse:
+    """Answer one chat request"""
+    mode = request.mode or "rag"
+    if mode not in ("rag", "extractive"):
+        raise HTTPException(status_code=400, detail=f"Unsupported mode: {mode}. Use 'rag' or 'extractive'.")
+
+    try:
+        session_id = session_store.get_or_create(request.session_id)
+        namespaces = request.namespaces or ([request.namespace] if request.namespace else None)
+        is_overview = mode == "rag" and summary_store.is_overview_query(request.query)
         
-        # Generate response using Gemini
-        response_text = await gemini_service.generate_response(request.query, relevant_docs)
+        # Overview of named sources: serve their precomputed summaries directly
+        if is_overview and not request.namespaces:
+            namespace = vector_store.normalize_namespace(request.namespace)
+            mentioned = summary_store.mentioned_sources(namespace, request.query)
+            summaries = summary_store.ready_summaries(namespace, mentioned)
+            if mentioned and len(summaries) == len(mentioned):
+                response_text = "\n\n".join(f"**{source}**\n{summary}" for source, summary in summaries.items())
+                session_store.add_turn(session_id, request.query, response_text)
+                return ChatResponse(
+                    response=response_text,
+                    sources=list(summaries),
+                    session_id=session_id,
+                    mode="summary"
+                )
         
-        # Extract unique sources
-        sources = list(set([doc["source"] for doc in relevant_docs]))
+        # Retrieve relevant documents, resolving follow-ups against the conversation
+        retrieval_query = session_store.rewrite_query(session_id, request.query)
+        history = session_store.format_history(session_id)
         
-        return ChatResponse(
-            response=response_text,
-            sources=sources
+        # Identical concurrent questions (same text, filters, context and corpus) share one answer
+        flight_key = (
+            mode,
+            " ".join(request.query.lower().split()),
+            " ".join(retrieval_query.lower().split()),
+            tuple(sorted(set(namespaces or []))),
+            hashlib.sha1(history.encode()).hexdigest() if history else "",
+            vector_store.generation,
         )
+        answer = await chat_flights.run(flight_key, lambda: generate_answer(
+            request.query, retrieval_query, namespaces, mode, is_overview, history
+        ))
+        
+        if answer["response"] != NO_DOCUMENTS_RESPONSE:
+            session_store.add_turn(session_id, request.query, answer["response"])
+        return ChatResponse(session_id=session_id, **answer)
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating response: {str(e)}")
 
+@app.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest, http_request: Request):
+    """Answer a list of queries, streaming one NDJSON line per query as it completes.
+
+    All queries are embedded and searched in one batched pass; LLM calls then run
+    with bounded concurrency. The last line is a summary with overall timings.
+    Batches pass admission control at the door (one quota token per query) and
+    share a few in-flight slots, so they cannot crowd out interactive /chat.
+    """
+    max_queries = int(os.getenv("BATCH_MAX_QUERIES", 500))
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="No queries provided")
+    if len(request.queries) > max_queries:
+        raise HTTPException(status_code=400, detail=f"Too many queries: {len(request.queries)}. Maximum: {max_queries}")
+    try:
+        admission.admit_batch(admission.client_key(http_request), len(request.queries))
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail,
+                            headers={"Retry-After": str(e.retry_after)})
+
+    concurrency = request.max_concurrency or int(os.getenv("BATCH_LLM_CONCURRENCY", 4))
+    namespaces = request.namespaces or ([request.namespace] if request.namespace else None)
+
+    batch_start = time.perf_counter()
+    try:
+        all_docs = await vector_store.similarity_search_batch(request.queries, k=request.k, namespaces=namespaces)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching documents: {str(e)}")
+    retrieval_ms = (time.perf_counter() - batch_start) * 1000
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def answer(index: int, query: str, relevant_docs):
+        start = time.perf_counter()
+        result = {"index": index, "query": query}
+        try:
+            if not relevant_docs:
+                result.update(response=NO_DOCUMENTS_RESPONSE, sources=[])
+            else:
+                async with semaphore, admission.batch_slot():
+                    queued_ms = (time.perf_counter() - start) * 1000
+                    generation_start = time.perf_counter()
+                    answer = await gemini_service.answer(query, relevant_docs)
+                result.update(
+                    response=answer["response"],
+                    usage=answer["usage"],
+                    sources=list(set([source for doc in relevant_docs
+                                      for source in doc.get("sources", [doc["source"]])])),
+                )
+                result["timings"] = {
+                    "queued_ms": queued_ms,
+                    "generation_ms": (time.perf_counter() - generation_start) * 1000,
+                }
+        except Exception as e:
+            result["error"] = f"Error generating response: {str(e)}"
+        timings = result.setdefault("timings", {})
+        timings["retrieval_amortized_ms"] = retrieval_ms / len(request.queries)
+        timings["total_ms"] = (time.perf_counter() - batch_start) * 1000
+        return result
+
+    async def stream():
+        tasks = [
+            asyncio.create_task(answer(i, query, docs))
+            for i, (query, docs) in enumerate(zip(request.queries, all_docs))
+        ]
+        errors = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                errors += 1 if "error" in result else 0
+                yield json.dumps(result) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+        yield json.dumps({"summary": {
+            "queries": len(request.queries),
+            "errors": errors,
+            "retrieval_ms": retrieval_ms,
+            "total_ms": (time.perf_counter() - batch_start) * 1000,
+        }}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.get("/sessions/stats")
+async def session_stats():
+    """Get conversation memory counts and limits"""
+    return session_store.get_stats()
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """Get the stored conversation memory for a session"""
+    session = session_store.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found or expired")
+    return session
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Forget a conversation"""
+    if not session_store.delete(session_id):
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    return {"message": f"Session {session_id} deleted"}
+
+@app.get("/executor/stats")
+async def executor_stats():
+    """Shared executor load per priority class: running, queued and queue-wait latency"""
+    return get_shared_executor().get_stats()
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """LLM scheduler counters (retries, hedges, breaker, latency) and token usage with prompt-size histograms"""
+    return {**gemini_service.scheduler.get_stats(), "background": gemini_service.background_scheduler.get_stats(),
+            "tokens": gemini_service.accounting.get_stats()}
+
+@app.get("/chat/coalescing")
+async def chat_coalescing_stats():
+    """Single-flight counters: chat calls, computations actually run, and calls saved by sharing one"""
+    return chat_flights.get_stats()
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """Admission control counters: in-flight requests, rejections and estimated LLM queue wait"""
+    return admission.get_stats()
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (never waits on the executors, so it answers under overload)"""
     return {"status": "healthy", "service": "Hero Vida RAG API"}
 
 @app.get("/stats")
-async def get_stats():
-    """Get database statistics"""
+async def get_stats(namespace: Optional[str] = None):
+    """Get database statistics for a namespace"""
     try:
-        stats = await vector_store.get_stats()
+        stats = await vector_store.get_stats(namespace)
         return stats
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting stats: {str(e)}")
 
-@app.delete("/clear")
-async def clear_database():
-    """Clear all documents from the vector database"""
+@app.get("/documents")
+async def list_documents(namespace: Optional[str] = None, prefix: Optional[str] = None,
+                         doc_type: Optional[str] = Query(None, alias="type"), sort: str = "name",
+                         order: str = "asc", cursor: Optional[str] = None, limit: Optional[int] = None,
+                         format: str = "json"):
+    """List a namespace's documents from the catalog: filter by name prefix or type, sort by name, size or ingest time.
+
+    JSON responses hold one page (`limit`, default 100) and a `next_cursor`
+    to pass back for the next one. With format=ndjson every matching
+    document (or the first `limit`) is streamed one line each, page by page,
+    and the last line is a summary with the cursor to resume from.
+    """
+    max_page = int(os.getenv("DOCUMENTS_MAX_PAGE_SIZE", 1000))
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}. Use 'json' or 'ndjson'.")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    page_size = min(limit or 100, max_page) if format == "json" else min(limit or max_page, max_page)
+    try:
+        page = await vector_store.list_documents(namespace, sort, order, prefix, doc_type, cursor, page_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listing documents: {str(e)}")
+    if format == "json":
+        return page
+
+    async def stream():
+        current = page
+        sent = 0
+        while True:
+            for document in current["documents"]:
+                yield json.dumps(document, ensure_ascii=False) + "\n"
+            sent += len(current["documents"])
+            remaining = limit - sent if limit is not None else max_page
+            if current["next_cursor"] is None or remaining <= 0:
+                break
+            current = await vector_store.list_documents(namespace, sort, order, prefix, doc_type,
+                                                        current["next_cursor"], min(remaining, max_page))
+        yield json.dumps({"summary": {
+            "namespace": current["namespace"],
+            "documents": sent,
+            "total": current["total"],
+            "next_cursor": current["next_cursor"],
+        }}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.get("/documents/{source:path}/summary")
+async def get_document_summary(source: str, namespace: Optional[str] = None):
+    """Get the precomputed summary of one uploaded source"""
+    try:
+        namespace = vector_store.normalize_namespace(namespace)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    record = summary_store.get(namespace, source)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"No summary for {source} in namespace '{namespace}'")
+    if record["status"] == "pending":
+        return JSONResponse(status_code=202, content=record)
+    return record
+
+@app.get("/namespaces")
+async def list_namespaces():
+    """List namespaces that hold documents"""
+    try:
+        return {"namespaces": await vector_store.list_namespaces()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listing namespaces: {str(e)}")
+
+@app.get("/embeddings")
+async def get_embeddings():
+    """Active/previous embedding model, the model behind each collection and migration progress"""
+    registry = vector_store.registry.to_dict()
+    return {
+        "active_model": vector_store.embedding_model_name,
+        "previous_model": registry["previous_model"],
+        "collections": registry["collections"],
+        "migration": embedding_migration.get_status(),
+    }
+
+@app.post("/embeddings/migrate", status_code=202, dependencies=[Depends(require_writer)])
+async def migrate_embeddings(request: EmbeddingMigrationRequest):
+    """Re-embed every namespace with another model in the background, then switch to it"""
+    try:
+        return embedding_migration.start(request.model, request.chunks_per_second, request.batch_size)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/embeddings/rollback", status_code=202, dependencies=[Depends(require_writer)])
+async def rollback_embeddings():
+    """Switch back to the previous model; only changes made since the switch are re-embedded"""
+    previous_model = vector_store.registry.previous_model
+    if not previous_model:
+        raise HTTPException(status_code=400, detail="No previous embedding model to roll back to")
+    try:
+        return embedding_migration.start(previous_model)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.delete("/embeddings/migrate", dependencies=[Depends(require_writer)])
+async def cancel_embedding_migration():
+    """Stop a running migration; the active model stays unchanged"""
+    try:
+        return embedding_migration.cancel()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/replication")
+async def replication_status():
+    """This node's role and the corpus generation it serves (replica) or last published (writer)"""
+    status = replica.get_status() if replica is not None else publisher.get_status()
+    return {**status, "read_only": vector_store.read_only, "generation": vector_store.generation}
+
+@app.post("/replication/publish", dependencies=[Depends(require_writer)])
+async def publish_generation(force: bool = False):
+    """Publish the corpus as a new generation for query replicas (skipped if unchanged unless forced)"""
+    try:
+        return await publisher.publish(force)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error publishing generation: {str(e)}")
+
+@app.delete("/clear", dependencies=[Depends(require_writer)])
+async def clear_database(namespace: Optional[str] = None):
+    """Clear all documents from one namespace of the vector database"""
     try:
-        await vector_store.clear_database()
-        return {"message": "Database cleared successfully"}
+        namespace = vector_store.normalize_namespace(namespace)
+        await vector_store.clear_database(namespace)
+        summary_store.delete(namespace)
+        return {"message": f"Namespace '{namespace}' cleared successfully"}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error clearing database: {str(e)}")
 
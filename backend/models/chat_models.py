@@ -1,14 +1,38 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 
 class ChatRequest(BaseModel):
     query: str
     session_id: Optional[str] = None
+    # Namespace (tenant/workspace) to search; `namespaces` fans out across several, "*" for all
+    namespace: Optional[str] = None
+    namespaces: Optional[List[str]] = None
+    # "rag" (default) answers with Gemini; "extractive" returns top-ranked sentences without an LLM call
+    mode: Optional[str] = None
+
+class BatchChatRequest(BaseModel):
+    queries: List[str]
+    namespace: Optional[str] = None
+    namespaces: Optional[List[str]] = None
+    # Bounded so one caller can't ask for huge retrievals or unlimited LLM fan-out
+    k: int = Field(5, ge=1, le=50)
+    max_concurrency: Optional[int] = Field(None, ge=1, le=32)
 
 class ChatResponse(BaseModel):
     response: str
     sources: List[str]
     session_id: Optional[str] = None
+    mode: Optional[str] = None
+    passages: Optional[List[Dict[str, Any]]] = None
+    # Prompt/completion tokens of the LLM call and what the prompt cap trimmed (LLM answers only)
+    usage: Optional[Dict[str, Any]] = None
+
+class EmbeddingMigrationRequest(BaseModel):
+    # sentence-transformers model to re-embed every namespace with
+    model: str
+    # Throttle and batch size; defaults come from MIGRATION_CHUNKS_PER_SECOND / MIGRATION_BATCH_SIZE
+    chunks_per_second: Optional[float] = None
+    batch_size: Optional[int] = None
 
 class DocumentChunk(BaseModel):
     content: str
@@ -19,11 +43,20 @@ class UploadedFile(BaseModel):
     filename: str
     size: int
     chunks: int
+    duplicate_chunks: int = 0
+
+class FailedUpload(BaseModel):
+    filename: str
+    error: str
 
 class UploadResponse(BaseModel):
     message: str
     files: List[UploadedFile]
+    failed: List[FailedUpload] = []
     total_chunks: int
+    namespace: Optional[str] = None
+    deduplicated_chunks: int = 0
+    pipeline: Optional[Dict[str, Any]] = None
 
 class DatabaseStats(BaseModel):
     total_documents: int
@@ -0,0 +1,204 @@
+import os
+import math
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from collections import OrderedDict
+from typing import Dict, Any, Tuple
+
+
+class AdmissionRejected(Exception):
+    """A request turned away before doing any work; maps to 429/503 with Retry-After"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        # Whole seconds, at least 1, as Retry-After requires
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    """`rate` requests per second on average, bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, cost: float = 1) -> Tuple[bool, float]:
+        """Spend `cost` tokens; returns (allowed, seconds until a token is available).
+
+        Allowed while at least one token is left, so a batch costing more than
+        the burst still runs, leaving the balance negative for the client to wait off.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= cost
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+
+class AdmissionTicket:
+    """Holds an in-flight slot until the request finishes"""
+
+    def __init__(self, controller: "AdmissionController"):
+        self.controller = controller
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.controller._release()
+        return False
+
+
+class AdmissionController:
+    """Decides at the door whether a /chat request is served, so overload fails fast.
+
+    In order, a request is rejected with:
+    - 503 when ADMISSION_MAX_IN_FLIGHT chat requests are already being served;
+    - 503 when it needs the LLM and the estimated wait for an LLM worker
+      (queued LLM tasks / LLM concurrency x median LLM latency) exceeds
+      ADMISSION_MAX_QUEUE_WAIT_MS, so extractive requests still get through;
+    - 429 when its client has used up its token bucket
+      (ADMISSION_CLIENT_RATE per second, bursts of ADMISSION_CLIENT_BURST;
+      a rate of 0 turns quotas off).
+
+    Every rejection carries Retry-After. Clients are identified by the
+    ADMISSION_CLIENT_HEADER header, falling back to the peer address.
+
+    /chat/batch passes the same checks once at the door (`admit_batch`),
+    charging the client's bucket one token per query. Its queries then
+    each hold an in-flight slot while answered (`batch_slot`), and at most
+    ADMISSION_BATCH_MAX_IN_FLIGHT of them (default: the LLM concurrency)
+    run at once across all batches. So batches wait for each other instead
+    of filling the LLM queue and getting interactive /chat shed.
+    """
+
+    def __init__(self, executor, llm_scheduler):
+        self.executor = executor
+        self.llm_scheduler = llm_scheduler
+        self.max_in_flight = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 64))
+        self.max_queue_wait = float(os.getenv("ADMISSION_MAX_QUEUE_WAIT_MS", 10000)) / 1000
+        self.client_rate = float(os.getenv("ADMISSION_CLIENT_RATE", 2))
+        self.client_burst = float(os.getenv("ADMISSION_CLIENT_BURST", 10))
+        self.client_header = os.getenv("ADMISSION_CLIENT_HEADER", "X-Client-Id").lower()
+        self.max_clients = int(os.getenv("ADMISSION_MAX_CLIENTS", 10000))
+        self.batch_max_in_flight = int(os.getenv("ADMISSION_BATCH_MAX_IN_FLIGHT", executor.classes["llm"].limit))
+        self.batch_slots = asyncio.Semaphore(max(1, self.batch_max_in_flight))
+        self.batch_in_flight = 0
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.stats = {
+            "admitted": 0,
+            "rejected_in_flight": 0,
+            "rejected_queue_wait": 0,
+            "rejected_quota": 0,
+            "peak_in_flight": 0,
+            "batches_admitted": 0,
+            "batch_queries": 0,
+        }
+
+    def client_key(self, request) -> str:
+        value = request.headers.get(self.client_header)
+        if value:
+            return f"id:{value}"
+        return f"ip:{request.client.host if request.client else 'unknown'}"
+
+    def estimated_queue_wait(self) -> float:
+        """Seconds a new LLM call would wait for a worker, from queue length and median latency"""
+        llm = self.executor.classes["llm"]
+        queued = len(llm.queue)
+        if not queued:
+            return 0.0
+        median = self.llm_scheduler.latency.percentile(50)
+        if median is None:
+            return 0.0
+        return queued / llm.limit * median
+
+    def _bucket(self, client: str) -> TokenBucket:
+        bucket = self.buckets.get(client)
+        if bucket is None:
+            bucket = self.buckets[client] = TokenBucket(self.client_rate, self.client_burst)
+            # Forget the least recently seen clients; a returning one starts with a full bucket
+            while len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client)
+        return bucket
+
+    def _check(self, client: str, uses_llm: bool, cost: float = 1):
+        """Raise AdmissionRejected unless a request costing `cost` quota tokens may start; call under lock"""
+        if self.in_flight >= self.max_in_flight:
+            self.stats["rejected_in_flight"] += 1
+            median = self.llm_scheduler.latency.percentile(50) or 1.0
+            raise AdmissionRejected(503, "Server is at capacity, please retry shortly", median)
+        if uses_llm:
+            wait = self.estimated_queue_wait()
+            if wait > self.max_queue_wait:
+                self.stats["rejected_queue_wait"] += 1
+                raise AdmissionRejected(
+                    503, f"Answer generation is backlogged (~{wait:.0f}s), please retry shortly",
+                    wait - self.max_queue_wait
+                )
+        if self.client_rate > 0:
+            allowed, retry_after = self._bucket(client).take(cost)
+            if not allowed:
+                self.stats["rejected_quota"] += 1
+                raise AdmissionRejected(429, "Rate limit exceeded for this client", retry_after)
+
+    def admit(self, client: str, uses_llm: bool = True) -> AdmissionTicket:
+        """Reserve an in-flight slot or raise AdmissionRejected"""
+        with self.lock:
+            self._check(client, uses_llm)
+            self._acquire()
+            self.stats["admitted"] += 1
+        return AdmissionTicket(self)
+
+    def admit_batch(self, client: str, queries: int):
+        """Let a batch of `queries` in or raise AdmissionRejected; its queries then run under `batch_slot`"""
+        with self.lock:
+            self._check(client, uses_llm=True, cost=queries)
+            self.stats["batches_admitted"] += 1
+            self.stats["batch_queries"] += queries
+
+    @asynccontextmanager
+    async def batch_slot(self):
+        """Wait for one of the batch slots, holding an in-flight slot while a batch query is answered"""
+        async with self.batch_slots:
+            with self.lock:
+                self._acquire()
+                self.batch_in_flight += 1
+            try:
+                yield
+            finally:
+                with self.lock:
+                    self.batch_in_flight -= 1
+                self._release()
+
+    def _acquire(self):
+        self.in_flight += 1
+        self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.in_flight)
+
+    def _release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                **self.stats,
+                "in_flight": self.in_flight,
+                "batch_in_flight": self.batch_in_flight,
+                "batch_max_in_flight": self.batch_max_in_flight,
+                "max_in_flight": self.max_in_flight,
+                "estimated_queue_wait_ms": round(self.estimated_queue_wait() * 1000, 1),
+                "max_queue_wait_ms": self.max_queue_wait * 1000,
+                "clients": len(self.buckets),
+            }
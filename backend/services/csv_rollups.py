@@ -0,0 +1,127 @@
+import os
+import re
+import pandas as pd
+from typing import List, Dict, Any, Tuple
+
+
+def _format_number(value: float) -> str:
+    if pd.isna(value):
+        return "n/a"
+    if float(value).is_integer():
+        return f"{int(value):,}"
+    return f"{value:,.2f}"
+
+
+ID_COLUMN = re.compile(r"(^|[_\s])id$", re.IGNORECASE)
+
+
+def _is_identifier(column: str, values: pd.Series) -> bool:
+    """Row ids (an `id` column, or consecutive distinct integers) are not worth summing"""
+    if ID_COLUMN.search(str(column)):
+        return True
+    return (len(values) > 2 and (values % 1 == 0).all() and values.is_unique
+            and values.max() - values.min() == len(values) - 1)
+
+
+def detect_rollup_columns(df: pd.DataFrame, max_groups: int) -> Tuple[pd.DataFrame, List[str], List[str]]:
+    """Find the rows and columns worth aggregating: (numeric rows, dimension columns, measure columns).
+
+    Measures are columns that are mostly numeric. Only rows where every one
+    of them is a number are kept, which drops the free-form tables some
+    exports append below the main one. Integer columns holding years
+    (1900-2100) are dimensions rather than measures, and row ids are
+    neither. Other dimensions are columns with between 2 and `max_groups`
+    distinct values, but fewer distinct values than rows, so row labels and
+    free text are skipped.
+    """
+    numeric = {}
+    for column in df.columns:
+        values = df[column].dropna()
+        if values.empty:
+            continue
+        parsed = pd.to_numeric(values, errors="coerce")
+        if parsed.notna().mean() >= 0.5:
+            numeric[column] = pd.to_numeric(df[column], errors="coerce")
+    if not numeric:
+        return df.iloc[0:0], [], []
+
+    valid = pd.concat(numeric.values(), axis=1).notna().all(axis=1)
+    rows = df[valid].copy()
+    measures = []
+    identifiers = []
+    for column, values in numeric.items():
+        values = values[valid]
+        rows[column] = values
+        if len(values) and (values % 1 == 0).all() and values.between(1900, 2100).all():
+            rows[column] = values.astype(int)
+        elif _is_identifier(column, values):
+            identifiers.append(column)
+        else:
+            measures.append(column)
+
+    dimensions = [
+        column for column in df.columns
+        if column not in measures and column not in identifiers
+        and 2 <= rows[column].nunique() <= max_groups
+        and rows[column].nunique() < len(rows)
+    ]
+    return rows, dimensions, measures
+
+
+def build_rollups(df: pd.DataFrame, filename: str, max_chars: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """Aggregate chunks for a CSV: overall totals, plus totals per value of each dimension column.
+
+    Each rollup is one group-by over the numeric rows, summing and averaging
+    every measure, so an aggregate question ("revenue by region") can be
+    answered from a single retrieved chunk. Rollups longer than `max_chars`
+    are continued in further chunks that repeat the heading. Returns
+    (text, metadata) pairs; metadata tags the rollup's dimension and measures.
+    """
+    max_groups = int(os.getenv("CSV_ROLLUP_MAX_GROUPS", 20))
+    rows, dimensions, measures = detect_rollup_columns(df, max_groups)
+    if len(rows) < 2 or not measures:
+        return []
+
+    rollups = []
+    overall = rows[measures].agg(["sum", "mean", "min", "max"])
+    lines = [
+        f"- {measure}: total {_format_number(overall.at['sum', measure])}, "
+        f"average {_format_number(overall.at['mean', measure])}, "
+        f"min {_format_number(overall.at['min', measure])}, max {_format_number(overall.at['max', measure])}"
+        for measure in measures
+    ]
+    rollups.append((f"Rollup: overall totals of {', '.join(measures)} from {filename} ({len(rows)} rows)",
+                    lines, "all"))
+
+    for dimension in dimensions:
+        grouped = rows.groupby(dimension, sort=True)[measures].agg(["sum", "mean"])
+        counts = rows.groupby(dimension, sort=True).size()
+        lines = []
+        for group, values in grouped.iterrows():
+            parts = [
+                f"{measure} total {_format_number(values[(measure, 'sum')])} "
+                f"(avg {_format_number(values[(measure, 'mean')])})"
+                for measure in measures
+            ]
+            rows_label = "1 row" if counts[group] == 1 else f"{counts[group]} rows"
+            lines.append(f"- {dimension} = {group} ({rows_label}): " + "; ".join(parts))
+        rollups.append((f"Rollup: {', '.join(measures)} by {dimension} from {filename}", lines, dimension))
+
+    chunks = []
+    for heading, lines, dimension in rollups:
+        parts = [[]]
+        size = len(heading)
+        for line in lines:
+            if parts[-1] and size + len(line) + 1 > max_chars:
+                parts.append([])
+                size = len(heading) + len(" (continued)")
+            parts[-1].append(line)
+            size += len(line) + 1
+        for index, part in enumerate(parts):
+            text = heading + (" (continued)" if index else "") + ":\n" + "\n".join(part)
+            chunks.append((text, {
+                "rollup_dimension": dimension,
+                "rollup_measures": ", ".join(measures),
+                "rollup_rows": len(rows),
+            }))
+    return chunks
@@ -0,0 +1,325 @@
+import os
+import re
+import json
+import zlib
+import base64
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+# Shingle hashes and permutations live below this prime, so a*x + b fits in 64 bits
+HASH_PRIME = (1 << 31) - 1
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def chunk_sources(metadata: Dict[str, Any]) -> List[str]:
+    """Every source file a stored chunk was seen in, first one first"""
+    if metadata.get("sources"):
+        return json.loads(metadata["sources"])
+    return [metadata["source"]] if "source" in metadata else []
+
+
+def with_sources(metadata: Dict[str, Any], sources: List[str]) -> Dict[str, Any]:
+    """Copy of a chunk's metadata listing `sources` (the first becomes its `source`).
+
+    Chroma metadata values must be scalars, so the list is stored as JSON, with
+    `source_count` alongside it to find shared chunks with a `where` filter.
+    """
+    metadata = dict(metadata)
+    metadata["source"] = sources[0]
+    metadata["source_file"] = sources[0]
+    metadata["sources"] = json.dumps(sources, ensure_ascii=False)
+    metadata["source_count"] = len(sources)
+    return metadata
+
+
+class MinHasher:
+    """MinHash signatures over lower-cased word shingles.
+
+    The fraction of equal positions in two signatures estimates the Jaccard
+    similarity of the two texts' shingle sets.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.integers(1, HASH_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, HASH_PRIME, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        size = self.shingle_size
+        if len(tokens) < size:
+            grams = {" ".join(tokens)} if tokens else set()
+        else:
+            grams = {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+        return np.fromiter((zlib.crc32(gram.encode()) % HASH_PRIME for gram in grams),
+                           dtype=np.uint64, count=len(grams))
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """The text's signature, or None if it has no words to compare"""
+        shingles = self.shingles(text)
+        if not shingles.size:
+            return None
+        hashed = (self.a[:, None] * shingles[None, :] + self.b[:, None]) % HASH_PRIME
+        return hashed.min(axis=1).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """LSH index of the MinHash signatures of one namespace's stored chunks.
+
+    Signatures are cut into `bands` bands; chunks sharing any band are
+    candidates, and a candidate is a near duplicate when its signature
+    agreement reaches the threshold. With 128 permutations in 16 bands of 8,
+    pairs at Jaccard 0.9 become candidates with probability ~0.98 while pairs
+    below 0.5 almost never do.
+
+    Signatures are persisted to an append-only JSON-lines file (`path`) that
+    is replayed on open; the buckets are rebuilt in memory. Without a path the
+    index is in-memory only.
+    """
+
+    def __init__(self, path: Optional[str], num_perm: int, bands: int):
+        self.path = path
+        self.bands = max(1, min(bands, num_perm))
+        self.rows = num_perm // self.bands
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.buckets: List[Dict[int, List[str]]] = [{} for _ in range(self.bands)]
+        self._records = 0
+        self._band_mixer = np.random.default_rng(2).integers(1, 1 << 62, size=self.rows, dtype=np.uint64)
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        bands = signature[:self.bands * self.rows].reshape(self.bands, self.rows).astype(np.uint64)
+        # Multiply-and-sum wraps modulo 2**64, giving one integer key per band
+        return (bands * self._band_mixer[None, :]).sum(axis=1).tolist()
+
+    def _insert(self, chunk_id: str, signature: np.ndarray):
+        self.signatures[chunk_id] = signature
+        for band, key in enumerate(self._band_keys(signature)):
+            self.buckets[band].setdefault(key, []).append(chunk_id)
+
+    def _discard(self, chunk_id: str) -> bool:
+        signature = self.signatures.pop(chunk_id, None)
+        if signature is None:
+            return False
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self.buckets[band].get(key)
+            if bucket is not None:
+                bucket.remove(chunk_id)
+                if not bucket:
+                    del self.buckets[band][key]
+        return True
+
+    def find(self, signature: np.ndarray, threshold: float) -> Tuple[Optional[str], float]:
+        """Most similar indexed chunk at or above `threshold` as (id, similarity), else (None, 0.0)"""
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self.buckets[band].get(key, ()))
+        best_id, best = None, 0.0
+        for chunk_id in candidates:
+            similarity = float(np.mean(self.signatures[chunk_id] == signature))
+            if similarity >= threshold and similarity > best:
+                best_id, best = chunk_id, similarity
+        return best_id, best
+
+    # ------------------------------------------------------------- persistence
+
+    @staticmethod
+    def _encode(signature: np.ndarray) -> str:
+        return base64.b64encode(signature.astype("<u4").tobytes()).decode("ascii")
+
+    @staticmethod
+    def _decode(value: str) -> np.ndarray:
+        return np.frombuffer(base64.b64decode(value), dtype="<u4").astype(np.uint32)
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self._records += 1
+                if "delete" in record:
+                    self._discard(record["delete"])
+                else:
+                    self._insert(record["id"], self._decode(record["sig"]))
+
+    def _append(self, records: List[Dict[str, Any]]):
+        if not self.path or not records:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        self._records += len(records)
+        # Rewrite without deleted entries once they make up most of the file
+        if self._records > 2 * len(self.signatures) + 1000:
+            self.save()
+
+    def save(self):
+        """Rewrite the whole file from memory"""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for chunk_id, signature in self.signatures.items():
+                f.write(json.dumps({"id": chunk_id, "sig": self._encode(signature)}) + "\n")
+        os.replace(tmp_path, self.path)
+        self._records = len(self.signatures)
+
+    def add(self, entries: List[Tuple[str, np.ndarray]]):
+        for chunk_id, signature in entries:
+            self._insert(chunk_id, signature)
+        self._append([{"id": chunk_id, "sig": self._encode(signature)} for chunk_id, signature in entries])
+
+    def remove(self, chunk_ids: List[str]):
+        self._append([{"delete": chunk_id} for chunk_id in chunk_ids if self._discard(chunk_id)])
+
+
+class DedupPlan:
+    """What to store for one write: new rows to add and stored rows gaining sources"""
+
+    def __init__(self, count: int):
+        self.keep: List[int] = list(range(count))
+        # stored chunk id -> its metadata with the new sources added
+        self.updates: Dict[str, Dict[str, Any]] = {}
+        self.new_entries: List[Tuple[str, np.ndarray]] = []
+        self.duplicates_by_source: Dict[str, int] = {}
+
+    @property
+    def duplicates(self) -> int:
+        return sum(self.duplicates_by_source.values())
+
+
+class ChunkDeduplicator:
+    """Near-duplicate chunk detection for the ingestion path.
+
+    Before chunks are added, each is MinHashed and looked up in its namespace's
+    NearDuplicateIndex (and among the earlier chunks of the same write). A
+    chunk whose estimated Jaccard similarity to a stored chunk reaches
+    DEDUP_THRESHOLD is not stored again; instead its source file is added to
+    the stored chunk's `sources`. Recurring exports and re-uploads therefore
+    add only the chunks that actually changed.
+
+    A namespace's index is built from its collection on first use, so
+    collections written before deduplication existed, or loaded from a
+    snapshot, are covered too. Callers serialize access via the VectorStore
+    write lock.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.threshold = float(os.getenv("DEDUP_THRESHOLD", 0.9))
+        self.enabled = (os.getenv("DEDUP_ENABLED", "true").lower() not in ("0", "false", "no")
+                        and 0 < self.threshold <= 1)
+        self.hasher = MinHasher(int(os.getenv("DEDUP_NUM_PERM", 128)), int(os.getenv("DEDUP_SHINGLE_SIZE", 3)))
+        self.bands = int(os.getenv("DEDUP_BANDS", 16))
+        self.indexes: Dict[str, NearDuplicateIndex] = {}
+        self.lock = threading.Lock()
+
+    def _path(self, namespace: str) -> str:
+        return os.path.join(self.directory, f"{namespace}.jsonl")
+
+    def index_for(self, namespace: str, collection) -> NearDuplicateIndex:
+        with self.lock:
+            index = self.indexes.get(namespace)
+            if index is not None:
+                return index
+            path = self._path(namespace)
+            exists = os.path.exists(path)
+            index = NearDuplicateIndex(path, self.hasher.num_perm, self.bands)
+            if not exists and collection is not None:
+                rows = collection.get(include=["documents"])
+                for chunk_id, document in zip(rows["ids"], rows["documents"] or []):
+                    signature = self.hasher.signature(document)
+                    if signature is not None:
+                        index._insert(chunk_id, signature)
+                index.save()
+            self.indexes[namespace] = index
+            return index
+
+    def reset(self, namespace: str):
+        """Forget a namespace's index; it is rebuilt from the collection on next use"""
+        with self.lock:
+            self.indexes.pop(namespace, None)
+            path = self._path(namespace)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def plan(self, namespace: str, collection, ids: List[str], documents: List[str],
+             metadatas: List[Dict[str, Any]]) -> DedupPlan:
+        """Decide which of the rows to add; metadata of kept rows is updated in place"""
+        plan = DedupPlan(len(ids))
+        if not self.enabled or not ids:
+            return plan
+        index = self.index_for(namespace, collection)
+        # Chunks of this write that will be stored, so repeats within it are caught too
+        pending = NearDuplicateIndex(None, self.hasher.num_perm, self.bands)
+        pending_rows: Dict[str, int] = {}
+        keep = []
+        for row, (chunk_id, document, metadata) in enumerate(zip(ids, documents, metadatas)):
+            signature = self.hasher.signature(document)
+            if signature is None:
+                keep.append(row)
+                continue
+            source = metadata.get("source", metadata.get("source_file"))
+
+            match, _ = pending.find(signature, self.threshold)
+            if match is not None:
+                target = pending_rows[match]
+                sources = chunk_sources(metadatas[target])
+                if source not in sources:
+                    metadatas[target].update(with_sources(metadatas[target], sources + [source]))
+                plan.duplicates_by_source[source] = plan.duplicates_by_source.get(source, 0) + 1
+                continue
+
+            match, _ = index.find(signature, self.threshold)
+            if match is not None:
+                stored = plan.updates.get(match)
+                if stored is None:
+                    found = collection.get(ids=[match], include=["metadatas"])
+                    stored = found["metadatas"][0] if found["ids"] else None
+                if stored is not None:
+                    sources = chunk_sources(stored)
+                    if source not in sources:
+                        plan.updates[match] = with_sources(stored, sources + [source])
+                    plan.duplicates_by_source[source] = plan.duplicates_by_source.get(source, 0) + 1
+                    continue
+                # The index outlived the chunk; drop the stale entry and store this one
+                index.remove([match])
+
+            pending._insert(chunk_id, signature)
+            pending_rows[chunk_id] = row
+            plan.new_entries.append((chunk_id, signature))
+            keep.append(row)
+        plan.keep = keep
+        return plan
+
+    def commit(self, namespace: str, plan: DedupPlan):
+        """Record a plan's new chunks once they are stored"""
+        if self.enabled and plan.new_entries:
+            self.indexes[namespace].add(plan.new_entries)
+
+    def forget(self, namespace: str, chunk_ids: List[str]):
+        """Drop deleted chunks from a namespace's index"""
+        index = self.indexes.get(namespace)
+        if index is None and os.path.exists(self._path(namespace)):
+            index = self.index_for(namespace, None)
+        if index is not None and chunk_ids:
+            index.remove(chunk_ids)
+
+    def get_stats(self, namespace: str) -> Dict[str, Any]:
+        index = self.indexes.get(namespace)
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "indexed_chunks": len(index) if index is not None else None,
+        }
@@ -0,0 +1,287 @@
+import os
+import json
+import base64
+import bisect
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+from services.dedup import chunk_sources
+
+SORT_FIELDS = {"name": None, "size": "size", "ingested_at": "ingested_at"}
+
+
+def document_type(source: str) -> str:
+    return os.path.splitext(source)[1].lstrip(".").lower() or "unknown"
+
+
+def encode_cursor(sort: str, order: str, key: Tuple) -> str:
+    payload = json.dumps({"s": sort, "o": order, "k": list(key)}, ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, sort: str, order: str) -> Tuple:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    if payload.get("s") != sort or payload.get("o") != order:
+        raise ValueError("Cursor was issued for a different sort order")
+    return tuple(payload["k"])
+
+
+class NamespaceCatalog:
+    """The documents of one namespace, kept sorted by name, size and ingest time.
+
+    Entries are appended to a JSON-lines file (`path`) as upserts and
+    deletes and replayed on open; the file is rewritten once it is mostly
+    superseded records.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # Sort key tuples (ending in the source name, so they are unique) per sort field
+        self.orders: Dict[str, List[Tuple]] = {sort: [] for sort in SORT_FIELDS}
+        self.lock = threading.RLock()
+        self._records = 0
+        if os.path.exists(path):
+            self._load()
+
+    @staticmethod
+    def sort_key(sort: str, entry: Dict[str, Any]) -> Tuple:
+        field = SORT_FIELDS[sort]
+        return (entry["source"],) if field is None else (entry[field], entry["source"])
+
+    def _put(self, entry: Dict[str, Any]):
+        self._drop(entry["source"])
+        self.entries[entry["source"]] = entry
+        for sort, keys in self.orders.items():
+            bisect.insort(keys, self.sort_key(sort, entry))
+
+    def _drop(self, source: str):
+        entry = self.entries.pop(source, None)
+        if entry is None:
+            return
+        for sort, keys in self.orders.items():
+            key = self.sort_key(sort, entry)
+            index = bisect.bisect_left(keys, key)
+            if index < len(keys) and keys[index] == key:
+                del keys[index]
+
+    # ------------------------------------------------------------- persistence
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self._records += 1
+                if "delete" in record:
+                    self._drop(record["delete"])
+                else:
+                    self._put(record)
+
+    def _append(self, records: List[Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._records += len(records)
+        if self._records > 2 * len(self.entries) + 1000:
+            self.save()
+
+    def save(self):
+        """Rewrite the file with one record per document"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._records = len(self.entries)
+
+    # ----------------------------------------------------------------- updates
+
+    def upsert(self, entries: List[Dict[str, Any]], persist: bool = True):
+        """Add or replace documents; a re-ingested document keeps its first ingest time"""
+        with self.lock:
+            merged = []
+            for entry in entries:
+                previous = self.entries.get(entry["source"])
+                if previous is not None:
+                    entry = {**entry, "ingested_at": min(previous["ingested_at"], entry["ingested_at"])}
+                self._put(entry)
+                merged.append(entry)
+            # Persist the merged entries, so a reopened catalog replays the same ingest times
+            if persist and merged:
+                self._append(merged)
+
+    def remove(self, sources: List[str]):
+        with self.lock:
+            known = [source for source in sources if source in self.entries]
+            for source in known:
+                self._drop(source)
+            if known:
+                self._append([{"delete": source} for source in known])
+
+    # ----------------------------------------------------------------- listing
+
+    def page(self, sort: str = "name", order: str = "asc", prefix: Optional[str] = None,
+             doc_type: Optional[str] = None, after: Optional[Tuple] = None,
+             limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[Tuple]]:
+        """Up to `limit` matching documents after the sort key `after`; returns (documents, key to resume from)"""
+        with self.lock:
+            keys = self.orders[sort]
+            descending = order == "desc"
+            if after is not None:
+                start = bisect.bisect_left(keys, after) - 1 if descending else bisect.bisect_right(keys, after)
+            elif prefix and sort == "name" and not descending:
+                start = bisect.bisect_left(keys, (prefix,))
+            else:
+                start = len(keys) - 1 if descending else 0
+            step = -1 if descending else 1
+            found = []
+            index = start
+            while 0 <= index < len(keys) and len(found) < limit:
+                key = keys[index]
+                index += step
+                source = key[-1]
+                if prefix and not source.startswith(prefix):
+                    # Name order keeps a prefix contiguous, so the rest cannot match
+                    if sort == "name" and (source > prefix) != descending:
+                        break
+                    continue
+                entry = self.entries[source]
+                if doc_type and entry["type"] != doc_type:
+                    continue
+                found.append(dict(entry))
+            more = 0 <= index < len(keys) and len(found) == limit
+            return found, (self.sort_key(sort, found[-1]) if more else None)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class DocumentCatalog:
+    """Per-namespace document listings (`/documents`) kept alongside the chunks.
+
+    Every write records its source files (type, file size, chunk count,
+    content hash, ingest time) and deletes remove them, so listing,
+    filtering and sorting never scan the collection. A namespace without a
+    catalog file (an index from before the catalog, or after a snapshot
+    import) is built from the collection's chunk metadata once.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.build_page_size = 5000
+        self.catalogs: Dict[str, NamespaceCatalog] = {}
+        self.lock = threading.Lock()
+
+    def _path(self, namespace: str) -> str:
+        return os.path.join(self.directory, f"{namespace}.jsonl")
+
+    def catalog_for(self, namespace: str, collection) -> NamespaceCatalog:
+        with self.lock:
+            catalog = self.catalogs.get(namespace)
+            if catalog is not None:
+                return catalog
+            path = self._path(namespace)
+            build = not os.path.exists(path)
+            catalog = NamespaceCatalog(path)
+            if build:
+                if collection is not None:
+                    catalog.upsert(self._scan(collection), persist=False)
+                catalog.save()
+            self.catalogs[namespace] = catalog
+            return catalog
+
+    def _scan(self, collection) -> List[Dict[str, Any]]:
+        entries: Dict[str, Dict[str, Any]] = {}
+        offset = 0
+        while True:
+            rows = collection.get(limit=self.build_page_size, offset=offset, include=["metadatas"])
+            if not rows["ids"]:
+                break
+            for metadata in rows["metadatas"]:
+                primary = metadata.get("source", "unknown")
+                for source in chunk_sources(metadata) or [primary]:
+                    entry = entries.setdefault(source, {
+                        "source": source,
+                        "type": document_type(source),
+                        "size": 0,
+                        "chunks": 0,
+                        "content_hash": None,
+                        "ingested_at": metadata.get("ingested_at", 0),
+                        "updated_at": metadata.get("ingested_at", 0),
+                    })
+                    entry["chunks"] += 1
+                    if source != primary:
+                        continue
+                    # Without the file's size, fall back to the text it produced
+                    entry["size"] = metadata.get("file_size") or entry["size"] + metadata.get("chunk_size", 0)
+                    entry["content_hash"] = metadata.get("content_hash", entry["content_hash"])
+                    entry["ingested_at"] = min(entry["ingested_at"], metadata.get("ingested_at", 0))
+            offset += len(rows["ids"])
+        return list(entries.values())
+
+    def record(self, namespace: str, collection, batches: List[Tuple[List[Dict[str, Any]], str]],
+               metadatas: List[Dict[str, Any]]):
+        """Call after a write with its batches and the chunk metadata it prepared"""
+        entries = []
+        offset = 0
+        for documents, source_file in batches:
+            chunk_metadatas = metadatas[offset:offset + len(documents)]
+            offset += len(documents)
+            if not chunk_metadatas:
+                continue
+            first = chunk_metadatas[0]
+            source = first.get("source", source_file)
+            entries.append({
+                "source": source,
+                "type": document_type(source),
+                "size": first.get("file_size") or sum(len(doc["content"]) for doc in documents),
+                "chunks": len(documents),
+                "content_hash": first.get("content_hash"),
+                "ingested_at": first["ingested_at"],
+                "updated_at": first["ingested_at"],
+            })
+        self.catalog_for(namespace, collection).upsert(entries)
+
+    def forget(self, namespace: str, sources: List[str]):
+        with self.lock:
+            catalog = self.catalogs.get(namespace)
+        if catalog is None and os.path.exists(self._path(namespace)):
+            catalog = self.catalog_for(namespace, None)
+        if catalog is not None:
+            catalog.remove(sources)
+
+    def reset(self, namespace: str):
+        """Forget a namespace's catalog; it is rebuilt from the collection when needed"""
+        with self.lock:
+            self.catalogs.pop(namespace, None)
+            path = self._path(namespace)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def list(self, namespace: str, collection, sort: str = "name", order: str = "asc",
+             prefix: Optional[str] = None, doc_type: Optional[str] = None, cursor: Optional[str] = None,
+             limit: int = 100) -> Dict[str, Any]:
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Unsupported sort: {sort}. Use one of {', '.join(SORT_FIELDS)}.")
+        if order not in ("asc", "desc"):
+            raise ValueError(f"Unsupported order: {order}. Use 'asc' or 'desc'.")
+        after = decode_cursor(cursor, sort, order) if cursor else None
+        catalog = self.catalog_for(namespace, collection)
+        documents, next_key = catalog.page(sort, order, prefix, doc_type.lower() if doc_type else None,
+                                           after, limit)
+        return {
+            "namespace": namespace,
+            "documents": documents,
+            "next_cursor": encode_cursor(sort, order, next_key) if next_key is not None else None,
+            "total": len(catalog),
+        }
+
+    def count(self, namespace: str, collection) -> int:
+        return len(self.catalog_for(namespace, collection))
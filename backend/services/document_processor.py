@@ -4,53 +4,76 @@ import PyPDF2
 from typing import List, Dict, Any
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+
+from services.priority_executor import get_shared_executor
+from services.parallel_split import ParallelSplitter
+from services.csv_rollups import build_rollups
 
 class DocumentProcessor:
     def __init__(self):
         self.chunk_size = int(os.getenv("CHUNK_SIZE", 1000))
         self.chunk_overlap = int(os.getenv("CHUNK_OVERLAP", 200))
+        separators = ["\n\n", "\n", " ", ""]
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
             length_function=len,
-            separators=["\n\n", "\n", " ", ""]
+            separators=separators
+        )
+        # Very large texts (long PDFs) are split across processes, with the same chunks
+        self.parallel_splitter = ParallelSplitter(
+            self.text_splitter, self.chunk_size, self.chunk_overlap, separators
         )
-        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.csv_rollups = os.getenv("CSV_ROLLUPS", "true").lower() == "true"
+        self.executor = get_shared_executor().view("background")
 
     async def process_document(self, file_path: str, filename: str) -> List[Dict[str, Any]]:
         """Process a document and return chunks with metadata"""
+        parsed = await self.parse_document(file_path, filename)
+        return await asyncio.get_event_loop().run_in_executor(
+            self.executor, self.chunk_document, parsed, filename
+        )
+
+    async def parse_document(self, file_path: str, filename: str) -> Any:
+        """Parse stage: read the file into raw text (PDF) or a DataFrame (CSV)"""
         file_ext = os.path.splitext(filename)[1].lower()
         
         if file_ext == '.pdf':
-            return await self._process_pdf(file_path, filename)
+            extract = self._extract_pdf_text
         elif file_ext == '.csv':
-            return await self._process_csv(file_path, filename)
+            extract = self._read_csv
         else:
             raise ValueError(f"Unsupported file type: {file_ext}")
-
-    async def _process_pdf(self, file_path: str, filename: str) -> List[Dict[str, Any]]:
-        """Process PDF file and extract text chunks"""
-        def extract_pdf_text():
-            text = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page_num, page in enumerate(pdf_reader.pages):
-                    page_text = page.extract_text()
-                    if page_text.strip():  # Only add non-empty pages
-                        text += f"\n--- Page {page_num + 1} ---\n{page_text}\n"
-            return text
         
-        # Extract text in executor to avoid blocking
-        text = await asyncio.get_event_loop().run_in_executor(
-            self.executor, extract_pdf_text
+        # Parse in executor to avoid blocking
+        return await asyncio.get_event_loop().run_in_executor(
+            self.executor, extract, file_path
         )
+
+    def chunk_document(self, parsed: Any, filename: str) -> List[Dict[str, Any]]:
+        """Chunk stage (blocking): turn parse output into chunks with metadata"""
+        if isinstance(parsed, pd.DataFrame):
+            return self._chunk_csv(parsed, filename)
+        return self._chunk_pdf_text(parsed, filename)
+
+    def _extract_pdf_text(self, file_path: str) -> str:
+        """Extract page-marked text from a PDF file"""
+        text = ""
+        with open(file_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            for page_num, page in enumerate(pdf_reader.pages):
+                page_text = page.extract_text()
+                if page_text.strip():  # Only add non-empty pages
+                    text += f"\n--- Page {page_num + 1} ---\n{page_text}\n"
         
         if not text.strip():
             raise ValueError("No text could be extracted from the PDF file")
-        
+        return text
+
+    def _chunk_pdf_text(self, text: str, filename: str) -> List[Dict[str, Any]]:
+        """Split extracted PDF text into chunks"""
         # Split text into chunks
-        chunks = self.text_splitter.split_text(text)
+        chunks = self.parallel_splitter.split_text(text)
         
         # Create document chunks with metadata
         document_chunks = []
@@ -69,30 +92,28 @@ class DocumentProcessor:
         
         return document_chunks
 
-    async def _process_csv(self, file_path: str, filename: str) -> List[Dict[str, Any]]:
-        """Process CSV file and create text chunks from rows"""
-        def read_csv():
-            try:
-                # Try different encodings
-                for encoding in ['utf-8', 'latin-1', 'cp1252']:
-                    try:
-                        df = pd.read_csv(file_path, encoding=encoding)
-                        return df
-                    except UnicodeDecodeError:
-                        continue
+    def _read_csv(self, file_path: str) -> pd.DataFrame:
+        """Read a CSV file, trying common encodings"""
+        try:
+            # Try different encodings
+            for encoding in ['utf-8', 'latin-1', 'cp1252']:
+                try:
+                    df = pd.read_csv(file_path, encoding=encoding)
+                    break
+                except UnicodeDecodeError:
+                    continue
+            else:
                 # If all encodings fail, try with error handling
-                return pd.read_csv(file_path, encoding='utf-8', errors='ignore')
-            except Exception as e:
-                raise ValueError(f"Error reading CSV file: {str(e)}")
-        
-        # Read CSV in executor
-        df = await asyncio.get_event_loop().run_in_executor(
-            self.executor, read_csv
-        )
+                df = pd.read_csv(file_path, encoding='utf-8', errors='ignore')
+        except Exception as e:
+            raise ValueError(f"Error reading CSV file: {str(e)}")
         
         if df.empty:
             raise ValueError("CSV file is empty or could not be read")
-        
+        return df
+
+    def _chunk_csv(self, df: pd.DataFrame, filename: str) -> List[Dict[str, Any]]:
+        """Create text chunks from CSV rows"""
         # Convert DataFrame to text chunks
         document_chunks = []
         
@@ -161,5 +182,20 @@ class DocumentProcessor:
                     },
                     "source": filename
                 })
+
+        # Precomputed aggregates, so summary questions don't need many raw-row chunks
+        if self.csv_rollups:
+            for rollup_text, rollup_metadata in build_rollups(df, filename, self.chunk_size * 2):
+                document_chunks.append({
+                    "content": rollup_text,
+                    "metadata": {
+                        "source": filename,
+                        "chunk_id": len(document_chunks),
+                        "type": "csv_rollup",
+                        **rollup_metadata,
+                        "chunk_size": len(rollup_text)
+                    },
+                    "source": filename
+                })
         
         return document_chunks
@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from typing import List, Dict, Any, Optional
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+LEGACY_COLLECTION_BASE = "hero_vida_documents"
+
+
+class EmbeddingRegistry:
+    """Which embedding model is active and which model built each collection.
+
+    Persisted as JSON next to the index. Every model gets its own collection
+    name prefix, so collections of different models live side by side: the
+    original MiniLM model keeps the historical `hero_vida_documents[__ns]`
+    names, and any other model gets `hero_vida_<hash>[__ns]`.
+    """
+
+    def __init__(self, path: str, default_model: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data: Dict[str, Any] = {
+            "active_model": default_model,
+            "previous_model": None,
+            "models": {},
+            "collections": {},
+        }
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.data.update(json.load(f))
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def active_model(self) -> str:
+        return self.data["active_model"]
+
+    @property
+    def previous_model(self) -> Optional[str]:
+        return self.data["previous_model"]
+
+    def collection_base(self, model: str) -> str:
+        with self.lock:
+            entry = self.data["models"].get(model)
+            if entry is None:
+                if model == DEFAULT_EMBEDDING_MODEL:
+                    base = LEGACY_COLLECTION_BASE
+                else:
+                    base = f"hero_vida_{hashlib.sha1(model.encode()).hexdigest()[:8]}"
+                entry = self.data["models"][model] = {"collection_base": base, "added_at": time.time()}
+                self._save()
+            return entry["collection_base"]
+
+    def record_collection(self, name: str, namespace: str, model: str):
+        with self.lock:
+            if name not in self.data["collections"]:
+                self.data["collections"][name] = {"namespace": namespace, "embedding_model": model,
+                                                  "created_at": time.time()}
+                self._save()
+
+    def forget_collection(self, name: str):
+        with self.lock:
+            if self.data["collections"].pop(name, None) is not None:
+                self._save()
+
+    def activate(self, model: str):
+        with self.lock:
+            if model != self.data["active_model"]:
+                self.data["previous_model"] = self.data["active_model"]
+                self.data["active_model"] = model
+            self.data["models"].setdefault(model, {})["activated_at"] = time.time()
+            self._save()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return json.loads(json.dumps(self.data))
+
+
+class EmbeddingMigration:
+    """Background re-embedding of every namespace into a new model's collections.
+
+    The active collections keep serving reads and writes while the job copies
+    their rows (same ids, documents and metadata) into collections for the
+    target model, re-embedding at most `chunks_per_second`. Because uploads
+    and deletes continue meanwhile, the copy is repeated as an id diff until
+    little is left; the last diff is applied with VectorStore writes paused,
+    and the active model is then switched in one step. Reads never pause.
+
+    The old collections are kept, so a rollback is a migration back to the
+    previous model that only has to re-embed what changed since the switch.
+    """
+
+    MAX_CATCH_UP_PASSES = 5
+
+    def __init__(self, vector_store):
+        self.vector_store = vector_store
+        self.default_rate = float(os.getenv("MIGRATION_CHUNKS_PER_SECOND", 200))
+        self.default_batch_size = int(os.getenv("MIGRATION_BATCH_SIZE", 256))
+        self.task: Optional[asyncio.Task] = None
+        self.cancelled = False
+        self.status: Dict[str, Any] = {"state": "idle"}
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start(self, target_model: str, chunks_per_second: Optional[float] = None,
+              batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """Start migrating to `target_model`; raises RuntimeError if a migration is running"""
+        if self.running:
+            raise RuntimeError(f"A migration to {self.status['target_model']} is already running")
+        if not target_model:
+            raise ValueError("A target embedding model is required")
+        if target_model == self.vector_store.embedding_model_name:
+            raise ValueError(f"{target_model} is already the active embedding model")
+        self.cancelled = False
+        self.status = {
+            "state": "loading_model",
+            "source_model": self.vector_store.embedding_model_name,
+            "target_model": target_model,
+            "chunks_per_second": chunks_per_second or self.default_rate,
+            "batch_size": batch_size or self.default_batch_size,
+            "total": None,
+            "copied": 0,
+            "deleted": 0,
+            "passes": 0,
+            "started_at": time.time(),
+            "finished_at": None,
+            "error": None,
+        }
+        self.task = asyncio.create_task(self._run())
+        return self.get_status()
+
+    def cancel(self) -> Dict[str, Any]:
+        """Stop after the current batch; the active model is left unchanged"""
+        if not self.running:
+            raise RuntimeError("No migration is running")
+        self.cancelled = True
+        return self.get_status()
+
+    def get_status(self) -> Dict[str, Any]:
+        status = dict(self.status)
+        if status.get("total"):
+            status["progress"] = round(min(1.0, status["copied"] / status["total"]), 3)
+        return status
+
+    # ----------------------------------------------------------------- copying
+
+    def _diff(self, namespace: str, target_model: str):
+        """Ids to copy into, and stale ids to delete from, the target collection.
+
+        Rows already copied whose metadata changed since (a deduplicated chunk
+        gaining or losing a source) are updated in place.
+        """
+        store = self.vector_store
+        source = store._get_collection(namespace)
+        target = store._get_collection(namespace, create=True, model_name=target_model)
+        source_rows = source.get(include=["metadatas"]) if source is not None else {"ids": [], "metadatas": []}
+        target_rows = target.get(include=["metadatas"])
+        target_metadata = dict(zip(target_rows["ids"], target_rows["metadatas"]))
+        source_set = set(source_rows["ids"])
+        missing = [doc_id for doc_id in source_rows["ids"] if doc_id not in target_metadata]
+        stale = [doc_id for doc_id in target_metadata if doc_id not in source_set]
+        if stale:
+            target.delete(ids=stale)
+        changed = [(doc_id, metadata) for doc_id, metadata in zip(source_rows["ids"], source_rows["metadatas"])
+                   if doc_id in target_metadata and target_metadata[doc_id] != metadata]
+        if changed:
+            target.update(ids=[doc_id for doc_id, _ in changed], metadatas=[metadata for _, metadata in changed])
+        return missing, len(stale)
+
+    def _copy(self, namespace: str, target_model: str, model, ids: List[str]) -> int:
+        store = self.vector_store
+        source = store._get_collection(namespace)
+        target = store._get_collection(namespace, create=True, model_name=target_model)
+        rows = source.get(ids=ids, include=["documents", "metadatas"])
+        if not rows["ids"]:
+            return 0
+        embeddings = model.encode(rows["documents"], batch_size=store.encode_batch_size).tolist()
+        target.add(ids=rows["ids"], embeddings=embeddings,
+                   metadatas=rows["metadatas"], documents=rows["documents"])
+        return len(rows["ids"])
+
+    def _finish(self, target_model: str, model):
+        """Apply the remaining diff with writes paused, then switch the active model"""
+        store = self.vector_store
+        with store.write_lock:
+            source_namespaces = store._list_namespaces()
+            for namespace in source_namespaces:
+                missing, deleted = self._diff(namespace, target_model)
+                self.status["deleted"] += deleted
+                for start in range(0, len(missing), self.status["batch_size"]):
+                    self.status["copied"] += self._copy(namespace, target_model, model,
+                                                        missing[start:start + self.status["batch_size"]])
+            # Namespaces cleared since an earlier migration must not reappear
+            for namespace in store._list_namespaces(target_model):
+                if namespace not in source_namespaces:
+                    store._drop_collection(namespace, target_model)
+            store.switch_model(target_model, model)
+
+    async def _run(self):
+        store = self.vector_store
+        loop = asyncio.get_event_loop()
+        target_model = self.status["target_model"]
+        batch_size = self.status["batch_size"]
+        try:
+            model = await loop.run_in_executor(store.ingest_executor, store.load_model, target_model)
+            namespaces = await store.list_namespaces()
+            self.status["total"] = sum([
+                (await store.get_stats(namespace))["total_chunks"] for namespace in namespaces
+            ])
+
+            self.status["state"] = "copying"
+            while self.status["passes"] < self.MAX_CATCH_UP_PASSES:
+                self.status["passes"] += 1
+                remaining = 0
+                for namespace in await store.list_namespaces():
+                    missing, deleted = await loop.run_in_executor(
+                        store.ingest_executor, self._diff, namespace, target_model
+                    )
+                    self.status["deleted"] += deleted
+                    remaining += len(missing) + deleted
+                    for start in range(0, len(missing), batch_size):
+                        if self.cancelled:
+                            self.status["state"] = "cancelled"
+                            return
+                        began = time.monotonic()
+                        copied = await loop.run_in_executor(
+                            store.ingest_executor, self._copy, namespace, target_model, model,
+                            missing[start:start + batch_size]
+                        )
+                        self.status["copied"] += copied
+                        # Throttle so the migration leaves embedding capacity for live traffic
+                        await asyncio.sleep(max(0.0, copied / self.status["chunks_per_second"]
+                                                - (time.monotonic() - began)))
+                self.status["state"] = "catching_up"
+                if remaining <= batch_size:
+                    break
+
+            self.status["state"] = "switching"
+            await loop.run_in_executor(store.ingest_executor, self._finish, target_model, model)
+            self.status["state"] = "done"
+        except Exception as e:
+            self.status["state"] = "failed"
+            self.status["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            self.status["finished_at"] = time.time()
@@ -0,0 +1,117 @@
+import os
+import re
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+# List markers already in the text (e.g. CSV rollup lines), dropped before answers add their own
+LEADING_BULLET = re.compile(r"^(?:[-*\u2022]\s+)+")
+MIN_SENTENCE_CHARS = 20
+
+
+def strip_bullet(sentence: str) -> str:
+    return LEADING_BULLET.sub("", sentence)
+
+
+def sentence_key(sentence: str) -> str:
+    """Normalised form under which repeated sentences (e.g. from overlapping chunks) compare equal"""
+    return " ".join(strip_bullet(sentence).lower().split())
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split chunk text into sentences/lines worth showing on their own"""
+    sentences = []
+    for sentence in SENTENCE_SPLIT.split(text):
+        sentence = sentence.strip()
+        if len(sentence) >= MIN_SENTENCE_CHARS:
+            sentences.append(sentence)
+    return sentences
+
+
+class ExtractiveAnswerer:
+    """Answers a query with the best-matching sentences from retrieved chunks, no LLM call.
+
+    Sentences of every retrieved chunk are embedded with the VectorStore's model
+    (cached per chunk id, so hot chunks are only encoded once) and scored against
+    the query embedding that the search already produced, in a single matrix
+    product.
+    """
+
+    def __init__(self, vector_store):
+        self.vector_store = vector_store
+        self.max_sentences = int(os.getenv("EXTRACTIVE_MAX_SENTENCES", 3))
+        self.cache_size = int(os.getenv("EXTRACTIVE_CACHE_CHUNKS", 2000))
+        self.cache: "OrderedDict[str, Tuple[List[str], np.ndarray]]" = OrderedDict()
+
+    def _cache_key(self, doc: Dict[str, Any]) -> str:
+        # Keyed by model too: embeddings cached before a model migration must not be reused
+        doc_key = doc.get("id") or f"{doc.get('source')}:{hash(doc.get('content', ''))}"
+        return f"{self.vector_store.embedding_model_name}:{doc_key}"
+
+    async def _sentence_embeddings(self, relevant_docs: List[Dict[str, Any]]):
+        """Return per-doc (sentences, embeddings), encoding all cache misses in one batch"""
+        per_doc = []
+        missing: List[Tuple[int, str, List[str]]] = []
+        for i, doc in enumerate(relevant_docs):
+            key = self._cache_key(doc)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                per_doc.append(cached)
+            else:
+                sentences = split_sentences(doc.get("content", ""))
+                per_doc.append((sentences, None))
+                missing.append((i, key, sentences))
+
+        texts = [sentence for _, _, sentences in missing for sentence in sentences]
+        if texts:
+            embeddings = np.asarray(await self.vector_store.encode_texts(texts), dtype=np.float32)
+            offset = 0
+            for i, key, sentences in missing:
+                block = embeddings[offset:offset + len(sentences)]
+                offset += len(sentences)
+                per_doc[i] = (sentences, block)
+                self.cache[key] = (sentences, block)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return per_doc
+
+    async def answer(self, query_embedding: List[float], relevant_docs: List[Dict[str, Any]],
+                     max_sentences: int = None) -> Dict[str, Any]:
+        """Rank sentences by cosine similarity to the query and return the top ones with sources"""
+        max_sentences = max_sentences or self.max_sentences
+        per_doc = await self._sentence_embeddings(relevant_docs)
+
+        sentences, sources, blocks = [], [], []
+        for doc, (doc_sentences, embeddings) in zip(relevant_docs, per_doc):
+            if not doc_sentences:
+                continue
+            sentences.extend(doc_sentences)
+            sources.extend([doc.get("source", "Unknown")] * len(doc_sentences))
+            blocks.append(embeddings)
+        if not sentences:
+            return {"response": "No relevant passages were found in the documents.", "sources": [], "passages": []}
+
+        matrix = np.vstack(blocks)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        scores = (matrix @ query) / np.where(norms == 0, 1.0, norms)
+
+        passages = []
+        seen = set()
+        for i in np.argsort(-scores, kind="stable"):
+            key = sentence_key(sentences[i])
+            if key in seen:
+                continue
+            seen.add(key)
+            passages.append({"text": strip_bullet(sentences[i]), "source": sources[i], "score": float(scores[i])})
+            if len(passages) == max_sentences:
+                break
+        response = "\n".join(f"- {p['text']} (Source: {p['source']})" for p in passages)
+        return {
+            "response": response,
+            "sources": list(dict.fromkeys(p["source"] for p in passages)),
+            "passages": passages,
+        }
@@ -1,42 +1,145 @@
 import os
+import re
 import google.generativeai as genai
-from typing import List, Dict, Any
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple
+
+from services.llm_scheduler import LLMScheduler, CircuitOpenError
+from services.extractive_answerer import split_sentences, sentence_key, strip_bullet
+from services.priority_executor import get_shared_executor
+from services.token_accounting import TokenAccountant, estimate_tokens
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+# Context documents cut shorter than this are dropped rather than sent as a fragment
+MIN_TRIMMED_DOCUMENT_TOKENS = 50
+
+# Static instructions, sent as the model's system instruction instead of inside every prompt
+SYSTEM_INSTRUCTIONS = {
+    "rag": """You are a helpful AI assistant specialized in Hero Vida strategy and business information. You have access to internal documents and data about Hero Vida.
+
+Your task is to answer the user's question based on the provided context from the company's documents. Follow these guidelines:
+
+1. Answer based primarily on the provided context
+2. Be specific and detailed when the context supports it
+3. If the context doesn't fully answer the question, say so and provide what information is available
+4. Always cite which document(s) your answer comes from
+5. Keep your response focused on Hero Vida strategy and business matters
+6. Use professional business language appropriate for strategic discussions""",
+    "summary": """You summarize Hero Vida business documents. Provide a summary that includes:
+1. Main topics covered
+2. Key strategic points
+3. Important business information
+4. Overall themes
+
+Keep the summary concise but informative (2-3 paragraphs).""",
+}
 
 class GeminiService:
     def __init__(self):
-        # Configure Gemini API
+        # One model per kind of call; kinds without their own model use the rag one
+        self.models = self._create_models()
+        self.model = self.models["rag"]
+        self.executor = get_shared_executor().view("llm")
+        self.scheduler = LLMScheduler(self._call_model, self.executor)
+        # Summaries get their own queue, limit and breaker, so uploads cannot delay or trip chat
+        self.background_scheduler = LLMScheduler(self._call_model, get_shared_executor().view("llm_background"))
+        self.accounting = TokenAccountant()
+        self.max_prompt_tokens = int(os.getenv("LLM_MAX_PROMPT_TOKENS", 8000))
+
+    def _create_models(self) -> Dict[str, Any]:
+        """Configure the Gemini API and build a model per kind of call, each carrying its static instructions"""
         api_key = os.getenv("GOOGLE_API_KEY")
         if not api_key:
             raise ValueError("GOOGLE_API_KEY environment variable is required")
         
         genai.configure(api_key=api_key)
         
-        # Initialize the model
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
-        self.executor = ThreadPoolExecutor(max_workers=2)
-
-    async def generate_response(self, query: str, relevant_docs: List[Dict[str, Any]]) -> str:
-        """Generate response using Gemini with RAG context"""
-        def generate():
-            # Prepare context from relevant documents
-            context = self._prepare_context(relevant_docs)
-            
-            # Create the prompt
-            prompt = self._create_rag_prompt(query, context)
-            
-            try:
-                # Generate response
-                response = self.model.generate_content(prompt)
-                return response.text
-            except Exception as e:
-                # Fallback response if generation fails
-                return f"I apologize, but I encountered an error while generating a response: {str(e)}. However, I found some relevant information in the documents that might help answer your question:\n\n{context[:500]}..."
+        return {
+            kind: genai.GenerativeModel('gemini-1.5-flash', system_instruction=instruction)
+            for kind, instruction in SYSTEM_INSTRUCTIONS.items()
+        }
+
+    def _call_model(self, request: Dict[str, str]) -> Dict[str, Any]:
+        """Blocking model call for {"kind", "prompt"}; run by the scheduler on the executor.
+
+        Returns the text and token usage; usage is the model's own count when
+        the response carries one, otherwise an estimate.
+        """
+        kind = request["kind"]
+        response = self.models.get(kind, self.model).generate_content(request["prompt"])
+        metadata = getattr(response, "usage_metadata", None)
+        if metadata is not None and getattr(metadata, "prompt_token_count", None):
+            usage = {
+                "prompt_tokens": metadata.prompt_token_count,
+                "completion_tokens": getattr(metadata, "candidates_token_count", 0) or 0,
+                "estimated": False,
+            }
+        else:
+            usage = {
+                "prompt_tokens": estimate_tokens(SYSTEM_INSTRUCTIONS.get(kind, "")) + estimate_tokens(request["prompt"]),
+                "completion_tokens": estimate_tokens(response.text),
+                "estimated": True,
+            }
+        # Every call counts, including hedges and retries that lose
+        self.accounting.record_usage(kind, usage)
+        return {"text": response.text, "usage": usage}
+
+    async def generate_response(self, query: str, relevant_docs: List[Dict[str, Any]],
+                                history: str = "") -> str:
+        """Generate response using Gemini with RAG context and optional conversation history"""
+        return (await self.answer(query, relevant_docs, history))["response"]
+
+    async def answer(self, query: str, relevant_docs: List[Dict[str, Any]], history: str = "") -> Dict[str, Any]:
+        """Like generate_response, plus the call's token usage (None if it fell back)"""
+        # Prepare context from relevant documents, trimmed to the prompt token cap
+        context, history, trimmed = self._fit_context(query, relevant_docs, history)
+        
+        # Create the prompt
+        prompt = self._create_rag_prompt(query, context, history)
+        self.accounting.record_prompt("rag", {
+            "context": estimate_tokens(context),
+            "history": estimate_tokens(history),
+            "query": estimate_tokens(query),
+            "prompt": estimate_tokens(SYSTEM_INSTRUCTIONS["rag"]) + estimate_tokens(prompt),
+        }, trimmed["documents"], trimmed["tokens"])
         
-        return await asyncio.get_event_loop().run_in_executor(
-            self.executor, generate
-        )
+        try:
+            # Generate response (retries, hedging and circuit breaking in the scheduler)
+            result = await self.scheduler.run({"kind": "rag", "prompt": prompt})
+            return {"response": result["text"], "usage": {**result["usage"], "trimmed": trimmed}}
+        except CircuitOpenError:
+            return {"response": self._extractive_fallback(query, relevant_docs, "The AI model is temporarily unavailable"),
+                    "usage": None}
+        except Exception as e:
+            # Fallback response if generation fails
+            return {"response": self._extractive_fallback(query, relevant_docs, f"I encountered an error while generating a response: {str(e)}"),
+                    "usage": None}
+
+    def _extractive_fallback(self, query: str, relevant_docs: List[Dict[str, Any]], reason: str,
+                             max_sentences: int = 5) -> str:
+        """Answer with the retrieved sentences that share the most words with the query"""
+        query_words = set(WORD_PATTERN.findall(query.lower()))
+        scored = []
+        for doc in relevant_docs:
+            for sentence in split_sentences(doc.get("content", "")):
+                words = set(WORD_PATTERN.findall(sentence.lower()))
+                overlap = len(query_words & words) / (len(words) ** 0.5 or 1)
+                scored.append((overlap, sentence, doc.get("source", "Unknown")))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        
+        lines = []
+        seen = set()
+        for _, sentence, source in scored:
+            key = sentence_key(sentence)
+            if key in seen:
+                continue
+            seen.add(key)
+            lines.append(f"- {strip_bullet(sentence)} (Source: {source})")
+            if len(lines) == max_sentences:
+                break
+        if not lines:
+            return f"{reason}, and no relevant passages were found in the documents."
+        return f"{reason}. Here are the most relevant passages from the documents:\n\n" + "\n".join(lines)
 
     def _prepare_context(self, relevant_docs: List[Dict[str, Any]]) -> str:
         """Prepare context from relevant documents"""
@@ -47,72 +150,111 @@ class GeminiService:
         for i, doc in enumerate(relevant_docs, 1):
             source = doc.get("source", "Unknown")
             content = doc.get("content", "")
-            distance = doc.get("distance", 0.0)
             
             # Add document with source information
             context_parts.append(f"Document {i} (Source: {source}):\n{content}")
         
-        return "\n\n---\n\n".join(context_parts)
+        return CONTEXT_SEPARATOR.join(context_parts)
 
-    def _create_rag_prompt(self, query: str, context: str) -> str:
-        """Create a RAG prompt for Gemini"""
-        prompt = f"""You are a helpful AI assistant specialized in Hero Vida strategy and business information. You have access to internal documents and data about Hero Vida.
+    def _fit_context(self, query: str, relevant_docs: List[Dict[str, Any]],
+                     history: str) -> Tuple[str, str, Dict[str, int]]:
+        """Context and history trimmed so the whole prompt stays under LLM_MAX_PROMPT_TOKENS.
 
-Your task is to answer the user's question based on the provided context from the company's documents. Follow these guidelines:
+        History keeps its most recent part, at most a quarter of the cap;
+        documents are kept in rank order and the first one that no longer
+        fits is cut short (or dropped if little of it would remain), along
+        with everything ranked below it. Returns (context, history, trimmed
+        document/token counts).
+        """
+        context = self._prepare_context(relevant_docs)
+        trimmed = {"documents": 0, "tokens": 0}
+        if self.max_prompt_tokens <= 0:
+            return context, history, trimmed
+        system = estimate_tokens(SYSTEM_INSTRUCTIONS["rag"])
+        if system + estimate_tokens(self._create_rag_prompt(query, context, history)) <= self.max_prompt_tokens:
+            return context, history, trimmed
 
-1. Answer based primarily on the provided context
-2. Be specific and detailed when the context supports it
-3. If the context doesn't fully answer the question, say so and provide what information is available
-4. Always cite which document(s) your answer comes from
-5. Keep your response focused on Hero Vida strategy and business matters
-6. Use professional business language appropriate for strategic discussions
+        chars_per_token = float(os.getenv("LLM_CHARS_PER_TOKEN", 4))
+        history_budget = self.max_prompt_tokens // 4
+        if estimate_tokens(history) > history_budget:
+            trimmed["tokens"] += estimate_tokens(history) - history_budget
+            keep = int(history_budget * chars_per_token)
+            history = history[-keep:] if keep > 0 else ""
+        budget = self.max_prompt_tokens - system - estimate_tokens(self._create_rag_prompt(query, "", history))
 
-CONTEXT FROM DOCUMENTS:
+        parts = []
+        for i, doc in enumerate(relevant_docs, 1):
+            part = f"Document {i} (Source: {doc.get('source', 'Unknown')}):\n{doc.get('content', '')}"
+            cost = estimate_tokens(part) + (estimate_tokens(CONTEXT_SEPARATOR) if parts else 0)
+            if cost <= budget:
+                parts.append(part)
+                budget -= cost
+                continue
+            # Everything from here on is over budget
+            dropped = relevant_docs[i - 1:]
+            over = sum(estimate_tokens(d.get("content", "")) for d in dropped)
+            budget -= estimate_tokens(CONTEXT_SEPARATOR) if parts else 0
+            if budget >= MIN_TRIMMED_DOCUMENT_TOKENS:
+                kept = part[:int(budget * chars_per_token)]
+                parts.append(kept)
+                over -= estimate_tokens(kept)
+                dropped = dropped[1:]
+            trimmed["documents"] += len(dropped)
+            trimmed["tokens"] += max(0, over)
+            break
+        return CONTEXT_SEPARATOR.join(parts) if parts else self._prepare_context([]), history, trimmed
+
+    def _create_rag_prompt(self, query: str, context: str, history: str = "") -> str:
+        """Create a RAG prompt for Gemini"""
+        history_section = ""
+        if history:
+            history_section = f"""CONVERSATION SO FAR (use it to resolve follow-up questions):
+{history}
+
+"""
+
+        # The guidelines live in SYSTEM_INSTRUCTIONS["rag"]; only per-request parts go here
+        prompt = f"""CONTEXT FROM DOCUMENTS:
 {context}
 
-USER QUESTION: {query}
+{history_section}USER QUESTION: {query}
 
 Please provide a comprehensive answer based on the context above. If you reference specific information, mention which document it came from."""
 
         return prompt
 
-    async def generate_summary(self, documents: List[Dict[str, Any]]) -> str:
+    async def generate_summary(self, documents: List[Dict[str, Any]], raise_errors: bool = False) -> str:
         """Generate a summary of uploaded documents"""
-        def generate():
-            if not documents:
-                return "No documents to summarize."
-            
-            # Prepare content for summarization
-            content_parts = []
-            sources = set()
-            
-            for doc in documents[:10]:  # Limit to first 10 docs for summary
-                content_parts.append(doc.get("content", "")[:500])  # Limit content length
-                sources.add(doc.get("source", "Unknown"))
-            
-            combined_content = "\n\n".join(content_parts)
-            
-            prompt = f"""Please provide a concise summary of the following Hero Vida business documents:
+        if not documents:
+            return "No documents to summarize."
+        
+        # Prepare content for summarization
+        content_parts = []
+        sources = set()
+        
+        # Limit to 10 docs for summary, spread evenly so long documents are covered end to end
+        step = max(1, len(documents) / 10)
+        sampled = [documents[int(i * step)] for i in range(min(10, len(documents)))]
+        for doc in sampled:
+            content_parts.append(doc.get("content", "")[:500])  # Limit content length
+            sources.add(doc.get("source", "Unknown"))
+        
+        combined_content = "\n\n".join(content_parts)
+        
+        prompt = f"""Please provide a concise summary of the following Hero Vida business documents:
 
 DOCUMENTS:
 {combined_content}
 
-SOURCES: {', '.join(sources)}
-
-Provide a summary that includes:
-1. Main topics covered
-2. Key strategic points
-3. Important business information
-4. Overall themes
-
-Keep the summary concise but informative (2-3 paragraphs)."""
-            
-            try:
-                response = self.model.generate_content(prompt)
-                return response.text
-            except Exception as e:
-                return f"Error generating summary: {str(e)}"
+SOURCES: {', '.join(sources)}"""
+        self.accounting.record_prompt("summary", {
+            "documents": estimate_tokens(combined_content),
+            "prompt": estimate_tokens(SYSTEM_INSTRUCTIONS["summary"]) + estimate_tokens(prompt),
+        })
         
-        return await asyncio.get_event_loop().run_in_executor(
-            self.executor, generate
-        )
+        try:
+            return (await self.background_scheduler.run({"kind": "summary", "prompt": prompt}))["text"]
+        except Exception as e:
+            if raise_errors:
+                raise
+            return f"Error generating summary: {str(e)}"
@@ -0,0 +1,862 @@
+import os
+import json
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from services.quantization import Quantizer, SCAN_BLOCK, create_quantizer
+
+try:
+    import hnswlib
+except ImportError:  # optional: only needed for large local collections
+    hnswlib = None
+
+
+class IndexBackend:
+    """Storage backend that hands out named collections.
+
+    Collections follow the subset of the Chroma collection API used by
+    VectorStore: add, query, get, delete and count, with Chroma-shaped
+    result dictionaries.
+    """
+
+    name = "base"
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict[str, Any]] = None):
+        raise NotImplementedError
+
+    def get_collection(self, name: str):
+        raise NotImplementedError
+
+    def delete_collection(self, name: str):
+        raise NotImplementedError
+
+    def list_collections(self) -> List[str]:
+        raise NotImplementedError
+
+    def close(self):
+        """Persist anything still buffered in memory"""
+
+
+class ChromaIndexBackend(IndexBackend):
+    """Collections stored in a chromadb.PersistentClient"""
+
+    name = "chroma"
+
+    def __init__(self, db_path: str):
+        import chromadb
+        from chromadb.config import Settings
+
+        self.client = chromadb.PersistentClient(
+            path=db_path,
+            settings=Settings(
+                anonymized_telemetry=False,
+                allow_reset=True
+            )
+        )
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict[str, Any]] = None):
+        try:
+            return self.client.get_collection(name=name)
+        except Exception:
+            return self.client.create_collection(name=name, metadata=metadata)
+
+    def get_collection(self, name: str):
+        return self.client.get_collection(name=name)
+
+    def delete_collection(self, name: str):
+        self.client.delete_collection(name=name)
+
+    def list_collections(self) -> List[str]:
+        return [c if isinstance(c, str) else c.name for c in self.client.list_collections()]
+
+    def close(self):
+        """Release the client's SQLite connection and segment files"""
+        if hasattr(self.client, "close"):
+            self.client.close()
+            return
+        # Clients without close(): stop the system (connections, segment writers) behind this path
+        system = getattr(self.client, "_system", None)
+        if system is not None:
+            system.stop()
+
+
+def _matches(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate the Chroma `where` subset we use: equality, $eq, $ne, $in, $gt, $lt, $and, $or"""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_matches(metadata, c) for c in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(metadata, c) for c in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if op == "$eq" and value != operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+                if op in ("$gt", "$gte", "$lt", "$lte") and (
+                        value is None or isinstance(value, str) != isinstance(operand, str)):
+                    return False
+                if op == "$gt" and not value > operand:
+                    return False
+                if op == "$gte" and not value >= operand:
+                    return False
+                if op == "$lt" and not value < operand:
+                    return False
+                if op == "$lte" and not value <= operand:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class SharedLock:
+    """Held by many threads in shared mode or by one in exclusive mode; waiting writers go first"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def shared(self):
+        with self._condition:
+            while self._writer or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+class LocalCollection:
+    """In-process vector collection.
+
+    Embeddings live in a float32 memory-mapped file (`vectors.f32`), one row per
+    chunk in insertion order. Ids, documents and metadata live in an append-only
+    JSON-lines side table (`rows.jsonl`) that is replayed into memory on open, so
+    queries never touch disk for metadata. The rows' squared norms are appended
+    to `norms.f32`, so opening a collection does not read every vector. Deletes
+    are tombstones; the files are rewritten once more than half of the rows are
+    dead.
+
+    Small collections are searched exactly with one matrix-vector product; once
+    the live row count reaches `hnsw_threshold` (and hnswlib is installed) an
+    HNSW graph is built and persisted next to the vectors. The graph is saved
+    every `hnsw_save_every` changed rows and on close; on open, rows added or
+    deleted since the last save are applied to it again.
+
+    With `compression` (float16, int8 or pq) the collection instead keeps only
+    compact codes in memory (`codes.bin`, trained once `train_size` rows exist):
+    a query scans the codes for `rerank_factor * k` candidates and re-scores
+    just those against the float32 memmap, so the full-precision vectors are
+    paged in lazily rather than held resident. Compressed collections do not
+    build an HNSW graph, which would hold another float32 copy of every vector.
+
+    A `read_only` collection maps its vectors read-only, refuses writes and
+    never retrains its quantizer.
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, path: str, metadata: Optional[Dict[str, Any]] = None,
+                 compression: Optional[str] = None, read_only: bool = False):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.read_only = read_only
+        self.hnsw_threshold = int(os.getenv("LOCAL_INDEX_HNSW_THRESHOLD", 20000))
+        self.hnsw_m = int(os.getenv("LOCAL_INDEX_HNSW_M", 16))
+        self.hnsw_ef_construction = int(os.getenv("LOCAL_INDEX_HNSW_EF_CONSTRUCTION", 200))
+        self.hnsw_ef_search = int(os.getenv("LOCAL_INDEX_HNSW_EF_SEARCH", 64))
+        self.hnsw_save_every = int(os.getenv("LOCAL_INDEX_HNSW_SAVE_EVERY", 10000))
+        self.compression = (compression or os.getenv("LOCAL_INDEX_COMPRESSION", "none")).lower()
+        self.rerank_factor = int(os.getenv("LOCAL_INDEX_RERANK_FACTOR", 10))
+        self.train_size = int(os.getenv("LOCAL_INDEX_TRAIN_SIZE", 4096))
+        self.pq_subspaces = int(os.getenv("LOCAL_INDEX_PQ_SUBSPACES", 96))
+        self._lock = threading.RLock()
+
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.alive = np.zeros(0, dtype=bool)
+        self.row_of: Dict[str, int] = {}
+        self.vectors = None
+        self.norms = np.zeros(0, dtype=np.float32)
+        self.dim = None
+        self.capacity = 0
+        self.hnsw = None
+        # Queries share the graph; resizing it and marking deletions take it exclusively
+        # (hnswlib supports add_items alongside queries, but not these)
+        self._hnsw_lock = SharedLock()
+        self._hnsw_unsaved = 0
+        self.quantizer: Optional[Quantizer] = None
+        self.codes: Optional[np.ndarray] = None
+
+        os.makedirs(path, exist_ok=True)
+        self._header_path = os.path.join(path, "header.json")
+        self._set_file_generation(0)
+        self._hnsw_path = os.path.join(path, "hnsw.bin")
+        self._quantizer_path = os.path.join(path, "quantizer.npz")
+        self._codes_path = os.path.join(path, "codes.bin")
+
+        if os.path.exists(self._header_path):
+            self._load()
+        else:
+            self.collection_metadata = metadata or {}
+            self._write_header()
+
+    # ------------------------------------------------------------------ storage
+
+    def _file_paths(self, generation: int):
+        """(rows, vectors, norms) paths of a file generation; compaction moves to the next one"""
+        if generation == 0:
+            return (os.path.join(self.path, "rows.jsonl"), os.path.join(self.path, "vectors.f32"),
+                    os.path.join(self.path, "norms.f32"))
+        return (os.path.join(self.path, f"rows.{generation}.jsonl"),
+                os.path.join(self.path, f"vectors.{generation}.f32"),
+                os.path.join(self.path, f"norms.{generation}.f32"))
+
+    def _set_file_generation(self, generation: int):
+        self.file_generation = generation
+        self._rows_path, self._vectors_path, self._norms_path = self._file_paths(generation)
+
+    def _remove_stale_files(self):
+        """Delete row, vector and norm files of other generations (left by a compaction or a crash during one)"""
+        current = {os.path.basename(p) for p in self._file_paths(self.file_generation)}
+        for entry in os.listdir(self.path):
+            if entry in current or not entry.startswith(("rows.", "vectors.", "norms.")):
+                continue
+            if entry.endswith(".jsonl") or entry.endswith(".f32"):
+                try:
+                    os.remove(os.path.join(self.path, entry))
+                except OSError:
+                    pass
+
+    def _write_header(self):
+        header = {
+            "dim": self.dim,
+            "capacity": self.capacity,
+            "file_generation": self.file_generation,
+            "metadata": self.collection_metadata,
+        }
+        tmp_path = self._header_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(header, f)
+        os.replace(tmp_path, self._header_path)
+
+    def _load(self):
+        with open(self._header_path, encoding="utf-8") as f:
+            header = json.load(f)
+        self.dim = header["dim"]
+        self.capacity = header["capacity"]
+        self.collection_metadata = header.get("metadata") or {}
+        self._set_file_generation(header.get("file_generation", 0))
+        if not self.read_only:
+            self._remove_stale_files()
+
+        alive = []
+        if os.path.exists(self._rows_path):
+            with open(self._rows_path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if "delete" in record:
+                        row = self.row_of.pop(record["delete"], None)
+                        if row is not None:
+                            alive[row] = False
+                        continue
+                    if "update" in record:
+                        row = self.row_of.get(record["update"])
+                        if row is not None:
+                            self.metadatas[row] = record["metadata"]
+                        continue
+                    self.row_of[record["id"]] = len(self.ids)
+                    self.ids.append(record["id"])
+                    self.documents.append(record["document"])
+                    self.metadatas.append(record["metadata"])
+                    alive.append(True)
+        self.alive = np.array(alive, dtype=bool)
+
+        if self.dim and self.capacity:
+            self.vectors = np.memmap(self._vectors_path, dtype=np.float32,
+                                     mode="r" if self.read_only else "r+",
+                                     shape=(self.capacity, self.dim))
+            self._load_norms()
+        if self.compression != "none":
+            self._load_codes()
+        elif hnswlib is not None and os.path.exists(self._hnsw_path) and self.dim:
+            self._load_hnsw()
+
+    def _load_hnsw(self):
+        """Open the saved graph and replay the adds and deletes made after it was saved"""
+        index = hnswlib.Index(space="l2", dim=self.dim)
+        index.load_index(self._hnsw_path, max_elements=max(self.capacity, 1))
+        n = len(self.ids)
+        saved = index.get_current_count()
+        if saved > n:
+            # Saved before a compaction renumbered the rows
+            if not self.read_only:
+                self._rebuild_hnsw()
+            return
+        if saved < n:
+            index.add_items(np.asarray(self.vectors[saved:n]), np.arange(saved, n))
+        for row in np.flatnonzero(~self.alive):
+            try:
+                index.mark_deleted(int(row))
+            except RuntimeError:
+                pass  # already deleted when the graph was saved
+        index.set_ef(self.hnsw_ef_search)
+        self.hnsw = index
+        if saved < n:
+            self._hnsw_unsaved = n - saved
+            self._save_hnsw()
+
+    def _load_norms(self):
+        """Read the rows' squared norms, recomputing them only if the file is missing or out of step"""
+        n = len(self.ids)
+        if os.path.exists(self._norms_path):
+            norms = np.fromfile(self._norms_path, dtype=np.float32)
+            if len(norms) == n:
+                self.norms = norms
+                return
+        # A collection from before norms were stored, or a crash between appends
+        self.norms = np.concatenate([
+            np.einsum("ij,ij->i", block, block)
+            for block in (np.asarray(self.vectors[start:min(start + SCAN_BLOCK, n)])
+                          for start in range(0, n, SCAN_BLOCK))
+        ]).astype(np.float32) if n else np.zeros(0, dtype=np.float32)
+        if not self.read_only:
+            tmp_path = self._norms_path + ".tmp"
+            self.norms.tofile(tmp_path)
+            os.replace(tmp_path, self._norms_path)
+
+    # ------------------------------------------------------------- compression
+
+    def _load_codes(self):
+        """Restore a trained quantizer and its codes, or retrain if the setting changed.
+
+        A read-only collection never retrains: without matching codes it is
+        searched exactly.
+        """
+        if not self.dim:
+            return
+        self.quantizer = create_quantizer(self.compression, self.dim, self.pq_subspaces)
+        if os.path.exists(self._quantizer_path) and os.path.exists(self._codes_path):
+            with np.load(self._quantizer_path) as saved:
+                state = {key: saved[key] for key in saved.files}
+            if str(state.pop("kind")) == self.compression:
+                self.quantizer.load_state(state)
+                codes = np.fromfile(self._codes_path, dtype=self.quantizer.code_dtype)
+                codes = codes.reshape(-1, self.quantizer.code_width)
+                if len(codes) == len(self.ids):
+                    self.codes = codes
+                    return
+        if not self.read_only:
+            self._train_quantizer()
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.concatenate([
+            self.quantizer.encode(np.asarray(vectors[start:start + SCAN_BLOCK], dtype=np.float32))
+            for start in range(0, len(vectors), SCAN_BLOCK)
+        ]) if len(vectors) else np.zeros((0, self.quantizer.code_width), dtype=self.quantizer.code_dtype)
+
+    def _write_codes(self):
+        tmp_path = self._quantizer_path + ".tmp.npz"
+        np.savez(tmp_path, kind=np.array(self.compression), **self.quantizer.state())
+        os.replace(tmp_path, self._quantizer_path)
+        tmp_path = self._codes_path + ".tmp"
+        self.codes.tofile(tmp_path)
+        os.replace(tmp_path, self._codes_path)
+
+    def _train_quantizer(self):
+        """Fit the quantizer on a sample of live rows and encode every stored row"""
+        self.codes = None
+        for stale in (self._quantizer_path, self._codes_path):
+            if os.path.exists(stale):
+                os.remove(stale)
+        n = len(self.ids)
+        live = np.flatnonzero(self.alive)
+        if self.quantizer is None or (self.quantizer.needs_training and len(live) < max(self.train_size, 1)):
+            return
+        if self.quantizer.needs_training:
+            rng = np.random.default_rng(0)
+            sample_rows = np.sort(rng.choice(live, size=min(len(live), max(self.train_size, 1)), replace=False))
+            self.quantizer.train(np.asarray(self.vectors[sample_rows], dtype=np.float32))
+        self.codes = self._encode(self.vectors[:n])
+        self._write_codes()
+
+    def _add_codes(self, vectors: np.ndarray):
+        if self.quantizer is None:
+            self.quantizer = create_quantizer(self.compression, self.dim, self.pq_subspaces)
+        if self.codes is None:
+            self._train_quantizer()
+            return
+        codes = self._encode(vectors)
+        with open(self._codes_path, "ab") as f:
+            codes.tofile(f)
+        self.codes = np.concatenate([self.codes, codes])
+
+    def index_stats(self) -> Dict[str, Any]:
+        """Memory footprint of the search structures, with and without compression"""
+        with self._lock:
+            n = len(self.ids)
+            full_bytes = n * (self.dim or 0) * 4
+            code_bytes = int(self.codes.nbytes) if self.codes is not None else None
+            resident = code_bytes if code_bytes is not None else full_bytes
+            return {
+                "rows": n,
+                "dim": self.dim,
+                "compression": self.compression,
+                "compression_active": self.codes is not None,
+                "search": "hnsw" if self.hnsw is not None else ("compressed+rerank" if self.codes is not None else "exact"),
+                "full_precision_bytes": full_bytes,
+                "code_bytes": code_bytes,
+                "resident_vector_bytes": resident,
+                "saved_bytes": full_bytes - resident,
+                "compression_ratio": round(full_bytes / resident, 1) if resident else None,
+            }
+
+    def _ensure_capacity(self, needed: int):
+        if needed <= self.capacity:
+            return
+        new_capacity = max(self.INITIAL_CAPACITY, self.capacity)
+        while new_capacity < needed:
+            new_capacity *= 2
+        if self.vectors is not None:
+            self.vectors.flush()
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        # Readers holding the old map keep a valid view of the old rows
+        self.vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                 shape=(new_capacity, self.dim))
+        self.capacity = new_capacity
+        if self.hnsw is not None:
+            with self._hnsw_lock.exclusive():
+                self.hnsw.resize_index(new_capacity)
+        self._write_header()
+
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError(f"Collection {self.name} is read-only")
+
+    def _append_rows(self, records: List[Dict[str, Any]]):
+        with open(self._rows_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _compact(self):
+        """Rewrite vectors and side table without tombstoned rows.
+
+        The compacted rows go to the files of the next generation, which the
+        header switch commits in one atomic replace, so a crash leaves either
+        the old files or the new ones in use. The new arrays are then
+        published the way `add` publishes them: searches running on an
+        earlier `_snapshot()` keep the old map and arrays, which stay valid
+        after the old files are unlinked.
+        """
+        live = np.flatnonzero(self.alive)
+        generation = self.file_generation + 1
+        rows_path, vectors_path, norms_path = self._file_paths(generation)
+        ids = [self.ids[i] for i in live]
+        documents = [self.documents[i] for i in live]
+        metadatas = [self.metadatas[i] for i in live]
+
+        with open(rows_path, "w", encoding="utf-8") as f:
+            for doc_id, document, metadata in zip(ids, documents, metadatas):
+                f.write(json.dumps({"id": doc_id, "document": document, "metadata": metadata},
+                                   ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        vectors = None
+        if self.vectors is not None:
+            with open(vectors_path, "wb") as f:
+                f.truncate(self.capacity * self.dim * 4)
+            vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dim))
+            for start in range(0, len(live), SCAN_BLOCK):
+                block = live[start:start + SCAN_BLOCK]
+                vectors[start:start + len(block)] = self.vectors[block]
+            vectors.flush()
+        norms = self.norms[live]
+        norms.tofile(norms_path)
+
+        # The graph's labels are row numbers of the old generation
+        self.hnsw = None
+        if os.path.exists(self._hnsw_path):
+            os.remove(self._hnsw_path)
+        self._set_file_generation(generation)
+        self._write_header()
+
+        if vectors is not None:
+            self.vectors = vectors
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.row_of = {doc_id: row for row, doc_id in enumerate(ids)}
+        self.alive = np.ones(len(ids), dtype=bool)
+        self.norms = norms
+        self._remove_stale_files()
+        if self.codes is not None:
+            self.codes = self.codes[live]
+            self._write_codes()
+        self._rebuild_hnsw()
+
+    def _rebuild_hnsw(self):
+        self.hnsw = None
+        if os.path.exists(self._hnsw_path):
+            os.remove(self._hnsw_path)
+        if (hnswlib is None or self.dim is None or self.compression != "none"
+                or int(self.alive.sum()) < self.hnsw_threshold):
+            return
+        index = hnswlib.Index(space="l2", dim=self.dim)
+        index.init_index(max_elements=self.capacity, ef_construction=self.hnsw_ef_construction,
+                         M=self.hnsw_m)
+        n = len(self.ids)
+        index.add_items(np.asarray(self.vectors[:n]), np.arange(n))
+        for row in np.flatnonzero(~self.alive):
+            index.mark_deleted(int(row))
+        index.set_ef(self.hnsw_ef_search)
+        index.save_index(self._hnsw_path)
+        self.hnsw = index
+        self._hnsw_unsaved = 0
+
+    def _hnsw_changed(self, rows: int):
+        """Count rows changed in the graph and save it once `hnsw_save_every` have built up"""
+        self._hnsw_unsaved += rows
+        if self._hnsw_unsaved >= self.hnsw_save_every:
+            self._save_hnsw()
+
+    def _save_hnsw(self):
+        if self.hnsw is not None and self._hnsw_unsaved and not self.read_only:
+            self.hnsw.save_index(self._hnsw_path)
+        self._hnsw_unsaved = 0
+
+    # ---------------------------------------------------------------- collection API
+
+    def count(self) -> int:
+        return int(self.alive.sum())
+
+    def add(self, ids: List[str], embeddings: List[List[float]],
+            metadatas: Optional[List[Dict[str, Any]]] = None,
+            documents: Optional[List[str]] = None):
+        self._check_writable()
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        metadatas = metadatas or [{} for _ in ids]
+        documents = documents or ["" for _ in ids]
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimension {self.dim}")
+            duplicates = [doc_id for doc_id in ids if doc_id in self.row_of]
+            if duplicates:
+                raise ValueError(f"IDs already exist in collection: {duplicates[:5]}")
+
+            start = len(self.ids)
+            end = start + len(ids)
+            self._ensure_capacity(end)
+            self.vectors[start:end] = vectors
+            self.vectors.flush()
+
+            self._append_rows([
+                {"id": doc_id, "document": document, "metadata": metadata}
+                for doc_id, document, metadata in zip(ids, documents, metadatas)
+            ])
+            for offset, doc_id in enumerate(ids):
+                self.row_of[doc_id] = start + offset
+            self.ids.extend(ids)
+            self.documents.extend(documents)
+            self.metadatas.extend(metadatas)
+            self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+            norms = np.einsum("ij,ij->i", vectors, vectors).astype(np.float32)
+            with open(self._norms_path, "ab") as f:
+                norms.tofile(f)
+            self.norms = np.concatenate([self.norms, norms])
+
+            if self.compression != "none":
+                self._add_codes(vectors)
+            elif self.hnsw is not None:
+                self.hnsw.add_items(vectors, np.arange(start, end))
+                self._hnsw_changed(len(ids))
+            elif hnswlib is not None and self.count() >= self.hnsw_threshold:
+                self._rebuild_hnsw()
+
+    def _rows_for(self, ids: Optional[List[str]], where: Optional[Dict[str, Any]]) -> List[int]:
+        if ids is not None:
+            rows = [self.row_of[i] for i in ids if i in self.row_of]
+        else:
+            rows = np.flatnonzero(self.alive).tolist()
+        if where:
+            rows = [row for row in rows if _matches(self.metadatas[row], where)]
+        return rows
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            include: Optional[List[str]] = None) -> Dict[str, Any]:
+        include = include if include is not None else ["documents", "metadatas"]
+        with self._lock:
+            rows = self._rows_for(ids, where)
+            if offset:
+                rows = rows[offset:]
+            if limit is not None:
+                rows = rows[:limit]
+            return {
+                "ids": [self.ids[r] for r in rows],
+                "documents": [self.documents[r] for r in rows] if "documents" in include else None,
+                "metadatas": [self.metadatas[r] for r in rows] if "metadatas" in include else None,
+                # One array like Chroma returns, read from the memmap in a single gather
+                "embeddings": (np.array(self.vectors[rows], dtype=np.float32) if rows
+                               else np.zeros((0, self.dim or 0), dtype=np.float32)) if "embeddings" in include else None,
+            }
+
+    def update(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Replace the metadata of existing rows (unknown ids are ignored)"""
+        self._check_writable()
+        with self._lock:
+            records = [{"update": doc_id, "metadata": metadata}
+                       for doc_id, metadata in zip(ids, metadatas) if doc_id in self.row_of]
+            if not records:
+                return
+            self._append_rows(records)
+            for record in records:
+                self.metadatas[self.row_of[record["update"]]] = record["metadata"]
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        self._check_writable()
+        with self._lock:
+            rows = self._rows_for(ids, where)
+            if not rows:
+                return
+            self._append_rows([{"delete": self.ids[r]} for r in rows])
+            for row in rows:
+                self.alive[row] = False
+                self.row_of.pop(self.ids[row], None)
+            if self.hnsw is not None:
+                with self._hnsw_lock.exclusive():
+                    for row in rows:
+                        self.hnsw.mark_deleted(row)
+            if self.alive.size and self.count() < self.alive.size / 2:
+                self._compact()
+            elif self.hnsw is not None:
+                self._hnsw_changed(len(rows))
+
+    def _snapshot(self) -> Dict[str, Any]:
+        """Capture the arrays a search needs so the search can run unlocked.
+
+        Appends replace `alive`/`norms` with new arrays and growth maps a new
+        file view, so references taken here stay valid while writers proceed.
+        Deletes clear `alive` in place, so it is copied. The HNSW graph is
+        shared: rows added after the snapshot are filtered out of its results.
+        """
+        with self._lock:
+            return {
+                "n": len(self.ids),
+                "ids": self.ids,
+                "documents": self.documents,
+                "metadatas": self.metadatas,
+                "alive": self.alive.copy(),
+                "norms": self.norms,
+                "vectors": self.vectors,
+                "codes": self.codes,
+                "hnsw": self.hnsw,
+            }
+
+    def _search_rows(self, state: Dict[str, Any], query: np.ndarray, k: int,
+                     mask: Optional[np.ndarray]):
+        """Return (rows, squared L2 distances) of the k nearest live rows"""
+        n = state["n"]
+        if n == 0 or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        allowed = state["alive"][:n] if mask is None else (state["alive"][:n] & mask)
+        live = int(allowed.sum())
+        if live == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        k = min(k, live)
+
+        hnsw = state["hnsw"]
+        if hnsw is not None:
+            found = self._search_hnsw(hnsw, query, k, n, allowed, mask is not None)
+            if found is not None:
+                return found
+
+        codes = state["codes"]
+        if codes is not None and len(codes) >= n:
+            return self._search_codes(state, codes[:n], query, k, allowed)
+
+        distances = state["norms"][:n] - 2.0 * (state["vectors"][:n] @ query) + float(query @ query)
+        distances = np.where(allowed, distances, np.inf)
+        top = np.argpartition(distances, k - 1)[:k] if k < n else np.arange(n)
+        top = top[np.argsort(distances[top])]
+        top = top[np.isfinite(distances[top])]
+        return top, np.maximum(distances[top], 0.0)
+
+    def _search_hnsw(self, hnsw, query: np.ndarray, k: int, n: int, allowed: np.ndarray, filtered: bool):
+        """k nearest rows below `n` from the graph, or None when it cannot answer (search exactly instead)"""
+        with self._hnsw_lock.shared():
+            if filtered:
+                # Only snapshot rows pass the filter, so every hit counts
+                fetch = k
+                accept = lambda row: row < n and bool(allowed[row])
+            else:
+                # Rows added since the snapshot can take some of the k places; fetch enough to replace them
+                fetch = k + max(0, hnsw.get_current_count() - n)
+                accept = None
+            while True:
+                try:
+                    labels, distances = hnsw.knn_query(query, k=fetch, filter=accept)
+                except RuntimeError:
+                    # Fewer than `fetch` reachable matches (a narrow filter, or many deletes)
+                    return None
+                labels, distances = labels[0].astype(np.int64), distances[0]
+                keep = labels < n
+                if keep.sum() >= k or fetch >= hnsw.get_current_count():
+                    return labels[keep][:k], distances[keep][:k]
+                fetch = min(fetch * 2, hnsw.get_current_count())
+
+    def _search_codes(self, state: Dict[str, Any], codes: np.ndarray, query: np.ndarray,
+                      k: int, allowed: np.ndarray):
+        """Approximate scan over compressed codes, then exact re-scoring of the best candidates"""
+        n = len(codes)
+        approx = np.where(allowed, self.quantizer.distances(query, codes, state["norms"][:n]), np.inf)
+        candidates = min(n, k * self.rerank_factor) if self.rerank_factor > 0 else k
+        rows = np.argpartition(approx, candidates - 1)[:candidates] if candidates < n else np.arange(n)
+        rows = rows[np.isfinite(approx[rows])]
+        if self.rerank_factor <= 0:
+            rows = rows[np.argsort(approx[rows])][:k]
+            return rows, np.maximum(approx[rows], 0.0)
+
+        # Sorted rows keep the memmap reads sequential; only these rows are paged in
+        rows.sort()
+        exact = np.asarray(state["vectors"][rows], dtype=np.float32) - query
+        distances = np.einsum("ij,ij->i", exact, exact)
+        order = np.argsort(distances)[:k]
+        return rows[order], distances[order]
+
+    def query(self, query_embeddings: List[List[float]], n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None,
+              include: Optional[List[str]] = None) -> Dict[str, Any]:
+        include = include if include is not None else ["documents", "metadatas", "distances"]
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        state = self._snapshot()
+        mask = None
+        if where:
+            mask = np.fromiter((_matches(m, where) for m in state["metadatas"][:state["n"]]),
+                               dtype=bool, count=state["n"])
+        for query in queries:
+            rows, distances = self._search_rows(state, query, n_results, mask)
+            result["ids"].append([state["ids"][r] for r in rows])
+            result["documents"].append([state["documents"][r] for r in rows])
+            result["metadatas"].append([state["metadatas"][r] for r in rows])
+            result["distances"].append([float(d) for d in distances])
+        for key in ("documents", "metadatas", "distances"):
+            if key not in include:
+                result[key] = None
+        return result
+
+    def close(self):
+        with self._lock:
+            if self.vectors is not None and not self.read_only:
+                self.vectors.flush()
+            self._save_hnsw()
+
+
+class LocalIndexBackend(IndexBackend):
+    """Collections stored as LocalCollection directories under `<db_path>/local`
+
+    A `read_only` backend opens existing collections read-only and creates none.
+    """
+
+    name = "local"
+
+    def __init__(self, db_path: str, compression: Optional[str] = None, read_only: bool = False):
+        self.root = os.path.join(db_path, "local")
+        self.compression = compression
+        self.read_only = read_only
+        os.makedirs(self.root, exist_ok=True)
+        self._collections: Dict[str, LocalCollection] = {}
+        self._lock = threading.Lock()
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            if name not in self._collections:
+                path = os.path.join(self.root, name)
+                if self.read_only and not os.path.isdir(path):
+                    raise PermissionError(f"Cannot create collection {name} in a read-only index")
+                self._collections[name] = LocalCollection(path, metadata, self.compression,
+                                                          read_only=self.read_only)
+            return self._collections[name]
+
+    def get_collection(self, name: str):
+        if not os.path.isdir(os.path.join(self.root, name)):
+            raise ValueError(f"Collection {name} does not exist.")
+        return self.get_or_create_collection(name)
+
+    def delete_collection(self, name: str):
+        if self.read_only:
+            raise PermissionError(f"Cannot delete collection {name} from a read-only index")
+        with self._lock:
+            collection = self._collections.pop(name, None)
+            if collection is not None:
+                collection.close()
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def list_collections(self) -> List[str]:
+        return sorted(
+            entry for entry in os.listdir(self.root)
+            if os.path.isdir(os.path.join(self.root, entry))
+        )
+
+    def close(self):
+        with self._lock:
+            for collection in self._collections.values():
+                collection.close()
+
+
+def create_backend(db_path: str, backend: Optional[str] = None, read_only: bool = False) -> IndexBackend:
+    """Build the index backend selected by VECTOR_BACKEND (chroma or local).
+
+    `read_only` opens local collections read-only; Chroma has no such mode,
+    so for it VectorStore's own read-only checks are the only guard.
+    """
+    backend = (backend or os.getenv("VECTOR_BACKEND", "chroma")).lower()
+    if backend == "chroma":
+        return ChromaIndexBackend(db_path)
+    if backend == "local":
+        return LocalIndexBackend(db_path, read_only=read_only)
+    raise ValueError(f"Unsupported VECTOR_BACKEND: {backend}")
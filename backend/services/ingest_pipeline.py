@@ -0,0 +1,157 @@
+import os
+import time
+import asyncio
+from typing import List, Dict, Any, Callable, Awaitable, Optional
+
+STAGES = ("parse", "chunk", "embed", "write")
+
+
+class IngestPipeline:
+    """Staged, concurrent ingestion of the files of one upload.
+
+    Each file moves through parse -> chunk -> embed -> write. Every stage has its
+    own pool of worker coroutines (the blocking work itself runs on the
+    DocumentProcessor / VectorStore executors) and stages are connected by
+    bounded queues, so while one file is being embedded the next can already be
+    parsed, and a slow stage applies backpressure instead of letting parsed
+    files pile up in memory. The embed stage also drains whatever files are
+    already waiting and encodes them in one batch.
+
+    A file that fails in any stage carries its exception through the remaining
+    stages untouched; the other files are unaffected.
+    """
+
+    def __init__(self, document_processor, vector_store):
+        self.document_processor = document_processor
+        self.vector_store = vector_store
+        self.workers = {
+            stage: max(1, int(os.getenv(f"INGEST_{stage.upper()}_WORKERS", default)))
+            for stage, default in zip(STAGES, (2, 2, 1, 1))
+        }
+        self.queue_size = max(1, int(os.getenv("INGEST_QUEUE_SIZE", 4)))
+        self.embed_max_files = max(1, int(os.getenv("INGEST_EMBED_MAX_FILES", 8)))
+
+    async def _parse(self, items: List[Dict[str, Any]]):
+        item = items[0]
+        item["parsed"] = await self.document_processor.parse_document(item["path"], item["filename"])
+
+    async def _chunk(self, items: List[Dict[str, Any]]):
+        item = items[0]
+        chunks = await asyncio.get_event_loop().run_in_executor(
+            self.document_processor.executor,
+            self.document_processor.chunk_document, item.pop("parsed"), item["filename"]
+        )
+        for chunk in chunks:
+            chunk["metadata"]["content_hash"] = item["content_hash"]
+            chunk["metadata"]["file_size"] = item["size"]
+        item["chunks"] = chunks
+
+    async def _embed(self, items: List[Dict[str, Any]]):
+        embeddings, model_name = await self.vector_store.embed_documents(
+            [(item["chunks"], item["filename"]) for item in items]
+        )
+        offset = 0
+        for item in items:
+            item["embeddings"] = embeddings[offset:offset + len(item["chunks"])]
+            item["embedding_model"] = model_name
+            offset += len(item["chunks"])
+
+    async def _write(self, items: List[Dict[str, Any]], namespace: str):
+        item = items[0]
+        written = await self.vector_store.write_documents(
+            [(item["chunks"], item["filename"])], item.pop("embeddings"), namespace,
+            item.pop("embedding_model")
+        )
+        item["duplicates"] = written["duplicates"]
+
+    async def _run_stage(self, name: str, work: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+                         inbox: asyncio.Queue, outbox: Optional[asyncio.Queue], downstream_workers: int,
+                         results: List[Dict[str, Any]], stats: Dict[str, Any],
+                         downstream_stats: Optional[Dict[str, Any]], max_batch: int = 1):
+        async def worker():
+            finished = False
+            while not finished:
+                item = await inbox.get()
+                if item is None:
+                    break
+                batch = [item]
+                # Take files that are already waiting, never wait for more
+                while len(batch) < max_batch and not inbox.empty():
+                    extra = inbox.get_nowait()
+                    if extra is None:
+                        finished = True
+                        break
+                    batch.append(extra)
+
+                runnable = [i for i in batch if "error" not in i]
+                if runnable:
+                    started = time.perf_counter()
+                    try:
+                        await work(runnable)
+                    except Exception as e:
+                        for i in runnable:
+                            i["error"] = e
+                    stats["busy_s"] += time.perf_counter() - started
+                    stats["items"] += len(runnable)
+                    stats["calls"] += 1
+
+                for i in batch:
+                    if outbox is None:
+                        results.append(i)
+                    else:
+                        await outbox.put(i)
+                        # Backlog in front of the next stage (sentinels only follow the last file)
+                        downstream_stats["max_queue_depth"] = max(downstream_stats["max_queue_depth"], outbox.qsize())
+
+        await asyncio.gather(*(worker() for _ in range(self.workers[name])))
+        if outbox is not None:
+            for _ in range(downstream_workers):
+                await outbox.put(None)
+
+    async def run(self, files: List[Dict[str, Any]], namespace: str):
+        """Ingest `files` ({filename, path, content_hash, ...}); returns (files in input order, stage stats).
+
+        Each returned file has either `chunks` (and `duplicates`, how many of
+        them were near duplicates of stored chunks) or `error` set.
+        """
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in STAGES]
+        results: List[Dict[str, Any]] = []
+        stats = {
+            stage: {"workers": self.workers[stage], "items": 0, "calls": 0, "busy_s": 0.0, "max_queue_depth": 0}
+            for stage in STAGES
+        }
+        work = {
+            "parse": self._parse,
+            "chunk": self._chunk,
+            "embed": self._embed,
+            "write": lambda items: self._write(items, namespace),
+        }
+
+        async def feed():
+            for position, item in enumerate(files):
+                item["position"] = position
+                await queues[0].put(item)
+                stats[STAGES[0]]["max_queue_depth"] = max(stats[STAGES[0]]["max_queue_depth"], queues[0].qsize())
+            for _ in range(self.workers[STAGES[0]]):
+                await queues[0].put(None)
+
+        started = time.perf_counter()
+        await asyncio.gather(feed(), *(
+            self._run_stage(
+                stage, work[stage], queues[i],
+                queues[i + 1] if i + 1 < len(STAGES) else None,
+                self.workers[STAGES[i + 1]] if i + 1 < len(STAGES) else 0,
+                results, stats[stage], stats[STAGES[i + 1]] if i + 1 < len(STAGES) else None,
+                max_batch=self.embed_max_files if stage == "embed" else 1,
+            )
+            for i, stage in enumerate(STAGES)
+        ))
+        wall = time.perf_counter() - started
+
+        for stage_stats in stats.values():
+            busy = stage_stats.pop("busy_s")
+            stage_stats["busy_ms"] = round(busy * 1000, 1)
+            # Fraction of the stage's worker capacity that was spent working
+            stage_stats["utilization"] = round(busy / (wall * stage_stats["workers"]), 3) if wall else 0.0
+        results.sort(key=lambda item: item.pop("position"))
+        return results, {"wall_ms": round(wall * 1000, 1), "stages": stats}
@@ -0,0 +1,217 @@
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from concurrent.futures import Executor
+from typing import Callable, Dict, Any, Optional
+
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the model while the circuit breaker is open"""
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether an LLM error is worth retrying (rate limits, overload, timeouts)"""
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None)
+    if code is None:
+        code = getattr(error, "status_code", None)
+    try:
+        return int(code) in TRANSIENT_STATUS_CODES
+    except (TypeError, ValueError):
+        return False
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+        return ordered[rank]
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    Closed: calls pass. After `failure_threshold` consecutive transient failures
+    it opens and rejects calls for `cooldown` seconds, then lets a single probe
+    through (half-open); the probe's outcome closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = "half_open"
+            self.probe_in_flight = False
+        if self.state == "half_open" and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.probe_in_flight = False
+
+
+class LLMScheduler:
+    """Runs blocking model calls on an executor with retries, hedging and a circuit breaker.
+
+    - Transient errors (429/5xx/timeouts) are retried with full-jitter
+      exponential backoff, up to `max_retries` times.
+    - If an attempt has not finished by the observed p95 latency (never sooner
+      than `hedge_min_delay`), one duplicate request is started and whichever
+      finishes first wins. The loser keeps its executor thread until it returns.
+    - Consecutive transient failures open the circuit breaker; while it is open
+      `run` raises CircuitOpenError immediately so callers can fall back.
+    """
+
+    def __init__(self, call: Callable[[Any], Any], executor: Executor):
+        self.call = call
+        self.executor = executor
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", 3))
+        self.backoff_base = float(os.getenv("LLM_BACKOFF_BASE", 0.5))
+        self.backoff_max = float(os.getenv("LLM_BACKOFF_MAX", 8.0))
+        self.timeout = float(os.getenv("LLM_TIMEOUT", 60.0))
+        self.hedge_enabled = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+        self.hedge_percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))
+        self.hedge_min_delay = float(os.getenv("LLM_HEDGE_MIN_DELAY", 1.0))
+        self.hedge_min_samples = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", 5)),
+            cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN", 30.0)),
+        )
+        self.latency = LatencyTracker()
+        self.stats = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "rejected_open": 0,
+        }
+
+    def hedge_delay(self) -> Optional[float]:
+        if not self.hedge_enabled or len(self.latency.samples) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self.latency.percentile(self.hedge_percentile))
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _timed_call(self, prompt: Any) -> Any:
+        start = time.monotonic()
+        result = self.call(prompt)
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    def _submit(self, prompt: Any) -> asyncio.Future:
+        future = asyncio.get_event_loop().run_in_executor(self.executor, self._timed_call, prompt)
+        # Losing hedges are never awaited; retrieve their exceptions so they aren't logged
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return future
+
+    async def _attempt(self, prompt: Any) -> Any:
+        """One logical attempt: the primary call plus at most one hedge"""
+        started = time.monotonic()
+        primary = self._submit(prompt)
+        pending = {primary}
+        hedge_delay = self.hedge_delay()
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        while pending:
+            remaining = self.timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"LLM call exceeded {self.timeout:.0f}s")
+            wait = remaining
+            if not hedged and hedge_delay is not None:
+                wait = min(wait, max(0.0, hedge_delay - (time.monotonic() - started)))
+            done, pending = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                if not hedged and hedge_delay is not None:
+                    hedged = True
+                    self.stats["hedges"] += 1
+                    pending.add(self._submit(prompt))
+                continue
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        self.stats["hedge_wins"] += 1
+                    return future.result()
+                last_error = future.exception()
+        raise last_error
+
+    async def run(self, prompt: Any) -> Any:
+        """Call the model with retries/hedging; raises CircuitOpenError or the last error"""
+        self.stats["calls"] += 1
+        if not self.breaker.allow():
+            self.stats["rejected_open"] += 1
+            raise CircuitOpenError("LLM circuit breaker is open")
+
+        attempt = 0
+        while True:
+            try:
+                result = await self._attempt(prompt)
+            except Exception as e:
+                if not is_transient(e):
+                    # Bad requests say nothing about API health; don't trip the breaker
+                    self.breaker.probe_in_flight = False
+                    self.stats["failures"] += 1
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_retries or self.breaker.state == "open":
+                    self.stats["failures"] += 1
+                    raise
+                self.stats["retries"] += 1
+                await asyncio.sleep(self.backoff(attempt))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            self.stats["successes"] += 1
+            return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        p50 = self.latency.percentile(50)
+        p95 = self.latency.percentile(95)
+        return {
+            **self.stats,
+            "breaker_state": self.breaker.state,
+            "breaker_times_opened": self.breaker.times_opened,
+            "latency_p50_ms": p50 * 1000 if p50 is not None else None,
+            "latency_p95_ms": p95 * 1000 if p95 is not None else None,
+            "hedge_delay_ms": (self.hedge_delay() or 0) * 1000 or None,
+        }
@@ -0,0 +1,115 @@
+import os
+import re
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Optional, Tuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+# Per worker process: (chunk_size, chunk_overlap, separators) -> splitter
+_splitters: Dict[Tuple, RecursiveCharacterTextSplitter] = {}
+
+
+def _split_job(config: Tuple[int, int, Tuple[str, ...]], units: List[str]) -> List[List[str]]:
+    """Worker side: split each independent unit on its own"""
+    splitter = _splitters.get(config)
+    if splitter is None:
+        chunk_size, chunk_overlap, separators = config
+        splitter = _splitters[config] = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len,
+            separators=list(separators)
+        )
+    return [splitter.split_text(unit) for unit in units]
+
+
+def independent_units(text: str, separator: str, chunk_size: int) -> List[str]:
+    """Cut `text` into consecutive pieces that a RecursiveCharacterTextSplitter splits independently.
+
+    The splitter cuts the text at every `separator` (kept at the start of the
+    following piece), merges runs of pieces shorter than chunk_size into
+    chunks with overlap, and splits each longer piece (a page or paragraph of
+    at least a chunk) on its own, starting the next run afresh. So each long
+    piece, and each run of short pieces between them, produces exactly the
+    chunks it produces in a split of the whole text.
+    """
+    starts = [0] + [match.start() for match in re.finditer(re.escape(separator), text) if match.start() > 0]
+    bounds = starts + [len(text)]
+    units = []
+    run_start = None
+    for start, end in zip(bounds, bounds[1:]):
+        if end - start < chunk_size:
+            if run_start is None:
+                run_start = start
+            continue
+        if run_start is not None:
+            units.append(text[run_start:start])
+            run_start = None
+        units.append(text[start:end])
+    if run_start is not None:
+        units.append(text[run_start:])
+    return [unit for unit in units if unit]
+
+
+class ParallelSplitter:
+    """Splits very large texts across a process pool, with the same chunks a serial split gives.
+
+    Texts of at least CHUNK_SPLIT_MIN_CHARS are cut at paragraph breaks
+    (which include the page markers of extracted PDFs) into units that the
+    splitter handles independently (see `independent_units`), and the units
+    are split in CHUNK_SPLIT_WORKERS processes. Smaller texts, texts without
+    such breaks and CHUNK_SPLIT_WORKERS <= 1 use the serial splitter. The
+    pool is started on first use; if it breaks, the split is redone serially.
+    """
+
+    def __init__(self, splitter: RecursiveCharacterTextSplitter, chunk_size: int, chunk_overlap: int,
+                 separators: List[str]):
+        self.splitter = splitter
+        self.config = (chunk_size, chunk_overlap, tuple(separators))
+        self.workers = int(os.getenv("CHUNK_SPLIT_WORKERS", min(4, os.cpu_count() or 1)))
+        self.min_chars = int(os.getenv("CHUNK_SPLIT_MIN_CHARS", 500000))
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.pool is None:
+                # Spawned rather than forked: the server process has many threads
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self.pool
+
+    def _reset_pool(self):
+        with self.lock:
+            if self.pool is not None:
+                self.pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = None
+
+    def split_text(self, text: str) -> List[str]:
+        chunk_size, _, separators = self.config
+        if self.workers <= 1 or len(text) < self.min_chars or not separators or separators[0] not in text:
+            return self.splitter.split_text(text)
+        units = independent_units(text, separators[0], chunk_size)
+        if len(units) < 2:
+            return self.splitter.split_text(text)
+
+        # A few jobs per worker of about equal size, each a consecutive run of units
+        job_chars = len(text) / (self.workers * 4)
+        jobs: List[List[str]] = [[]]
+        size = 0
+        for unit in units:
+            if size >= job_chars:
+                jobs.append([])
+                size = 0
+            jobs[-1].append(unit)
+            size += len(unit)
+
+        try:
+            pool = self._get_pool()
+            results = list(pool.map(_split_job, [self.config] * len(jobs), jobs))
+        except BrokenProcessPool:
+            self._reset_pool()
+            return self.splitter.split_text(text)
+        return [chunk for job in results for unit_chunks in job for chunk in unit_chunks]
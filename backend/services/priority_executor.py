@@ -0,0 +1,185 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, Any, Optional
+
+from services.llm_scheduler import LatencyTracker
+
+# name -> (priority, default concurrency limit); a lower priority value runs first
+TASK_CLASSES = {
+    "interactive": (0, None),  # chat retrieval, query embedding, stats
+    "llm": (1, 4),             # blocking Gemini calls for chat (mostly waiting on the network)
+    "background": (2, 4),      # parsing, chunking, embedding and writing uploads, admin jobs
+    "llm_background": (3, 2),  # Gemini calls nobody is waiting on (post-upload summaries)
+}
+
+
+class TaskClass:
+    def __init__(self, name: str, priority: int, limit: int):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.queue = deque()
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queued = 0
+        self.busy_seconds = 0.0
+        self.queue_wait = LatencyTracker(window=500)
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.queue_wait.percentile(50)
+        p95 = self.queue_wait.percentile(95)
+        return {
+            "priority": self.priority,
+            "limit": self.limit,
+            "running": self.running,
+            "queued": len(self.queue),
+            "max_queued": self.max_queued,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "busy_ms": round(self.busy_seconds * 1000, 1),
+            "queue_wait_p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+            "queue_wait_p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+        }
+
+
+class PriorityExecutor:
+    """One thread pool shared by every service, scheduling work by priority class.
+
+    A free worker always takes the oldest task of the highest-priority class
+    that is below its concurrency limit, so chat retrieval queued behind a
+    large upload starts as soon as any worker frees up, and background work
+    can never hold more than its limit of threads. Services use
+    `executor.view(class)`, a regular `concurrent.futures.Executor` that can be
+    passed to `loop.run_in_executor`.
+
+    Sizes come from TASK_WORKERS and TASK_LIMIT_<CLASS>.
+    """
+
+    def __init__(self, workers: Optional[int] = None, limits: Optional[Dict[str, int]] = None):
+        self.workers = workers or int(os.getenv("TASK_WORKERS", 10))
+        limits = limits or {}
+        self.classes: Dict[str, TaskClass] = {}
+        for name, (priority, default_limit) in TASK_CLASSES.items():
+            limit = limits.get(name) or int(os.getenv(f"TASK_LIMIT_{name.upper()}", default_limit or self.workers))
+            self.classes[name] = TaskClass(name, priority, max(1, min(limit, self.workers)))
+        self._by_priority = sorted(self.classes.values(), key=lambda c: c.priority)
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"PriorityExecutor-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, task_class: str, fn: Callable, *args, **kwargs) -> Future:
+        cls = self.classes[task_class]
+        future = Future()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            cls.queue.append((future, fn, args, kwargs, time.perf_counter()))
+            cls.submitted += 1
+            cls.max_queued = max(cls.max_queued, len(cls.queue))
+            self._condition.notify()
+        return future
+
+    def view(self, task_class: str) -> "ClassExecutor":
+        if task_class not in self.classes:
+            raise ValueError(f"Unknown task class: {task_class}")
+        return ClassExecutor(self, task_class)
+
+    def _next_task(self):
+        for cls in self._by_priority:
+            if cls.queue and cls.running < cls.limit:
+                cls.running += 1
+                return cls, cls.queue.popleft()
+        return None, None
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                cls, task = self._next_task()
+                while task is None:
+                    if self._shutdown:
+                        return
+                    self._condition.wait()
+                    cls, task = self._next_task()
+            future, fn, args, kwargs, queued_at = task
+            started = time.perf_counter()
+            cls.queue_wait.record(started - queued_at)
+            failed = False
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    failed = True
+                    future.set_exception(e)
+            with self._condition:
+                cls.running -= 1
+                cls.busy_seconds += time.perf_counter() - started
+                cls.completed += 1
+                cls.failed += failed
+                # A freed class slot may unblock a task another idle worker skipped
+                self._condition.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "workers": self.workers,
+                "busy_workers": sum(c.running for c in self.classes.values()),
+                "classes": {name: cls.stats() for name, cls in self.classes.items()},
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+class ClassExecutor(Executor):
+    """Executor facade that submits everything to one class of a PriorityExecutor"""
+
+    def __init__(self, pool: PriorityExecutor, task_class: str):
+        self.pool = pool
+        self.task_class = task_class
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        return self.pool.submit(self.task_class, fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        # The shared pool outlives any one service
+        pass
+
+
+_shared_executor: Optional[PriorityExecutor] = None
+_shared_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # Worker threads do not survive fork(); a forked child (e.g. an ingest
+    # process-pool worker) builds its own pool on first use
+    global _shared_executor, _shared_lock
+    _shared_executor = None
+    _shared_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_shared_executor() -> PriorityExecutor:
+    """The process-wide PriorityExecutor, created on first use"""
+    global _shared_executor
+    with _shared_lock:
+        if _shared_executor is None:
+            _shared_executor = PriorityExecutor()
+        return _shared_executor
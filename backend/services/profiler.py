@@ -0,0 +1,191 @@
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import threading
+from typing import List, Dict, Any, Tuple, Optional
+from urllib.parse import parse_qs
+
+PROFILE_HEADER = b"x-profile-token"
+PROFILE_QUERY_PARAM = "profile_token"
+PROFILE_PATH_HEADER = b"x-profile-path"
+PROFILED_PATHS = ("/chat", "/upload")
+
+Frame = Tuple[str, str, int]
+
+# Modules whose `_worker` loops park idle executor threads, and the library code they park in
+THREAD_POOL_FILE = os.path.join("concurrent", "futures", "thread.py")
+EXECUTOR_WORKER_FILES = (THREAD_POOL_FILE, os.path.join("services", "priority_executor.py"))
+WAIT_FILES = ("threading.py", "queue.py")
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler for every thread of the process.
+
+    A daemon thread snapshots `sys._current_frames()` every `interval` seconds,
+    so the event loop and the executor threads doing parsing, embedding and
+    LLM calls are all captured, without tracing overhead on the profiled code.
+    Executor threads that are idle waiting for work are left out. Other
+    requests running at the same time show up in the profile too.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.frames: List[Frame] = []
+        self.frame_index: Dict[Frame, int] = {}
+        # thread id -> (thread name, stacks as frame index lists, weights in ms)
+        self.samples: Dict[int, Tuple[str, List[List[int]], List[float]]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = 0.0
+        self.duration = 0.0
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _frame_id(self, key: Frame) -> int:
+        index = self.frame_index.get(key)
+        if index is None:
+            index = self.frame_index[key] = len(self.frames)
+            self.frames.append(key)
+        return index
+
+    @staticmethod
+    def _is_idle(stack: List[Frame]) -> bool:
+        # An executor worker blocked waiting for work: its `_worker` loop is only
+        # inside queue/condition waits, not running a task
+        for depth in range(len(stack) - 1, -1, -1):
+            name, filename, _ = stack[depth]
+            if name == "_worker" and filename.endswith(EXECUTOR_WORKER_FILES):
+                waiting = stack[depth + 1:]
+                if not waiting:
+                    # ThreadPoolExecutor blocks in SimpleQueue.get, which has no Python frame;
+                    # PriorityExecutor calls tasks directly, so a bare `_worker` may be running one
+                    return filename.endswith(THREAD_POOL_FILE)
+                return all(frame_file.endswith(WAIT_FILES) for _, frame_file, _ in waiting)
+        return False
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            weight = (now - last) * 1000
+            last = now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                stack.reverse()
+                if not stack or self._is_idle(stack):
+                    continue
+                if thread_id not in self.samples:
+                    if thread_id not in names:
+                        names = {t.ident: t.name for t in threading.enumerate()}
+                    self.samples[thread_id] = (names.get(thread_id, str(thread_id)), [], [])
+                _, stacks, weights = self.samples[thread_id]
+                stacks.append([self._frame_id(key) for key in stack])
+                weights.append(weight)
+
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        """Render the samples in speedscope's file format, one profile per thread"""
+        profiles = []
+        for thread_name, stacks, weights in self.samples.values():
+            profiles.append({
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": stacks,
+                "weights": weights,
+            })
+        # Busiest thread first, so speedscope opens on it
+        profiles.sort(key=lambda p: -p["endValue"])
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "hero-vida-profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": [{"name": n, "file": f, "line": line} for n, f, line in self.frames]},
+            "profiles": profiles,
+        }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles one /chat or /upload request on demand.
+
+    A request carrying the `X-Profile-Token` header (or `?profile_token=`) equal
+    to PROFILE_ADMIN_TOKEN runs under a SamplingProfiler; its path in PROFILE_DIR
+    is returned in the `X-Profile-Path` response header and the speedscope JSON
+    is written there as soon as the request finishes. A wrong token gets 403.
+    Without PROFILE_ADMIN_TOKEN the feature is off, and requests without the
+    flag pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.token = os.getenv("PROFILE_ADMIN_TOKEN") or None
+        self.directory = os.getenv("PROFILE_DIR", "./profiles")
+        self.interval = float(os.getenv("PROFILE_INTERVAL_MS", 5)) / 1000
+
+    def _requested_token(self, scope) -> Optional[str]:
+        for key, value in scope.get("headers", ()):
+            if key == PROFILE_HEADER:
+                return value.decode("latin-1")
+        query = scope.get("query_string", b"")
+        if PROFILE_QUERY_PARAM.encode() in query:
+            values = parse_qs(query.decode("latin-1")).get(PROFILE_QUERY_PARAM)
+            if values:
+                return values[0]
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if self.token is None or scope["type"] != "http" or scope["path"] not in PROFILED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        requested = self._requested_token(scope)
+        if requested is None:
+            await self.app(scope, receive, send)
+            return
+        if not hmac.compare_digest(requested.encode(), self.token.encode()):
+            body = json.dumps({"detail": "Invalid profile token"}).encode()
+            await send({"type": "http.response.start", "status": 403,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"content-length", str(len(body)).encode())]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{scope['path'].strip('/')}-{uuid.uuid4().hex[:8]}"
+        path = os.path.abspath(os.path.join(self.directory, f"{name}.speedscope.json"))
+
+        async def send_with_path(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (PROFILE_PATH_HEADER, path.encode())]}
+            await send(message)
+
+        profiler = SamplingProfiler(self.interval)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_path)
+        finally:
+            profiler.stop()
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(profiler.to_speedscope(f"{scope['method']} {scope['path']} ({profiler.duration * 1000:.0f} ms)"), f)
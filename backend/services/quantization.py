@@ -0,0 +1,232 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# Rows converted per step when scanning codes, to bound temporary float32 memory
+SCAN_BLOCK = 1024
+
+
+class Quantizer:
+    """Compressed, approximate representation of a collection's vectors.
+
+    `encode` turns float32 rows into compact codes; `distances` returns
+    approximate squared L2 distances from a query to every code row. Codes are
+    only a search structure: the exact float32 vectors stay on disk and the
+    best candidates are re-scored against them.
+
+    Scalar codes are scored without decoding them: `query_weights` folds the
+    decoding into the query, so each row's dot product is one pass over its
+    raw codes, and the rows' exact squared norms (kept by the collection)
+    stand in for the norms of the decoded rows.
+    """
+
+    kind = "none"
+    needs_training = False
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.trained = not self.needs_training
+
+    @property
+    def code_dtype(self):
+        raise NotImplementedError
+
+    @property
+    def code_width(self) -> int:
+        raise NotImplementedError
+
+    def train(self, sample: np.ndarray):
+        self.trained = True
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def query_weights(self, query: np.ndarray) -> Tuple[np.ndarray, float]:
+        """(weights, offset) such that `codes_row @ weights + offset` is the decoded row's dot product with query"""
+        raise NotImplementedError
+
+    def distances(self, query: np.ndarray, codes: np.ndarray, norms: np.ndarray) -> np.ndarray:
+        weights, offset = self.query_weights(query)
+        weights = weights.astype(np.float32)
+        dots = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCAN_BLOCK):
+            block = codes[start:start + SCAN_BLOCK]
+            dots[start:start + len(block)] = block.astype(np.float32) @ weights
+        return norms[:len(codes)] - 2.0 * (dots + offset) + float(query @ query)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {}
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        self.trained = True
+
+
+class Float16Quantizer(Quantizer):
+    """Half-precision copy of each vector: 2x smaller, near-lossless for unit embeddings"""
+
+    kind = "float16"
+
+    @property
+    def code_dtype(self):
+        return np.float16
+
+    @property
+    def code_width(self) -> int:
+        return self.dim
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.asarray(vectors, dtype=np.float16)
+
+    def query_weights(self, query: np.ndarray) -> Tuple[np.ndarray, float]:
+        return query, 0.0
+
+
+class Int8Quantizer(Quantizer):
+    """Per-dimension min/max scalar quantization to one byte per component (4x smaller)"""
+
+    kind = "int8"
+    needs_training = True
+
+    def __init__(self, dim: int):
+        super().__init__(dim)
+        self.low = np.zeros(dim, dtype=np.float32)
+        self.scale = np.ones(dim, dtype=np.float32)
+
+    @property
+    def code_dtype(self):
+        return np.uint8
+
+    @property
+    def code_width(self) -> int:
+        return self.dim
+
+    def train(self, sample: np.ndarray):
+        low = sample.min(axis=0)
+        high = sample.max(axis=0)
+        self.low = low.astype(np.float32)
+        self.scale = np.maximum((high - low) / 255.0, 1e-12).astype(np.float32)
+        self.trained = True
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((np.asarray(vectors, dtype=np.float32) - self.low) / self.scale)
+        return np.clip(codes, 0, 255).astype(np.uint8)
+
+    def query_weights(self, query: np.ndarray) -> Tuple[np.ndarray, float]:
+        # (code * scale + low) @ query == code @ (scale * query) + low @ query
+        return self.scale * query, float(self.low @ query)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"low": self.low, "scale": self.scale}
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        self.low = state["low"].astype(np.float32)
+        self.scale = state["scale"].astype(np.float32)
+        self.trained = True
+
+
+def _kmeans(x: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    x_norms = np.einsum("ij,ij->i", x, x)
+    for _ in range(iterations):
+        distances = x_norms[:, None] - 2.0 * (x @ centroids.T) + np.einsum("ij,ij->i", centroids, centroids)[None, :]
+        assignment = distances.argmin(axis=1)
+        counts = np.bincount(assignment, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, x)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Re-seed empty clusters from random points
+        if not filled.all():
+            centroids[~filled] = x[rng.choice(len(x), size=int((~filled).sum()))]
+    return centroids
+
+
+class PQQuantizer(Quantizer):
+    """Product quantization: `subspaces` sub-vectors, each replaced by the id of its
+    nearest of 256 k-means centroids (one byte per sub-vector).
+
+    384-dim MiniLM vectors with 96 subspaces take 96 bytes instead of 1536 (16x
+    smaller). Query distances use per-query lookup tables (asymmetric distance
+    computation), so codes are never decoded.
+    """
+
+    kind = "pq"
+    needs_training = True
+    CENTROIDS = 256
+
+    def __init__(self, dim: int, subspaces: int = 96, iterations: int = 15):
+        super().__init__(dim)
+        subspaces = max(1, min(subspaces, dim))
+        # Sub-vectors must tile the vector exactly
+        while dim % subspaces:
+            subspaces -= 1
+        self.subspaces = subspaces
+        self.sub_dim = dim // subspaces
+        self.iterations = iterations
+        self.codebooks: Optional[np.ndarray] = None
+
+    @property
+    def code_dtype(self):
+        return np.uint8
+
+    @property
+    def code_width(self) -> int:
+        return self.subspaces
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        return np.asarray(vectors, dtype=np.float32).reshape(len(vectors), self.subspaces, self.sub_dim)
+
+    def train(self, sample: np.ndarray):
+        rng = np.random.default_rng(0)
+        parts = self._split(sample)
+        k = min(self.CENTROIDS, len(sample))
+        self.codebooks = np.stack([
+            _kmeans(parts[:, j, :], k, self.iterations, rng) for j in range(self.subspaces)
+        ]).astype(np.float32)
+        self.trained = True
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        parts = self._split(vectors)
+        codes = np.empty((len(parts), self.subspaces), dtype=np.uint8)
+        for j in range(self.subspaces):
+            centroids = self.codebooks[j]
+            distances = (-2.0 * (parts[:, j, :] @ centroids.T)
+                         + np.einsum("ij,ij->i", centroids, centroids)[None, :])
+            codes[:, j] = distances.argmin(axis=1)
+        return codes
+
+    def distances(self, query: np.ndarray, codes: np.ndarray, norms: np.ndarray) -> np.ndarray:
+        query_parts = query.reshape(self.subspaces, 1, self.sub_dim)
+        # table[j, c] = squared distance from query sub-vector j to centroid c
+        table = ((self.codebooks - query_parts) ** 2).sum(axis=2)
+        out = np.zeros(len(codes), dtype=np.float32)
+        for j in range(self.subspaces):
+            out += np.take(table[j], codes[:, j])
+        return out
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"codebooks": self.codebooks}
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        self.codebooks = state["codebooks"].astype(np.float32)
+        self.subspaces, _, self.sub_dim = self.codebooks.shape
+        self.trained = True
+
+
+QUANTIZERS = {
+    "float16": Float16Quantizer,
+    "int8": Int8Quantizer,
+    "pq": PQQuantizer,
+}
+
+
+def create_quantizer(kind: Optional[str], dim: int, pq_subspaces: int = 96) -> Optional[Quantizer]:
+    """Build the quantizer for LOCAL_INDEX_COMPRESSION (none, float16, int8 or pq)"""
+    kind = (kind or "none").lower()
+    if kind == "none":
+        return None
+    if kind not in QUANTIZERS:
+        raise ValueError(f"Unsupported LOCAL_INDEX_COMPRESSION: {kind}")
+    if kind == "pq":
+        return PQQuantizer(dim, pq_subspaces)
+    return QUANTIZERS[kind](dim)
@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import shutil
+import asyncio
+from typing import Dict, Any, Optional
+
+GENERATIONS_DIR = "generations"
+CURRENT_FILE = "CURRENT"
+GENERATION_FILE = "generation.json"
+SUMMARIES_FILE = "summaries.json"
+
+
+def _write_json(path: str, data: Any):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def read_current(directory: str) -> Optional[str]:
+    """Id of the generation the publish directory currently points at, if any"""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class CorpusPublisher:
+    """Writer side: publishes the corpus as immutable, numbered generations.
+
+    A generation is a directory under `<PUBLISH_DIR>/generations/` holding a
+    snapshot per namespace (services/snapshot.py format), the summaries and a
+    generation.json manifest. It is written under a temporary name, renamed
+    into place, and only then made current by atomically replacing the
+    `CURRENT` pointer file, so a replica never sees a partial generation.
+    The newest PUBLISH_KEEP generations are kept for replicas still loading.
+
+    With PUBLISH_INTERVAL_SECONDS > 0 a new generation is published whenever
+    the corpus or its summaries changed since the last one (summaries finish
+    after the upload that changed the corpus); otherwise publish on demand.
+    """
+
+    def __init__(self, vector_store, summary_store, directory: Optional[str] = None):
+        self.vector_store = vector_store
+        self.summary_store = summary_store
+        self.directory = directory if directory is not None else os.getenv("PUBLISH_DIR", "")
+        self.interval = float(os.getenv("PUBLISH_INTERVAL_SECONDS", 0))
+        self.keep = max(1, int(os.getenv("PUBLISH_KEEP", 3)))
+        self.dtype = os.getenv("PUBLISH_DTYPE", "float32")
+        self.lock = asyncio.Lock()
+        self.last_published: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    async def publish(self, force: bool = False) -> Dict[str, Any]:
+        """Publish the current corpus; skipped (returns the last manifest) if nothing changed since"""
+        if not self.enabled:
+            raise ValueError("Publishing is not configured (set PUBLISH_DIR)")
+        async with self.lock:
+            last = self.last_published
+            summaries_version = self.summary_store.version
+            if (not force and last is not None and last["writer_generation"] == self.vector_store.generation
+                    and last["summaries_version"] == summaries_version):
+                return {**last, "published": False}
+
+            generations = os.path.join(self.directory, GENERATIONS_DIR)
+            os.makedirs(generations, exist_ok=True)
+            generation_id = f"{int(time.time() * 1000)}-{self.vector_store.generation}"
+            tmp_path = os.path.join(generations, generation_id + ".partial")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            os.makedirs(tmp_path)
+            started = time.perf_counter()
+            try:
+                exported = await self.vector_store.export_generation(tmp_path, self.dtype)
+                _write_json(os.path.join(tmp_path, SUMMARIES_FILE), self.summary_store.export_records())
+                manifest = {
+                    "id": generation_id,
+                    "writer_generation": exported["generation"],
+                    "summaries_version": summaries_version,
+                    "embedding_model": exported["embedding_model"],
+                    "namespaces": exported["namespaces"],
+                    "created_at": time.time(),
+                }
+                _write_json(os.path.join(tmp_path, GENERATION_FILE), manifest)
+                os.replace(tmp_path, os.path.join(generations, generation_id))
+            except Exception:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                raise
+            tmp_pointer = os.path.join(self.directory, CURRENT_FILE + ".tmp")
+            with open(tmp_pointer, "w", encoding="utf-8") as f:
+                f.write(generation_id)
+            os.replace(tmp_pointer, os.path.join(self.directory, CURRENT_FILE))
+            self._prune(generations, generation_id)
+            self.last_published = {**manifest, "seconds": round(time.perf_counter() - started, 3)}
+            return {**self.last_published, "published": True}
+
+    def _prune(self, generations: str, current: str):
+        finished = sorted(
+            entry for entry in os.listdir(generations)
+            if not entry.endswith(".partial") and os.path.isdir(os.path.join(generations, entry))
+        )
+        # Ids start with a millisecond timestamp, so name order is publish order
+        for entry in finished[:-self.keep]:
+            if entry != current:
+                shutil.rmtree(os.path.join(generations, entry), ignore_errors=True)
+
+    async def run(self):
+        """Publish every PUBLISH_INTERVAL_SECONDS while the corpus keeps changing"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.publish()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+
+    def start(self):
+        if self.enabled and self.interval > 0 and self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "role": "writer",
+            "publish_dir": self.directory or None,
+            "interval_seconds": self.interval,
+            "current": read_current(self.directory) if self.enabled else None,
+            "last_published": self.last_published,
+            "last_error": self.last_error,
+            "writer_generation": self.vector_store.generation,
+        }
+
+
+class ReplicaFollower:
+    """Query-replica side: follows the writer's published generations.
+
+    Polls `<REPLICA_SOURCE>/CURRENT` every REPLICA_POLL_SECONDS. When it names
+    a new generation, the generation is imported into a private directory
+    under the replica's own CHROMA_DB_PATH and swapped in atomically (see
+    VectorStore.swap_generation), so in-flight queries are never dropped.
+    The previous generation's directory is kept until the next swap, giving
+    queries that started on it a full poll interval to finish.
+    """
+
+    def __init__(self, vector_store, summary_store, source: Optional[str] = None):
+        self.vector_store = vector_store
+        self.summary_store = summary_store
+        self.source = source if source is not None else os.getenv("REPLICA_SOURCE", "")
+        self.poll_seconds = float(os.getenv("REPLICA_POLL_SECONDS", 5))
+        self.verify = os.getenv("REPLICA_VERIFY_SNAPSHOTS", "true").lower() == "true"
+        self.local_root = os.path.join(vector_store.db_path, GENERATIONS_DIR)
+        self.lock = asyncio.Lock()
+        self.current: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self.last_checked: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def check(self) -> bool:
+        """Load the published generation if it is newer than the one being served; True if swapped"""
+        async with self.lock:
+            self.last_checked = time.time()
+            generation_id = read_current(self.source)
+            if generation_id is None or (self.current and self.current["id"] == generation_id):
+                return False
+            published = os.path.join(self.source, GENERATIONS_DIR, generation_id)
+            started = time.perf_counter()
+            with open(os.path.join(published, GENERATION_FILE), encoding="utf-8") as f:
+                manifest = json.load(f)
+            snapshots = {namespace: os.path.join(published, namespace) for namespace in manifest["namespaces"]}
+            local_path = os.path.join(self.local_root, generation_id)
+            shutil.rmtree(local_path, ignore_errors=True)
+            try:
+                counts = await self.vector_store.swap_generation(
+                    local_path, snapshots, manifest["embedding_model"], verify=self.verify
+                )
+            except Exception:
+                shutil.rmtree(local_path, ignore_errors=True)
+                raise
+            with open(os.path.join(published, SUMMARIES_FILE), encoding="utf-8") as f:
+                self.summary_store.replace_records(json.load(f))
+            previous = self.current
+            self.current = {**manifest, "rows": counts, "loaded_at": time.time(),
+                            "load_seconds": round(time.perf_counter() - started, 3)}
+            self._retire(keep={generation_id, previous["id"] if previous else generation_id})
+            return True
+
+    def _retire(self, keep):
+        # Close retired generations' index clients before deleting their files
+        self.vector_store.close_retired({os.path.join(self.local_root, entry) for entry in keep})
+        if not os.path.isdir(self.local_root):
+            return
+        for entry in os.listdir(self.local_root):
+            if entry not in keep:
+                shutil.rmtree(os.path.join(self.local_root, entry), ignore_errors=True)
+
+    async def run(self):
+        while True:
+            try:
+                await self.check()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+            await asyncio.sleep(self.poll_seconds)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "role": "replica",
+            "source": self.source,
+            "poll_seconds": self.poll_seconds,
+            "current": self.current,
+            "published": read_current(self.source),
+            "last_checked": self.last_checked,
+            "last_error": self.last_error,
+        }
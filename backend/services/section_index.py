@@ -0,0 +1,304 @@
+import os
+import json
+import base64
+import threading
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+SECTION_SEPARATOR = "\x1f"
+
+
+class SectionIndex:
+    """Coarse level of one collection: a centroid per section of each source.
+
+    A section is `section_chunks` consecutive chunks of one source (by the
+    chunk's `chunk_id`), so a short file is a single section and a long PDF
+    or CSV is split into topical runs. Each section keeps the sum of its
+    chunks' embeddings and its member chunk ids; the centroid direction is the
+    normalized sum.
+
+    Changes are appended to a JSON-lines file (`path`) as per-section deltas
+    and replayed on open; the file is rewritten once it is mostly deltas.
+    """
+
+    def __init__(self, path: str, section_chunks: int):
+        self.path = path
+        self.section_chunks = max(1, section_chunks)
+        self.keys: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self.members: List[List[str]] = []
+        self.sums: Optional[np.ndarray] = None
+        self.section_of: Dict[str, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._live: Optional[np.ndarray] = None
+        self._records = 0
+        self.lock = threading.RLock()
+        if os.path.exists(path):
+            self._load()
+
+    @property
+    def total_chunks(self) -> int:
+        return len(self.section_of)
+
+    def section_key(self, metadata: Dict[str, Any]) -> str:
+        section = int(metadata.get("chunk_id", 0)) // self.section_chunks
+        return f"{metadata.get('source', 'unknown')}{SECTION_SEPARATOR}{section}"
+
+    def _row(self, key: str, dim: int) -> int:
+        row = self.row_of.get(key)
+        if row is None:
+            row = self.row_of[key] = len(self.keys)
+            self.keys.append(key)
+            self.members.append([])
+            # Grow by doubling so building a large index stays linear
+            if self.sums is None:
+                self.sums = np.zeros((64, dim), dtype=np.float64)
+            elif row >= len(self.sums):
+                self.sums = np.vstack([self.sums, np.zeros_like(self.sums)])
+        return row
+
+    def _apply(self, key: str, ids: List[str], vector_sum: np.ndarray, sign: int):
+        row = self._row(key, len(vector_sum))
+        self.sums[row] += sign * vector_sum
+        if sign > 0:
+            self.members[row].extend(ids)
+            for chunk_id in ids:
+                self.section_of[chunk_id] = row
+        else:
+            removed = set(ids)
+            self.members[row] = [chunk_id for chunk_id in self.members[row] if chunk_id not in removed]
+            for chunk_id in ids:
+                self.section_of.pop(chunk_id, None)
+        self._centroids = None
+
+    # ------------------------------------------------------------- persistence
+
+    @staticmethod
+    def _encode(vector: np.ndarray) -> str:
+        return base64.b64encode(np.asarray(vector, dtype="<f8").tobytes()).decode("ascii")
+
+    @staticmethod
+    def _decode(value: str) -> np.ndarray:
+        return np.frombuffer(base64.b64decode(value), dtype="<f8")
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self._records += 1
+                self._apply(record["key"], record["ids"], self._decode(record["sum"]), record["sign"])
+
+    def _append(self, records: List[Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._records += len(records)
+        if self._records > 2 * len(self.keys) + 1000:
+            self.save()
+
+    def save(self):
+        """Rewrite the file with one record per non-empty section"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        written = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for row, key in enumerate(self.keys):
+                if self.members[row]:
+                    f.write(json.dumps({"key": key, "ids": self.members[row], "sum": self._encode(self.sums[row]),
+                                        "sign": 1}, ensure_ascii=False) + "\n")
+                    written += 1
+        os.replace(tmp_path, self.path)
+        self._records = written
+
+    # ----------------------------------------------------------------- updates
+
+    def _deltas(self, ids: List[str], embeddings: np.ndarray, keys: List[str], sign: int) -> List[Dict[str, Any]]:
+        grouped: Dict[str, List[int]] = {}
+        for position, key in enumerate(keys):
+            grouped.setdefault(key, []).append(position)
+        records = []
+        for key, positions in grouped.items():
+            section_ids = [ids[p] for p in positions]
+            vector_sum = embeddings[positions].astype(np.float64).sum(axis=0)
+            self._apply(key, section_ids, vector_sum, sign)
+            records.append({"key": key, "ids": section_ids, "sum": self._encode(vector_sum), "sign": sign})
+        return records
+
+    def add(self, ids: List[str], embeddings, metadatas: List[Dict[str, Any]], persist: bool = True):
+        if not ids:
+            return
+        with self.lock:
+            records = self._deltas(ids, np.asarray(embeddings, dtype=np.float32),
+                                   [self.section_key(m) for m in metadatas], 1)
+            if persist:
+                self._append(records)
+
+    def remove(self, ids: List[str], embeddings):
+        """Remove chunks; `embeddings` are their stored vectors, in the same order"""
+        with self.lock:
+            known = [(i, chunk_id) for i, chunk_id in enumerate(ids) if chunk_id in self.section_of]
+            if not known:
+                return
+            positions = [i for i, _ in known]
+            known_ids = [chunk_id for _, chunk_id in known]
+            keys = [self.keys[self.section_of[chunk_id]] for chunk_id in known_ids]
+            self._append(self._deltas(known_ids, np.asarray(embeddings, dtype=np.float32)[positions], keys, -1))
+
+    # ------------------------------------------------------------------ search
+
+    def _centroid_matrix(self):
+        """(unit centroid per section, mask of non-empty sections), cached until the next change"""
+        if self._centroids is None:
+            sums = self.sums[:len(self.keys)] if self.sums is not None else np.zeros((0, 1))
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            self._centroids = np.divide(sums, norms, out=np.zeros_like(sums), where=norms > 0).astype(np.float32)
+            self._live = np.array([bool(m) for m in self.members], dtype=bool)
+        return self._centroids, self._live
+
+    def candidates(self, query: np.ndarray, sections: int) -> List[str]:
+        """Chunk ids of the `sections` sections whose centroids are closest (by cosine) to `query`"""
+        with self.lock:
+            centroids, live = self._centroid_matrix()
+            members = self.members
+        if not len(centroids):
+            return []
+        scores = centroids @ (query / (np.linalg.norm(query) or 1.0))
+        # Emptied sections can never be picked
+        scores = np.where(live, scores, -np.inf)
+        sections = min(sections, int(live.sum()))
+        if sections <= 0:
+            return []
+        top = np.argpartition(-scores, sections - 1)[:sections] if sections < len(scores) else np.arange(len(scores))
+        return [chunk_id for row in top for chunk_id in members[row]]
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "sections": sum(1 for m in self.members if m),
+                "chunks": self.total_chunks,
+                "section_chunks": self.section_chunks,
+            }
+
+
+def search_within(collection, query: np.ndarray, candidate_ids: List[str], k: int) -> Dict[str, List]:
+    """Exact squared-L2 top-k over a subset of a collection's chunks, shaped like one query's results"""
+    rows = collection.get(ids=candidate_ids, include=["embeddings", "documents", "metadatas"])
+    if not rows["ids"]:
+        return {"ids": [], "documents": [], "metadatas": [], "distances": []}
+    difference = np.asarray(rows["embeddings"], dtype=np.float32) - query
+    distances = np.einsum("ij,ij->i", difference, difference)
+    order = np.argsort(distances)[:k]
+    return {
+        "ids": [rows["ids"][i] for i in order],
+        "documents": [rows["documents"][i] for i in order],
+        "metadatas": [rows["metadatas"][i] for i in order],
+        "distances": [float(distances[i]) for i in order],
+    }
+
+
+class HierarchicalRetriever:
+    """Two-stage retrieval: section centroids pick where to look, chunks are ranked only there.
+
+    Flat k-NN compares a query with every chunk; here it is compared with one
+    centroid per section (HIERARCHICAL_SECTION_CHUNKS chunks each), and only
+    the chunks of the HIERARCHICAL_CANDIDATE_SECTIONS best sections are scored
+    exactly. It applies to collections with at least HIERARCHICAL_MIN_CHUNKS
+    chunks when RETRIEVAL_MODE=hierarchical; smaller ones keep flat search.
+
+    Section indexes are kept per collection under `directory`, updated on every
+    write once they exist, and built from the collection on first use.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.enabled = os.getenv("RETRIEVAL_MODE", "flat").lower() == "hierarchical"
+        self.min_chunks = int(os.getenv("HIERARCHICAL_MIN_CHUNKS", 20000))
+        self.section_chunks = int(os.getenv("HIERARCHICAL_SECTION_CHUNKS", 8))
+        self.candidate_sections = int(os.getenv("HIERARCHICAL_CANDIDATE_SECTIONS", 32))
+        self.build_page_size = 5000
+        self.indexes: Dict[str, SectionIndex] = {}
+        self.lock = threading.Lock()
+
+    def _path(self, collection_name: str) -> str:
+        return os.path.join(self.directory, f"{collection_name}.jsonl")
+
+    def index_for(self, collection_name: str, collection, build: bool = True) -> Optional[SectionIndex]:
+        """The collection's section index; None if it was never built and `build` is False"""
+        with self.lock:
+            index = self.indexes.get(collection_name)
+            if index is not None:
+                return index
+            path = self._path(collection_name)
+            if not os.path.exists(path):
+                if not build or collection is None:
+                    return None
+                index = SectionIndex(path, self.section_chunks)
+                offset = 0
+                while True:
+                    rows = collection.get(limit=self.build_page_size, offset=offset,
+                                          include=["embeddings", "metadatas"])
+                    if not rows["ids"]:
+                        break
+                    index.add(rows["ids"], rows["embeddings"], rows["metadatas"], persist=False)
+                    offset += len(rows["ids"])
+                index.save()
+            else:
+                index = SectionIndex(path, self.section_chunks)
+            self.indexes[collection_name] = index
+            return index
+
+    def reset(self, collection_name: str):
+        """Forget a collection's section index; it is rebuilt from the collection when needed"""
+        with self.lock:
+            self.indexes.pop(collection_name, None)
+            path = self._path(collection_name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def on_add(self, collection_name: str, collection, ids: List[str], embeddings,
+               metadatas: List[Dict[str, Any]]):
+        """Call after adding chunks to the collection"""
+        with self.lock:
+            known = collection_name in self.indexes or os.path.exists(self._path(collection_name))
+        if not known:
+            # A first build reads the collection, so it already includes these chunks
+            if self.enabled:
+                self.index_for(collection_name, collection)
+            return
+        self.index_for(collection_name, collection).add(ids, embeddings, metadatas)
+
+    def on_delete(self, collection_name: str, collection, ids: List[str]):
+        """Call before deleting `ids` from the collection (their vectors are read back)"""
+        index = self.index_for(collection_name, collection, build=False)
+        if index is None or not ids:
+            return
+        rows = collection.get(ids=ids, include=["embeddings"])
+        index.remove(rows["ids"], rows["embeddings"])
+
+    def search(self, collection_name: str, collection, query_embeddings: List[List[float]],
+               k: int) -> Optional[Dict[str, List]]:
+        """Query results shaped like `collection.query`, or None when flat search should be used"""
+        if not self.enabled:
+            return None
+        index = self.index_for(collection_name, collection)
+        if index is None or index.total_chunks < self.min_chunks:
+            return None
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for query in np.asarray(query_embeddings, dtype=np.float32):
+            found = search_within(collection, query, index.candidates(query, self.candidate_sections), k)
+            for field in results:
+                results[field].append(found[field])
+        return results
+
+    def get_stats(self, collection_name: str) -> Dict[str, Any]:
+        index = self.indexes.get(collection_name)
+        return {
+            "enabled": self.enabled,
+            "min_chunks": self.min_chunks,
+            "candidate_sections": self.candidate_sections,
+            **(index.stats() if index is not None else {}),
+        }
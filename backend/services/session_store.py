@@ -0,0 +1,168 @@
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+FOLLOW_UP_PATTERN = re.compile(
+    r"\b(it|its|they|them|their|this|that|these|those|he|she|his|her|same|also|"
+    r"above|previous|earlier|more|else)\b|^(and|what about|how about|why|compare)\b",
+    re.IGNORECASE,
+)
+
+
+class SessionStore:
+    """Bounded server-side conversation memory keyed by session_id.
+
+    Sessions are held in an LRU dictionary capped at `max_sessions` and expire
+    after `ttl_seconds` without activity. Each session keeps its last
+    `max_turns` exchanges verbatim; older turns are folded into a running
+    summary of at most `summary_max_chars`, so the history sent with a prompt
+    stays bounded however long the conversation runs. Compaction is extractive
+    (question plus the first sentence of the answer) to avoid an extra LLM call.
+
+    A request without a session id gets a new provisional session, kept in a
+    separate LRU capped at `max_provisional`. It becomes a regular session
+    once the client sends its id back. So one-off anonymous requests only
+    evict each other, never conversations in progress.
+    """
+
+    def __init__(self):
+        self.max_sessions = int(os.getenv("SESSION_MAX_SESSIONS", 1000))
+        self.max_provisional = int(os.getenv("SESSION_MAX_PROVISIONAL", 1000))
+        self.ttl_seconds = float(os.getenv("SESSION_TTL_SECONDS", 3600))
+        self.max_turns = int(os.getenv("SESSION_MAX_TURNS", 4))
+        self.summary_max_chars = int(os.getenv("SESSION_SUMMARY_MAX_CHARS", 1200))
+        self.rewrite_queries = os.getenv("SESSION_REWRITE_QUERIES", "true").lower() == "true"
+        self.sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.provisional: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def _evict_expired(self, now: float):
+        for sessions in (self.sessions, self.provisional):
+            while sessions:
+                session_id, session = next(iter(sessions.items()))
+                if now - session["updated_at"] <= self.ttl_seconds:
+                    break
+                del sessions[session_id]
+
+    @staticmethod
+    def _insert(sessions: "OrderedDict[str, Dict[str, Any]]", session_id: str, session: Dict[str, Any],
+                limit: int):
+        sessions[session_id] = session
+        while len(sessions) > limit:
+            sessions.popitem(last=False)
+
+    def get_or_create(self, session_id: Optional[str] = None) -> str:
+        """Return a live session id, creating a new session when needed"""
+        now = time.time()
+        self._evict_expired(now)
+        if session_id and session_id in self.sessions:
+            self.sessions[session_id]["updated_at"] = now
+            self.sessions.move_to_end(session_id)
+            return session_id
+        if session_id and session_id in self.provisional:
+            # The client came back with the id: keep the conversation as a regular session
+            session = self.provisional.pop(session_id)
+            session["updated_at"] = now
+            self._insert(self.sessions, session_id, session, self.max_sessions)
+            return session_id
+
+        session = {"turns": [], "summary": "", "updated_at": now}
+        if session_id:
+            self._insert(self.sessions, session_id, session, self.max_sessions)
+            return session_id
+        session_id = str(uuid.uuid4())
+        self._insert(self.provisional, session_id, session, self.max_provisional)
+        return session_id
+
+    def _lookup(self, session_id: Optional[str]):
+        """(store, session) for a stored session id, or (None, None)"""
+        if session_id:
+            for sessions in (self.sessions, self.provisional):
+                if session_id in sessions:
+                    return sessions, sessions[session_id]
+        return None, None
+
+    def _get(self, session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        _, session = self._lookup(session_id)
+        if session is None or time.time() - session["updated_at"] > self.ttl_seconds:
+            return None
+        return session
+
+    @staticmethod
+    def _compact_turn(turn: Dict[str, str]) -> str:
+        answer = " ".join(turn["response"].split())
+        first_sentence = re.split(r"(?<=[.!?])\s", answer, maxsplit=1)[0][:200]
+        return f"- Q: {turn['query'][:200]} A: {first_sentence}"
+
+    def add_turn(self, session_id: str, query: str, response: str):
+        """Record an exchange, compacting turns that fall out of the recent window"""
+        sessions, session = self._lookup(session_id)
+        if session is None:
+            return
+        session["turns"].append({"query": query, "response": response})
+        while len(session["turns"]) > self.max_turns:
+            oldest = session["turns"].pop(0)
+            lines = [line for line in session["summary"].split("\n") if line]
+            lines.append(self._compact_turn(oldest))
+            # Drop the oldest summary lines once the running summary is over budget
+            while len(lines) > 1 and sum(len(line) + 1 for line in lines) > self.summary_max_chars:
+                lines.pop(0)
+            session["summary"] = "\n".join(lines)[-self.summary_max_chars:]
+        session["updated_at"] = time.time()
+        sessions.move_to_end(session_id)
+
+    def format_history(self, session_id: Optional[str]) -> str:
+        """Render the summary and recent turns for inclusion in a prompt"""
+        session = self._get(session_id)
+        if not session or (not session["turns"] and not session["summary"]):
+            return ""
+        parts = []
+        if session["summary"]:
+            parts.append(f"Earlier in the conversation:\n{session['summary']}")
+        for turn in session["turns"]:
+            answer = turn["response"]
+            if len(answer) > 600:
+                answer = answer[:600] + "..."
+            parts.append(f"User: {turn['query']}\nAssistant: {answer}")
+        return "\n\n".join(parts)
+
+    def rewrite_query(self, session_id: Optional[str], query: str) -> str:
+        """Make a follow-up question self-contained for retrieval.
+
+        Short or anaphoric questions ("what about last year?") are prefixed with
+        the previous user question so the embedding carries its subject.
+        """
+        session = self._get(session_id)
+        if not self.rewrite_queries or not session or not session["turns"]:
+            return query
+        if len(query.split()) > 6 and not FOLLOW_UP_PATTERN.search(query):
+            return query
+        previous = session["turns"][-1]["query"]
+        return f"{previous} {query}"
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        session = self._get(session_id)
+        if session is None:
+            return None
+        return {
+            "session_id": session_id,
+            "turns": list(session["turns"]),
+            "summary": session["summary"],
+            "updated_at": session["updated_at"],
+        }
+
+    def delete(self, session_id: str) -> bool:
+        sessions, _ = self._lookup(session_id)
+        return sessions is not None and sessions.pop(session_id, None) is not None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "active_sessions": len(self.sessions),
+            "provisional_sessions": len(self.provisional),
+            "max_sessions": self.max_sessions,
+            "max_provisional": self.max_provisional,
+            "ttl_seconds": self.ttl_seconds,
+            "max_turns": self.max_turns,
+        }
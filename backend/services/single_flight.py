@@ -0,0 +1,40 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Collapse concurrent identical calls into one.
+
+    The first caller for a key starts the computation as its own task; callers
+    arriving with the same key while it runs await that task instead of
+    starting another, and all of them get its result (or exception). Nothing
+    is cached: once the task finishes the key is free again, so a later call
+    computes afresh. A caller that disconnects does not cancel the shared
+    task for the others.
+    """
+
+    def __init__(self):
+        self.in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats["calls"] += 1
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["executions"] += 1
+            task = asyncio.ensure_future(compute())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        # Retrieve the exception even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "in_flight": len(self.in_flight)}
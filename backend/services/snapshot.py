@@ -0,0 +1,162 @@
+import os
+import json
+import gzip
+import time
+import shutil
+import hashlib
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+SNAPSHOT_FORMAT = "hero-vida-snapshot"
+SNAPSHOT_VERSION = 1
+EMBEDDINGS_FILE = "embeddings.npy"
+TABLE_FILE = "table.json.gz"
+MANIFEST_FILE = "manifest.json"
+PAGE_SIZE = 4096
+
+
+class SnapshotError(Exception):
+    """Raised for unreadable, incompatible or corrupted snapshots"""
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_collection(collection, path: str, dtype: str = "float32",
+                      info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Write a collection to a snapshot directory.
+
+    Layout:
+      embeddings.npy  - one contiguous (count, dim) float32/float16 array in .npy
+                        format, loadable with np.load(..., mmap_mode="r")
+      table.json.gz   - ids, documents and one column per metadata key, row-aligned
+                        with the embeddings (missing metadata values are null)
+      manifest.json   - format/version, counts, dtype, caller info and a SHA-256
+                        per file; written last, so a snapshot without it is incomplete
+    """
+    if dtype not in ("float32", "float16"):
+        raise SnapshotError(f"Unsupported snapshot dtype: {dtype}")
+    tmp_path = path.rstrip("/\\") + ".partial"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    count = collection.count()
+    ids: List[str] = []
+    documents: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+    embeddings = None
+    row = 0
+    # Page through the collection so the whole corpus never has to be in one response
+    while row < count:
+        page = collection.get(limit=PAGE_SIZE, offset=row, include=["embeddings", "documents", "metadatas"])
+        if not page["ids"]:
+            break
+        vectors = np.asarray(page["embeddings"], dtype=np.float32)
+        if embeddings is None:
+            embeddings = np.lib.format.open_memmap(
+                os.path.join(tmp_path, EMBEDDINGS_FILE), mode="w+", dtype=dtype,
+                shape=(count, vectors.shape[1])
+            )
+        embeddings[row:row + len(vectors)] = vectors.astype(dtype)
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+        row += len(page["ids"])
+
+    dim = int(embeddings.shape[1]) if embeddings is not None else 0
+    if embeddings is None:
+        embeddings = np.lib.format.open_memmap(
+            os.path.join(tmp_path, EMBEDDINGS_FILE), mode="w+", dtype=dtype, shape=(0, 0)
+        )
+    embeddings.flush()
+    del embeddings
+    if row != count:
+        raise SnapshotError(f"Collection changed during export ({row} of {count} rows read)")
+
+    keys = sorted({key for metadata in metadatas for key in metadata})
+    table = {
+        "ids": ids,
+        "documents": documents,
+        "metadata": {key: [metadata.get(key) for metadata in metadatas] for key in keys},
+    }
+    with gzip.open(os.path.join(tmp_path, TABLE_FILE), "wt", encoding="utf-8", compresslevel=6) as f:
+        json.dump(table, f, ensure_ascii=False, separators=(",", ":"))
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created_at": time.time(),
+        "count": count,
+        "dim": dim,
+        "dtype": dtype,
+        **(info or {}),
+        "files": {
+            name: {"sha256": _sha256(os.path.join(tmp_path, name)),
+                   "bytes": os.path.getsize(os.path.join(tmp_path, name))}
+            for name in (EMBEDDINGS_FILE, TABLE_FILE)
+        },
+    }
+    with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def read_manifest(path: str, verify: bool = True) -> Dict[str, Any]:
+    """Load and validate a snapshot manifest, checking file checksums when `verify`"""
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise SnapshotError(f"No snapshot manifest at {manifest_path}")
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError("Not a Hero Vida snapshot")
+    if manifest.get("version", 0) > SNAPSHOT_VERSION:
+        raise SnapshotError(f"Snapshot version {manifest['version']} is newer than supported ({SNAPSHOT_VERSION})")
+    for name, expected in manifest["files"].items():
+        file_path = os.path.join(path, name)
+        if not os.path.exists(file_path):
+            raise SnapshotError(f"Snapshot file missing: {name}")
+        if os.path.getsize(file_path) != expected["bytes"]:
+            raise SnapshotError(f"Snapshot file {name} has the wrong size")
+        if verify and _sha256(file_path) != expected["sha256"]:
+            raise SnapshotError(f"Checksum mismatch for {name}")
+    return manifest
+
+
+def load_snapshot(path: str, verify: bool = True):
+    """Return (manifest, memory-mapped embeddings, table) for a snapshot"""
+    manifest = read_manifest(path, verify)
+    embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r")
+    with gzip.open(os.path.join(path, TABLE_FILE), "rt", encoding="utf-8") as f:
+        table = json.load(f)
+    if embeddings.shape[0] != manifest["count"] or len(table["ids"]) != manifest["count"]:
+        raise SnapshotError("Snapshot row counts do not match the manifest")
+    return manifest, embeddings, table
+
+
+def import_into_collection(collection, embeddings: np.ndarray, table: Dict[str, Any]) -> int:
+    """Bulk-add snapshot rows to an (empty) collection; returns the number of rows added"""
+    ids = table["ids"]
+    documents = table["documents"]
+    columns = table["metadata"]
+    for start in range(0, len(ids), PAGE_SIZE):
+        end = min(start + PAGE_SIZE, len(ids))
+        metadatas = []
+        for row in range(start, end):
+            metadatas.append({key: values[row] for key, values in columns.items() if values[row] is not None})
+        collection.add(
+            ids=ids[start:end],
+            embeddings=np.asarray(embeddings[start:end], dtype=np.float32).tolist(),
+            metadatas=metadatas,
+            documents=documents[start:end],
+        )
+    return len(ids)
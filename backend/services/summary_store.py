@@ -0,0 +1,186 @@
+import os
+import re
+import json
+import time
+import threading
+from typing import List, Dict, Any, Optional, Pattern, Tuple
+
+OVERVIEW_PATTERN = re.compile(
+    r"\b(summar(y|ise|ize|ies)|overview|outline|gist|tl;?dr|what('s| is) in|what does .+ (contain|cover)|"
+    r"what (is|are) .+ about|main (topics|points|themes)|key (points|takeaways))\b",
+    re.IGNORECASE,
+)
+
+
+class SummaryStore:
+    """Per-source summaries generated after ingestion, versioned by content hash.
+
+    Records are keyed by (namespace, source) and appended to a JSON-lines file
+    next to the vector index (one short write per change, replayed on open
+    and rewritten once it is mostly superseded records). A summary is only served while its `content_hash`
+    matches the hash of the most recently ingested version of the source, so a
+    re-upload with different bytes invalidates it until regeneration finishes;
+    re-uploading identical bytes reuses the existing summary.
+    """
+
+    def __init__(self):
+        db_path = os.getenv("CHROMA_DB_PATH", "./chroma_db")
+        self.path = os.path.join(db_path, "summaries.jsonl")
+        self.lock = threading.Lock()
+        self.records: Dict[str, Dict[str, Any]] = {}
+        # namespace -> (pattern matching any source name, lowercase name variant -> sources), built lazily
+        self._matchers: Dict[str, Tuple[Optional[Pattern], Dict[str, List[str]]]] = {}
+        self._log_records = 0
+        # Bumped by every change, so publishers can tell whether summaries moved on
+        self.version = 0
+        self._load()
+
+    @staticmethod
+    def _key(namespace: str, source: str) -> str:
+        return f"{namespace}/{source}"
+
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    self._log_records += 1
+                    if "delete" in record:
+                        self.records.pop(record["delete"], None)
+                    else:
+                        self.records[self._key(record["namespace"], record["source"])] = record
+
+    def _append(self, records: List[Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._log_records += len(records)
+        if self._log_records > 2 * len(self.records) + 1000:
+            self._save()
+
+    def _save(self):
+        """Rewrite the log with one record per source"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in self.records.values():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._log_records = len(self.records)
+
+    def mark_ingested(self, namespace: str, source: str, content_hash: str) -> bool:
+        """Record a new ingested version; returns True if a summary must be (re)generated"""
+        with self.lock:
+            key = self._key(namespace, source)
+            record = self.records.get(key)
+            if record and record["content_hash"] == content_hash and record["status"] in ("ready", "pending"):
+                return False
+            if record is None:
+                self._matchers.pop(namespace, None)
+            self.records[key] = {
+                "namespace": namespace,
+                "source": source,
+                "content_hash": content_hash,
+                "status": "pending",
+                "summary": None,
+                "updated_at": time.time(),
+            }
+            self._append([self.records[key]])
+            self.version += 1
+            return True
+
+    def set_summary(self, namespace: str, source: str, content_hash: str, summary: str, failed: bool = False):
+        """Store a generated summary unless a newer version of the source arrived meanwhile"""
+        with self.lock:
+            key = self._key(namespace, source)
+            record = self.records.get(key)
+            if not record or record["content_hash"] != content_hash:
+                return
+            record.update(
+                status="failed" if failed else "ready",
+                summary=None if failed else summary,
+                error=summary if failed else None,
+                updated_at=time.time(),
+            )
+            self._append([record])
+            self.version += 1
+
+    def get(self, namespace: str, source: str) -> Optional[Dict[str, Any]]:
+        record = self.records.get(self._key(namespace, source))
+        return dict(record) if record else None
+
+    def ready_summaries(self, namespace: str, sources: List[str]) -> Dict[str, str]:
+        """Map source -> summary for the sources that have a current summary"""
+        summaries = {}
+        for source in sources:
+            record = self.records.get(self._key(namespace, source))
+            if record and record["status"] == "ready":
+                summaries[source] = record["summary"]
+        return summaries
+
+    def sources(self, namespace: str) -> List[str]:
+        return [r["source"] for r in self.records.values() if r["namespace"] == namespace]
+
+    def delete(self, namespace: str, source: Optional[str] = None):
+        """Forget one source's summary, or every summary in the namespace"""
+        with self.lock:
+            self._matchers.pop(namespace, None)
+            if source is not None:
+                key = self._key(namespace, source)
+                if self.records.pop(key, None) is not None:
+                    self._append([{"delete": key}])
+            else:
+                self.records = {k: r for k, r in self.records.items() if r["namespace"] != namespace}
+                self._save()
+            self.version += 1
+
+    def export_records(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return {key: dict(record) for key, record in self.records.items()}
+
+    def replace_records(self, records: Dict[str, Dict[str, Any]]):
+        """Swap in another node's records wholesale (query replicas loading a published generation)"""
+        with self.lock:
+            self.records = records
+            self._matchers = {}
+            self._save()
+            self.version += 1
+
+    @staticmethod
+    def is_overview_query(query: str) -> bool:
+        return bool(OVERVIEW_PATTERN.search(query))
+
+    def _matcher(self, namespace: str) -> Tuple[Optional[Pattern], Dict[str, List[str]]]:
+        """One compiled alternation of every name variant of the namespace's sources, cached until they change"""
+        with self.lock:
+            matcher = self._matchers.get(namespace)
+            if matcher is not None:
+                return matcher
+            variants: Dict[str, List[str]] = {}
+            for source in self.sources(namespace):
+                stem = os.path.splitext(source)[0].lower()
+                for variant in {source.lower(), stem, stem.replace("_", " "), stem.replace("-", " ")}:
+                    if len(variant) >= 3:
+                        variants.setdefault(variant, []).append(source)
+            pattern = None
+            if variants:
+                # Longest first, so at each position the most specific name wins; the lookahead
+                # lets names that start at different positions overlap
+                alternation = "|".join(re.escape(v) for v in sorted(variants, key=len, reverse=True))
+                pattern = re.compile(rf"(?<!\w)(?=({alternation})(?!\w))")
+            matcher = self._matchers[namespace] = (pattern, variants)
+            return matcher
+
+    def mentioned_sources(self, namespace: str, query: str) -> List[str]:
+        """Sources whose file name (with or without extension) appears in the query as whole words"""
+        pattern, variants = self._matcher(namespace)
+        if pattern is None:
+            return []
+        mentioned = {}
+        for match in pattern.finditer(query.lower()):
+            for source in variants[match.group(1)]:
+                mentioned[source] = True
+        return list(mentioned)
@@ -0,0 +1,114 @@
+import os
+import math
+import threading
+from typing import Dict, Any, Optional
+
+# Upper bounds of the histogram buckets, in tokens; the last bucket is unbounded
+BUCKET_BOUNDS = [64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (LLM_CHARS_PER_TOKEN characters per token, ~4 for English)"""
+    if not text:
+        return 0
+    return math.ceil(len(text) / float(os.getenv("LLM_CHARS_PER_TOKEN", 4)))
+
+
+class SizeHistogram:
+    """Counts of sizes in power-of-two token buckets, with count, sum and max"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, tokens: int):
+        index = next((i for i, bound in enumerate(BUCKET_BOUNDS) if tokens <= bound), len(BUCKET_BOUNDS))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += tokens
+        self.max = max(self.max, tokens)
+
+    def percentile(self, pct: float) -> Optional[int]:
+        """Upper bound of the bucket holding the pct-th percentile, capped at the largest size seen"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(pct / 100.0 * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(BUCKET_BOUNDS[index], self.max) if index < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={bound}" for bound in BUCKET_BOUNDS] + [f">{BUCKET_BOUNDS[-1]}"]
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 1) if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": self.max,
+            "buckets": {label: count for label, count in zip(labels, self.counts) if count},
+        }
+
+
+class TokenAccountant:
+    """Token usage and prompt-size histograms per kind of LLM call (rag, summary).
+
+    `record_prompt` takes the estimated size of each part of a prompt
+    (context, history, query, the whole prompt with its system instruction)
+    before the call; `record_usage` takes the counts the model reports for every call
+    made, hedges and retries included, so totals match what is billed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms: Dict[str, Dict[str, SizeHistogram]] = {}
+        self.totals: Dict[str, Dict[str, int]] = {}
+
+    def _totals(self, kind: str) -> Dict[str, int]:
+        return self.totals.setdefault(kind, {
+            "requests": 0,
+            "model_calls": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "estimated_calls": 0,
+            "trimmed_requests": 0,
+            "trimmed_documents": 0,
+            "trimmed_tokens": 0,
+        })
+
+    def _observe(self, kind: str, stage: str, tokens: int):
+        self.histograms.setdefault(kind, {}).setdefault(stage, SizeHistogram()).record(tokens)
+
+    def record_prompt(self, kind: str, sizes: Dict[str, int], trimmed_documents: int = 0, trimmed_tokens: int = 0):
+        with self.lock:
+            totals = self._totals(kind)
+            totals["requests"] += 1
+            if trimmed_tokens:
+                totals["trimmed_requests"] += 1
+                totals["trimmed_documents"] += trimmed_documents
+                totals["trimmed_tokens"] += trimmed_tokens
+            for stage, tokens in sizes.items():
+                self._observe(kind, stage, tokens)
+
+    def record_usage(self, kind: str, usage: Dict[str, Any]):
+        with self.lock:
+            totals = self._totals(kind)
+            totals["model_calls"] += 1
+            totals["prompt_tokens"] += usage["prompt_tokens"]
+            totals["completion_tokens"] += usage["completion_tokens"]
+            totals["estimated_calls"] += bool(usage.get("estimated"))
+            self._observe(kind, "completion", usage["completion_tokens"])
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                kind: {
+                    **dict(self.totals.get(kind, {})),
+                    "histograms": {stage: h.to_dict() for stage, h in stages.items()},
+                }
+                for kind, stages in self.histograms.items()
+            }
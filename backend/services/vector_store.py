@@ -1,180 +1,718 @@
 import os
-import chromadb
-from chromadb.config import Settings
-from typing import List, Dict, Any
+import re
+from typing import List, Dict, Any, Optional, Tuple
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
 import uuid
 from sentence_transformers import SentenceTransformer
 
+from services.index_backends import create_backend
+from services import snapshot
+from services.priority_executor import get_shared_executor
+from services.embedding_migration import EmbeddingRegistry, DEFAULT_EMBEDDING_MODEL, LEGACY_COLLECTION_BASE
+from services.dedup import ChunkDeduplicator, chunk_sources, with_sources
+from services.section_index import HierarchicalRetriever
+from services.document_catalog import DocumentCatalog
+
+DEFAULT_NAMESPACE = "default"
+ALL_NAMESPACES = "*"
+NAMESPACE_PATTERN = re.compile(r"^[A-Za-z0-9](?:[A-Za-z0-9_-]{0,38}[A-Za-z0-9])?$")
+
+
+class ReadOnlyStoreError(PermissionError):
+    """Raised for writes to a store running as a read-only query replica"""
+
+
 class VectorStore:
     def __init__(self):
         self.db_path = os.getenv("CHROMA_DB_PATH", "./chroma_db")
-        self.collection_name = "hero_vida_documents"
-        self.client = None
+        self.collection_name = LEGACY_COLLECTION_BASE
+        self.backend_name = os.getenv("VECTOR_BACKEND", "chroma")
+        self.backend = None
+        self.backend_path = self.db_path
+        # (path, backend) of generations swapped out but possibly still serving queries
+        self.retired_backends: List[Tuple[str, Any]] = []
         self.collection = None
-        self.embedding_model = None
-        self.executor = ThreadPoolExecutor(max_workers=4)
+        # (embedding model, namespace) -> collection
+        self.collections: Dict[Tuple[str, str], Any] = {}
+        # Also guards swapping in a whole new backend (see swap_generation)
+        self.collections_lock = threading.RLock()
+        # Query replicas (REPLICA_MODE=true) never write; they only swap in published generations
+        self.read_only = os.getenv("REPLICA_MODE", "false").lower() == "true"
+        # EMBEDDING_MODEL only picks the first model; afterwards migrations change the active one
+        self.registry = EmbeddingRegistry(
+            os.path.join(self.db_path, "embedding_registry.json"),
+            os.getenv("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+        )
+        self.models: Dict[str, Any] = {}
+        # (name, model) replaced as one object, so readers never see a mixed pair
+        self.active_model: Tuple[str, Any] = (self.registry.active_model, None)
+        # Held by every write; a migration holds it while it applies its last diff and switches
+        self.write_lock = threading.RLock()
+        # Corpus generation, bumped by every change to stored chunks so shared answers can tell they are stale
+        self.generation = 0
+        self.encode_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+        # MinHash signatures of stored chunks, per namespace (independent of the embedding model)
+        self.dedup = ChunkDeduplicator(os.path.join(self.db_path, "dedup"))
+        # Section centroids per collection for two-stage retrieval (RETRIEVAL_MODE=hierarchical)
+        self.retriever = HierarchicalRetriever(os.path.join(self.db_path, "sections"))
+        # Source files per namespace with size and ingest time, for /documents (independent of the model)
+        self.catalog = DocumentCatalog(os.path.join(self.db_path, "catalog"))
+        self.stats_max_sources = int(os.getenv("STATS_MAX_SOURCES", 100))
+        # Queries run ahead of ingestion and admin work on the shared executor
+        self.executor = get_shared_executor().view("interactive")
+        self.ingest_executor = get_shared_executor().view("background")
 
-    async def initialize(self):
-        """Initialize ChromaDB client and collection"""
-        def init_db():
-            # Initialize ChromaDB client
-            self.client = chromadb.PersistentClient(
-                path=self.db_path,
-                settings=Settings(
-                    anonymized_telemetry=False,
-                    allow_reset=True
-                )
+    @property
+    def embedding_model_name(self) -> str:
+        return self.active_model[0]
+
+    @property
+    def embedding_model(self):
+        return self.active_model[1]
+
+    def normalize_namespace(self, namespace: Optional[str]) -> str:
+        """Validate a namespace name, mapping None/empty to the default namespace"""
+        if not namespace:
+            return DEFAULT_NAMESPACE
+        if not NAMESPACE_PATTERN.match(namespace):
+            raise ValueError(
+                f"Invalid namespace '{namespace}'. Use 1-40 letters, digits, '-' or '_', "
+                "starting and ending with a letter or digit."
             )
-            
-            # Initialize embedding model
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-            
-            # Get or create collection
-            try:
-                self.collection = self.client.get_collection(name=self.collection_name)
-            except:
-                self.collection = self.client.create_collection(
-                    name=self.collection_name,
-                    metadata={"description": "Hero Vida strategy documents"}
+        return namespace
+
+    def collection_name_for(self, namespace: str, model_name: Optional[str] = None) -> str:
+        """Collection backing a namespace for an embedding model (the active one by default).
+
+        The default namespace of the original model keeps the original collection.
+        """
+        base = self.registry.collection_base(model_name or self.embedding_model_name)
+        if namespace == DEFAULT_NAMESPACE:
+            return base
+        return f"{base}__{namespace}"
+
+    def _namespace_of(self, collection_name: str, model_name: Optional[str] = None) -> Optional[str]:
+        base = self.registry.collection_base(model_name or self.embedding_model_name)
+        if collection_name == base:
+            return DEFAULT_NAMESPACE
+        prefix = f"{base}__"
+        if collection_name.startswith(prefix):
+            return collection_name[len(prefix):]
+        return None
+
+    def _get_collection(self, namespace: str, create: bool = False, model_name: Optional[str] = None):
+        """Return the collection for a namespace, or None if it does not exist and create is False"""
+        model_name = model_name or self.embedding_model_name
+        with self.collections_lock:
+            collection = self.collections.get((model_name, namespace))
+            if collection is not None:
+                return collection
+            name = self.collection_name_for(namespace, model_name)
+            if create:
+                collection = self.backend.get_or_create_collection(
+                    name,
+                    metadata={"description": "Hero Vida strategy documents", "namespace": namespace,
+                              "embedding_model": model_name}
                 )
-        
+                self.registry.record_collection(name, namespace, model_name)
+            else:
+                try:
+                    collection = self.backend.get_collection(name)
+                except Exception:
+                    return None
+            self.collections[(model_name, namespace)] = collection
+            return collection
+
+    def _drop_collection(self, namespace: str, model_name: Optional[str] = None):
+        """Delete a namespace's collection for an embedding model, if it exists"""
+        model_name = model_name or self.embedding_model_name
+        name = self.collection_name_for(namespace, model_name)
+        with self.collections_lock:
+            self.collections.pop((model_name, namespace), None)
+            try:
+                self.backend.delete_collection(name)
+            except Exception:
+                pass
+        self.registry.forget_collection(name)
+        self.retriever.reset(name)
+
+    def _list_namespaces(self, model_name: Optional[str] = None) -> List[str]:
+        namespaces = []
+        for name in self.backend.list_collections():
+            namespace = self._namespace_of(name, model_name)
+            if namespace is not None:
+                namespaces.append(namespace)
+        return sorted(namespaces)
+
+    def _resolve_namespaces(self, namespaces: Optional[List[str]], model_name: Optional[str] = None) -> List[str]:
+        if not namespaces:
+            return [DEFAULT_NAMESPACE]
+        if ALL_NAMESPACES in namespaces:
+            return self._list_namespaces(model_name)
+        return list(dict.fromkeys(self.normalize_namespace(ns) for ns in namespaces))
+
+    def _check_writable(self):
+        if self.read_only:
+            raise ReadOnlyStoreError("This node is a read-only query replica; send writes to the writer node")
+
+    def load_model(self, model_name: str):
+        """Load (once) and return a SentenceTransformer by name"""
+        model = self.models.get(model_name)
+        if model is None:
+            model = self.models[model_name] = SentenceTransformer(model_name)
+        return model
+
+    def switch_model(self, model_name: str, model=None):
+        """Atomically make `model_name` (and its collections) the active embedding model"""
+        self._check_writable()
+        model = model or self.load_model(model_name)
+        with self.write_lock:
+            # Section indexes of the new model's collections may predate writes made since
+            for namespace in self._list_namespaces(model_name):
+                self.retriever.reset(self.collection_name_for(namespace, model_name))
+            self.registry.activate(model_name)
+            self.active_model = (model_name, model)
+            self.generation += 1
+            self.collection = self._get_collection(DEFAULT_NAMESPACE, create=True)
+
+    async def initialize(self):
+        """Initialize the index backend and collection"""
+        def init_db():
+            # Initialize index backend (ChromaDB or in-process local index)
+            self.backend = create_backend(self.db_path, self.backend_name, read_only=self.read_only)
+
+            # Initialize the active embedding model
+            model_name = self.registry.active_model
+            self.active_model = (model_name, self.load_model(model_name))
+
+            # Get or create the default namespace's collection (replicas wait for a published generation)
+            self.collection = self._get_collection(DEFAULT_NAMESPACE, create=not self.read_only)
+
         await asyncio.get_event_loop().run_in_executor(
             self.executor, init_db
         )
 
-    async def add_documents(self, documents: List[Dict[str, Any]], source_file: str):
-        """Add document chunks to the vector store"""
-        def add_docs():
-            if not documents:
-                return
-            
-            # Prepare data for ChromaDB
-            ids = []
-            embeddings = []
-            metadatas = []
-            documents_content = []
-            
+    def close(self):
+        """Persist the backend's buffered index state (call on shutdown)"""
+        with self.write_lock:
+            if self.backend is not None:
+                self.backend.close()
+            self.close_retired()
+
+    def close_retired(self, keep_paths=()):
+        """Close swapped-out generation backends, except those stored under `keep_paths`"""
+        with self.collections_lock:
+            retired = [(path, backend) for path, backend in self.retired_backends if path not in keep_paths]
+            self.retired_backends = [(path, backend) for path, backend in self.retired_backends
+                                     if path in keep_paths]
+        for _, backend in retired:
+            backend.close()
+
+    async def list_namespaces(self) -> List[str]:
+        """List namespaces that have a collection"""
+        return await asyncio.get_event_loop().run_in_executor(
+            self.executor, self._list_namespaces
+        )
+
+    def _embed_batch(self, batches: List[Tuple[List[Dict[str, Any]], str]], model=None) -> List[List[float]]:
+        """Embed the chunk texts of one or more source files in one batched encode call"""
+        documents_content = [doc["content"] for documents, _ in batches for doc in documents]
+        if not documents_content:
+            return []
+        # Generate embeddings in batches rather than one encode call per chunk
+        return (model or self.embedding_model).encode(
+            documents_content, batch_size=self.encode_batch_size
+        ).tolist()
+
+    def _write_batch(self, namespace: str, batches: List[Tuple[List[Dict[str, Any]], str]],
+                     embeddings: Optional[List[List[float]]] = None,
+                     model_name: Optional[str] = None) -> Dict[str, Any]:
+        """Store chunks from one or more source files in a single add call.
+
+        Near duplicates of stored chunks (or of earlier chunks in the same call)
+        are not stored again; the stored chunk gains their source instead.
+        `embeddings` are the chunks' embeddings from `model_name`; without them,
+        or if the active model changed since, only the chunks being kept are
+        embedded here, so collections never mix models. Returns chunk and
+        duplicate counts.
+        """
+        self._check_writable()
+        with self.write_lock:
+            active_name, model = self.active_model
+            collection = self._get_collection(namespace, create=True)
+            ids, metadatas, documents_content = self._prepare_rows(batches)
+            plan = self.dedup.plan(namespace, collection, ids, documents_content, metadatas)
+            keep = plan.keep
+            if keep:
+                if embeddings is None or (model_name is not None and model_name != active_name):
+                    kept_embeddings = model.encode(
+                        [documents_content[i] for i in keep], batch_size=self.encode_batch_size
+                    ).tolist()
+                else:
+                    kept_embeddings = [embeddings[i] for i in keep]
+                kept_ids = [ids[i] for i in keep]
+                kept_metadatas = [metadatas[i] for i in keep]
+                # Add to collection
+                collection.add(
+                    ids=kept_ids,
+                    embeddings=kept_embeddings,
+                    metadatas=kept_metadatas,
+                    documents=[documents_content[i] for i in keep]
+                )
+                self.retriever.on_add(self.collection_name_for(namespace, active_name), collection,
+                                      kept_ids, kept_embeddings, kept_metadatas)
+            if plan.updates:
+                collection.update(ids=list(plan.updates), metadatas=list(plan.updates.values()))
+            self.dedup.commit(namespace, plan)
+            self.catalog.record(namespace, collection, batches, metadatas)
+            if keep or plan.updates:
+                self.generation += 1
+            return {
+                "chunks": len(ids),
+                "stored": len(keep),
+                "duplicates": plan.duplicates,
+                "duplicates_by_source": plan.duplicates_by_source,
+            }
+
+    def _prepare_rows(self, batches: List[Tuple[List[Dict[str, Any]], str]]):
+        """Assign ids and build the (ids, metadatas, documents) rows of chunks"""
+        # Prepare data for ChromaDB
+        ids = []
+        metadatas = []
+        documents_content = []
+        ingested_at = time.time()
+
+        for documents, source_file in batches:
             for doc in documents:
                 # Generate unique ID
-                doc_id = str(uuid.uuid4())
-                ids.append(doc_id)
-                
-                # Generate embedding
-                embedding = self.embedding_model.encode(doc["content"]).tolist()
-                embeddings.append(embedding)
-                
+                ids.append(str(uuid.uuid4()))
+
                 # Prepare metadata
                 metadata = doc["metadata"].copy()
                 metadata["source_file"] = source_file
+                metadata["ingested_at"] = ingested_at
                 metadatas.append(metadata)
-                
+
                 # Add content
                 documents_content.append(doc["content"])
-            
-            # Add to collection
-            self.collection.add(
-                ids=ids,
-                embeddings=embeddings,
-                metadatas=metadatas,
-                documents=documents_content
-            )
-        
-        await asyncio.get_event_loop().run_in_executor(
-            self.executor, add_docs
+
+        return ids, metadatas, documents_content
+
+    def _add_batch(self, namespace: str, batches: List[Tuple[List[Dict[str, Any]], str]]) -> Dict[str, Any]:
+        """Deduplicate, embed and store chunks from one or more source files in a single encode/add call"""
+        return self._write_batch(namespace, batches)
+
+    async def add_documents(self, documents: List[Dict[str, Any]], source_file: str,
+                            namespace: Optional[str] = None):
+        """Add document chunks to the vector store"""
+        namespace = self.normalize_namespace(namespace)
+        return await asyncio.get_event_loop().run_in_executor(
+            self.ingest_executor, self._add_batch, namespace, [(documents, source_file)]
+        )
+
+    async def add_documents_batch(self, batches: List[Tuple[List[Dict[str, Any]], str]],
+                                  namespace: Optional[str] = None):
+        """Add chunks of several source files, embedding them all in one pass"""
+        namespace = self.normalize_namespace(namespace)
+        return await asyncio.get_event_loop().run_in_executor(
+            self.ingest_executor, self._add_batch, namespace, batches
+        )
+
+    async def embed_documents(self, batches: List[Tuple[List[Dict[str, Any]], str]]) -> Tuple[List[List[float]], str]:
+        """Embed stage of ingestion: (chunk embeddings for `batches`, model name), without storing them"""
+        model_name, model = self.active_model
+        embeddings = await asyncio.get_event_loop().run_in_executor(
+            self.ingest_executor, self._embed_batch, batches, model
+        )
+        return embeddings, model_name
+
+    async def write_documents(self, batches: List[Tuple[List[Dict[str, Any]], str]],
+                              embeddings: List[List[float]], namespace: Optional[str] = None,
+                              model_name: Optional[str] = None) -> Dict[str, Any]:
+        """Write stage of ingestion: store chunks with embeddings from `embed_documents`"""
+        namespace = self.normalize_namespace(namespace)
+        return await asyncio.get_event_loop().run_in_executor(
+            self.ingest_executor, self._write_batch, namespace, batches, embeddings, model_name
         )
 
-    async def similarity_search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar documents"""
-        def search():
-            if not self.collection:
-                return []
-            
-            # Generate query embedding
-            query_embedding = self.embedding_model.encode(query).tolist()
-            
-            # Search in collection
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
+    def _search_collection(self, namespace: str, query_embeddings: List[List[float]],
+                           k: int, model_name: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+        """Query a single namespace's collection with precomputed embeddings, one result list per query"""
+        # Collection and section indexes from the same generation, even if a new one is swapped in meanwhile
+        with self.collections_lock:
+            collection = self._get_collection(namespace, model_name=model_name)
+            retriever = self.retriever
+        if collection is None:
+            return [[] for _ in query_embeddings]
+
+        # Large collections: section centroids first, then only their chunks
+        results = retriever.search(self.collection_name_for(namespace, model_name), collection,
+                                        query_embeddings, k)
+        if results is None:
+            # Search in collection (all queries in one call)
+            results = collection.query(
+                query_embeddings=query_embeddings,
                 n_results=k,
                 include=["documents", "metadatas", "distances"]
             )
-            
-            # Format results
-            formatted_results = []
-            if results["documents"] and results["documents"][0]:
-                for i in range(len(results["documents"][0])):
-                    formatted_results.append({
-                        "content": results["documents"][0][i],
-                        "metadata": results["metadatas"][0][i],
-                        "source": results["metadatas"][0][i].get("source", "unknown"),
-                        "distance": results["distances"][0][i] if results.get("distances") else 0.0
+
+        # Format results
+        formatted_results = []
+        for q in range(len(query_embeddings)):
+            query_results = []
+            if results["documents"] and q < len(results["documents"]):
+                for i in range(len(results["documents"][q])):
+                    metadata = results["metadatas"][q][i]
+                    query_results.append({
+                        "id": results["ids"][q][i],
+                        "content": results["documents"][q][i],
+                        "metadata": metadata,
+                        "source": metadata.get("source", "unknown"),
+                        # Every file a deduplicated chunk appeared in
+                        "sources": chunk_sources(metadata) or ["unknown"],
+                        "distance": results["distances"][q][i] if results.get("distances") else 0.0,
+                        "namespace": namespace
                     })
-            
-            return formatted_results
-        
-        return await asyncio.get_event_loop().run_in_executor(
-            self.executor, search
+            formatted_results.append(query_results)
+
+        return formatted_results
+
+    async def encode_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the store's embedding model in one batched pass"""
+        embeddings, _ = await self._encode_active(texts)
+        return embeddings
+
+    async def _encode_active(self, texts: List[str]) -> Tuple[List[List[float]], str]:
+        """Embed texts with the active model; also returns that model's name"""
+        model_name, model = self.active_model
+        if not texts:
+            return [], model_name
+        embeddings = await asyncio.get_event_loop().run_in_executor(
+            self.executor, lambda: model.encode(texts).tolist()
         )
+        return embeddings, model_name
+
+    async def search_by_embeddings(self, query_embeddings: List[List[float]], k: int = 5,
+                                   namespaces: Optional[List[str]] = None,
+                                   model_name: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+        """Search with precomputed query embeddings.
+
+        A single namespace only touches its own collection; several namespaces
+        are searched in parallel and each query's results merged into one top-k
+        by distance. `model_name` pins the collections of the model that produced
+        the embeddings (the active model by default).
+        """
+        loop = asyncio.get_event_loop()
+        model_name = model_name or self.embedding_model_name
+        targets = await loop.run_in_executor(self.executor, self._resolve_namespaces, namespaces, model_name)
+        if not query_embeddings or not targets:
+            return [[] for _ in query_embeddings]
+
+        if len(targets) == 1:
+            return await loop.run_in_executor(
+                self.executor, self._search_collection, targets[0], query_embeddings, k, model_name
+            )
 
-    async def get_stats(self) -> Dict[str, Any]:
+        per_namespace = await asyncio.gather(*[
+            loop.run_in_executor(self.executor, self._search_collection, namespace, query_embeddings, k,
+                                 model_name)
+            for namespace in targets
+        ])
+        merged_results = []
+        for q in range(len(query_embeddings)):
+            merged = [doc for results in per_namespace for doc in results[q]]
+            merged.sort(key=lambda doc: doc["distance"])
+            merged_results.append(merged[:k])
+        return merged_results
+
+    async def similarity_search_batch(self, queries: List[str], k: int = 5,
+                                      namespaces: Optional[List[str]] = None) -> List[List[Dict[str, Any]]]:
+        """Search for similar documents for many queries at once.
+
+        All queries are embedded in one batched encode and sent to each
+        collection in a single query call.
+        """
+        if not queries or not self.embedding_model:
+            return [[] for _ in queries]
+
+        # Generate all query embeddings in one pass, reused for every namespace
+        query_embeddings, model_name = await self._encode_active(queries)
+        return await self.search_by_embeddings(query_embeddings, k, namespaces, model_name)
+
+    async def similarity_search_with_embedding(self, query: str, k: int = 5,
+                                               namespaces: Optional[List[str]] = None):
+        """Search for similar documents, also returning the query embedding for reuse"""
+        if not self.embedding_model:
+            return [], None
+        query_embeddings, model_name = await self._encode_active([query])
+        results = await self.search_by_embeddings(query_embeddings, k, namespaces, model_name)
+        return results[0], query_embeddings[0]
+
+    async def similarity_search(self, query: str, k: int = 5,
+                                namespaces: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Search for similar documents.
+
+        A single namespace only touches its own collection. Several namespaces
+        are searched in parallel and their results merged into one top-k by distance.
+        """
+        results = await self.similarity_search_batch([query], k, namespaces)
+        return results[0]
+
+    async def get_stats(self, namespace: Optional[str] = None) -> Dict[str, Any]:
         """Get database statistics"""
+        namespace = self.normalize_namespace(namespace)
+
         def get_db_stats():
-            if not self.collection:
-                return {"total_documents": 0, "total_chunks": 0, "collections": []}
-            
+            collection = self._get_collection(namespace)
+            namespaces = self._list_namespaces()
+            if not collection:
+                return {"total_documents": 0, "total_chunks": 0, "collections": [],
+                        "namespace": namespace, "namespaces": namespaces}
+
             # Get collection count
-            count = self.collection.count()
-            
-            # Get unique sources
-            results = self.collection.get(include=["metadatas"])
-            sources = set()
-            if results["metadatas"]:
-                for metadata in results["metadatas"]:
-                    if "source" in metadata:
-                        sources.add(metadata["source"])
-            
-            return {
-                "total_documents": len(sources),
+            count = collection.count()
+
+            # The first STATS_MAX_SOURCES source names from the catalog; /documents pages through all of them
+            listing = self.catalog.list(namespace, collection, limit=self.stats_max_sources)
+
+            stats = {
+                "total_documents": listing["total"],
                 "total_chunks": count,
-                "collections": [self.collection_name],
-                "sources": list(sources)
+                "collections": [self.collection_name_for(namespace)],
+                "backend": self.backend_name,
+                "embedding_model": self.embedding_model_name,
+                "namespace": namespace,
+                "namespaces": namespaces,
+                "sources": [document["source"] for document in listing["documents"]],
+                "sources_truncated": listing["next_cursor"] is not None,
+                "generation": self.generation
             }
-        
+            stats["dedup"] = self.dedup.get_stats(namespace)
+            stats["retrieval"] = self.retriever.get_stats(self.collection_name_for(namespace))
+            # Local collections report their vector memory footprint and compression savings
+            if hasattr(collection, "index_stats"):
+                stats["index"] = collection.index_stats()
+            return stats
+
         return await asyncio.get_event_loop().run_in_executor(
             self.executor, get_db_stats
         )
 
-    async def clear_database(self):
-        """Clear all documents from the database"""
+    async def list_documents(self, namespace: Optional[str] = None, sort: str = "name", order: str = "asc",
+                             prefix: Optional[str] = None, doc_type: Optional[str] = None,
+                             cursor: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """One page of a namespace's source files from the document catalog, with a cursor for the next page"""
+        namespace = self.normalize_namespace(namespace)
+
+        def list_page():
+            with self.collections_lock:
+                catalog = self.catalog
+                collection = self._get_collection(namespace)
+            if collection is None:
+                return {"namespace": namespace, "documents": [], "next_cursor": None, "total": 0}
+            return catalog.list(namespace, collection, sort, order, prefix, doc_type, cursor, limit)
+
+        return await asyncio.get_event_loop().run_in_executor(self.executor, list_page)
+
+    async def clear_database(self, namespace: Optional[str] = None):
+        """Clear all documents from one namespace"""
+        namespace = self.normalize_namespace(namespace)
+
         def clear_db():
-            if self.collection:
-                # Get all IDs
-                results = self.collection.get()
-                if results["ids"]:
-                    # Delete all documents
-                    self.collection.delete(ids=results["ids"])
-        
+            self._check_writable()
+            with self.write_lock:
+                collection = self._get_collection(namespace)
+                if collection:
+                    # Get all IDs
+                    results = collection.get()
+                    if results["ids"]:
+                        # Delete all documents
+                        collection.delete(ids=results["ids"])
+                self.dedup.reset(namespace)
+                self.retriever.reset(self.collection_name_for(namespace))
+                self.catalog.reset(namespace)
+                self.generation += 1
+
         await asyncio.get_event_loop().run_in_executor(
-            self.executor, clear_db
+            self.ingest_executor, clear_db
         )
 
-    async def delete_by_source(self, source_file: str):
+    async def export_snapshot(self, path: str, namespace: Optional[str] = None,
+                              dtype: str = "float32") -> Dict[str, Any]:
+        """Export one namespace to a binary snapshot directory; returns its manifest.
+
+        Writes wait until the export is done, so the snapshot is one consistent cut.
+        """
+        namespace = self.normalize_namespace(namespace)
+
+        def export():
+            with self.write_lock:
+                collection = self._get_collection(namespace)
+                if collection is None:
+                    raise ValueError(f"Namespace '{namespace}' does not exist")
+                return snapshot.export_collection(collection, path, dtype, info={
+                    "namespace": namespace,
+                    "embedding_model": self.embedding_model_name,
+                    "backend": self.backend_name,
+                })
+
+        return await asyncio.get_event_loop().run_in_executor(self.ingest_executor, export)
+
+    async def export_generation(self, directory: str, dtype: str = "float32") -> Dict[str, Any]:
+        """Export every namespace of the active model to `<directory>/<namespace>` as one consistent cut.
+
+        Writes wait until the export is done, so all namespaces reflect the
+        same corpus generation. Returns the generation and per-namespace counts.
+        """
+        def export():
+            with self.write_lock:
+                namespaces = {}
+                for namespace in self._list_namespaces():
+                    collection = self._get_collection(namespace)
+                    manifest = snapshot.export_collection(
+                        collection, os.path.join(directory, namespace), dtype, info={
+                            "namespace": namespace,
+                            "embedding_model": self.embedding_model_name,
+                            "backend": self.backend_name,
+                        }
+                    )
+                    namespaces[namespace] = manifest["count"]
+                return {
+                    "generation": self.generation,
+                    "embedding_model": self.embedding_model_name,
+                    "namespaces": namespaces,
+                }
+
+        return await asyncio.get_event_loop().run_in_executor(self.ingest_executor, export)
+
+    async def swap_generation(self, path: str, snapshots: Dict[str, str], model_name: str,
+                              verify: bool = True) -> Dict[str, int]:
+        """Build a new index at `path` from namespace snapshots, then serve it instead of the current one.
+
+        The import happens off to the side; the swap itself only replaces the
+        backend, collection cache and section indexes under collections_lock,
+        so queries already running finish on the collections they started
+        with and later ones see the new generation. Returns rows per namespace.
+        """
+        def load():
+            model = self.load_model(model_name)
+            builder = create_backend(path, self.backend_name)
+            counts = {}
+            for namespace, snapshot_path in snapshots.items():
+                _, embeddings, table = snapshot.load_snapshot(snapshot_path, verify)
+                collection = builder.get_or_create_collection(
+                    self.collection_name_for(namespace, model_name),
+                    metadata={"description": "Hero Vida strategy documents", "namespace": namespace,
+                              "embedding_model": model_name}
+                )
+                counts[namespace] = snapshot.import_into_collection(collection, embeddings, table)
+                if hasattr(collection, "close"):
+                    collection.close()
+            # Serve from a fresh read-only open of what was just written
+            backend = builder
+            if self.read_only:
+                builder.close()
+                backend = create_backend(path, self.backend_name, read_only=True)
+            retriever = HierarchicalRetriever(os.path.join(path, "sections"))
+            catalog = DocumentCatalog(os.path.join(path, "catalog"))
+            # Build section indexes and document listings now rather than on the first queries after the swap
+            for namespace in snapshots:
+                name = self.collection_name_for(namespace, model_name)
+                collection = backend.get_collection(name)
+                if retriever.enabled:
+                    retriever.index_for(name, collection)
+                catalog.catalog_for(namespace, collection)
+
+            with self.collections_lock:
+                if self.backend is not None and self.backend is not backend:
+                    # Queries already running may still use it; closed once retired (close_retired)
+                    self.retired_backends.append((self.backend_path, self.backend))
+                self.backend, self.backend_path = backend, path
+                self.collections = {}
+                self.retriever = retriever
+                self.catalog = catalog
+                if model_name != self.embedding_model_name:
+                    self.registry.activate(model_name)
+                    self.active_model = (model_name, model)
+                self.collection = self._get_collection(DEFAULT_NAMESPACE)
+                self.generation += 1
+            return counts
+
+        return await asyncio.get_event_loop().run_in_executor(self.ingest_executor, load)
+
+    async def import_snapshot(self, path: str, namespace: Optional[str] = None,
+                              verify: bool = True, replace: bool = True) -> Dict[str, Any]:
+        """Load a snapshot into a namespace (the snapshot's own by default), replacing its contents"""
+        def do_import():
+            self._check_writable()
+            manifest, embeddings, table = snapshot.load_snapshot(path, verify)
+            if manifest.get("embedding_model") != self.embedding_model_name:
+                raise snapshot.SnapshotError(
+                    f"Snapshot embeddings come from {manifest.get('embedding_model')}, "
+                    f"this store uses {self.embedding_model_name}"
+                )
+            target = self.normalize_namespace(namespace or manifest.get("namespace"))
+            with self.write_lock:
+                if replace:
+                    self._drop_collection(target)
+                collection = self._get_collection(target, create=True)
+                if target == DEFAULT_NAMESPACE:
+                    self.collection = collection
+                rows = snapshot.import_into_collection(collection, embeddings, table)
+                self.dedup.reset(target)
+                self.retriever.reset(self.collection_name_for(target))
+                self.catalog.reset(target)
+                self.generation += 1
+            return {**manifest, "namespace": target, "imported": rows}
+
+        return await asyncio.get_event_loop().run_in_executor(self.ingest_executor, do_import)
+
+    async def delete_by_source(self, source_file: str, namespace: Optional[str] = None):
         """Delete all documents from a specific source file"""
+        namespace = self.normalize_namespace(namespace)
+
         def delete_source():
-            if not self.collection:
-                return
-            
-            # Query documents by source
-            results = self.collection.get(
-                where={"source": source_file},
-                include=["ids"]
-            )
-            
-            if results["ids"]:
-                self.collection.delete(ids=results["ids"])
-        
+            self._check_writable()
+            with self.write_lock:
+                collection = self._get_collection(namespace)
+                if not collection:
+                    return
+
+                # Query documents by source, and deduplicated chunks it shares with other sources
+                results = collection.get(
+                    where={"source": source_file},
+                    include=["metadatas"]
+                )
+                shared = collection.get(
+                    where={"source_count": {"$gt": 1}},
+                    include=["metadatas"]
+                )
+
+                delete_ids = []
+                updates = {}
+                for doc_id, metadata in zip(results["ids"] + shared["ids"],
+                                            results["metadatas"] + shared["metadatas"]):
+                    sources = chunk_sources(metadata)
+                    if source_file not in sources or doc_id in updates:
+                        continue
+                    remaining = [source for source in sources if source != source_file]
+                    if remaining:
+                        updates[doc_id] = with_sources(metadata, remaining)
+                    else:
+                        delete_ids.append(doc_id)
+
+                if delete_ids:
+                    self.retriever.on_delete(self.collection_name_for(namespace), collection, delete_ids)
+                    collection.delete(ids=delete_ids)
+                    self.dedup.forget(namespace, delete_ids)
+                if updates:
+                    collection.update(ids=list(updates), metadatas=list(updates.values()))
+                self.catalog.forget(namespace, [source_file])
+                if delete_ids or updates:
+                    self.generation += 1
+
         await asyncio.get_event_loop().run_in_executor(
-            self.executor, delete_source
+            self.ingest_executor, delete_source
         )
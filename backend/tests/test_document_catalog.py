@@ -0,0 +1,20 @@
+from services.document_catalog import NamespaceCatalog
+
+
+def _entry(source, ingested_at, size=10):
+    return {"source": source, "type": "csv", "size": size, "chunks": 1, "content_hash": None,
+            "ingested_at": ingested_at, "updated_at": ingested_at}
+
+
+def test_reingest_keeps_first_ingest_time_after_reopen(tmp_path):
+    path = str(tmp_path / "default.jsonl")
+    catalog = NamespaceCatalog(path)
+    catalog.upsert([_entry("a.csv", 100), _entry("b.csv", 150)])
+    catalog.upsert([_entry("a.csv", 200, size=20)])
+    assert catalog.entries["a.csv"]["ingested_at"] == 100
+
+    reopened = NamespaceCatalog(path)
+    assert reopened.entries["a.csv"]["ingested_at"] == 100
+    assert reopened.entries["a.csv"]["size"] == 20
+    documents, _ = reopened.page(sort="ingested_at")
+    assert [d["source"] for d in documents] == ["a.csv", "b.csv"]
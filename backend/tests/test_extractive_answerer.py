@@ -0,0 +1,27 @@
+import asyncio
+
+import numpy as np
+
+from services.extractive_answerer import ExtractiveAnswerer
+
+
+class FakeVectorStore:
+    embedding_model_name = "fake"
+
+    async def encode_texts(self, texts):
+        # Same text, same vector; "units" sentences point along the query
+        return [[1.0, 0.0] if "units" in text.lower() else [0.0, 1.0] for text in texts]
+
+
+def test_answer_dedupes_sentences_and_strips_existing_bullets():
+    docs = [
+        {"id": "a", "source": "sales.csv", "content": "Units_Sold: 18 months of sales data\nOther filler text here."},
+        {"id": "b", "source": "sales.csv", "content": "Units_Sold: 18 months of sales data"},
+        {"id": "c", "source": "sales.csv",
+         "content": "- Customer_Segment = Fleet (3 rows): Units total 40\n- Customer_Segment = Retail: units 12"},
+    ]
+    answer = asyncio.run(ExtractiveAnswerer(FakeVectorStore()).answer(np.array([1.0, 0.0]), docs, max_sentences=3))
+    texts = [p["text"] for p in answer["passages"]]
+    assert len(texts) == len(set(texts)) == 3
+    assert "- - " not in answer["response"]
+    assert answer["response"].count("Units_Sold: 18 months") == 1
@@ -0,0 +1,24 @@
+import numpy as np
+
+from services.index_backends import LocalCollection
+
+
+def test_hnsw_search_from_stale_snapshot_fills_k(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCAL_INDEX_HNSW_THRESHOLD", "100")
+    collection = LocalCollection(str(tmp_path / "c"))
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(500, 16)).astype(np.float32)
+    collection.add([f"id{i}" for i in range(500)], vectors.tolist(), [{} for _ in range(500)], [""] * 500)
+    assert collection.hnsw is not None
+    state = collection._snapshot()
+    query = vectors[0]
+    # Rows added after the snapshot sit closest to the query and are dropped from its results
+    near = np.repeat(query[None, :], 20, axis=0) + rng.normal(scale=1e-3, size=(20, 16)).astype(np.float32)
+    collection.add([f"new{i}" for i in range(20)], near.tolist(), [{} for _ in range(20)], [""] * 20)
+
+    rows, _ = collection._search_rows(state, query, 5, None)
+
+    assert len(rows) == 5
+    assert (rows < 500).all()
+    assert rows[0] == 0
+    collection.close()
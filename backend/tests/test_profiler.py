@@ -0,0 +1,45 @@
+import time
+
+from services.priority_executor import PriorityExecutor
+from services.profiler import SamplingProfiler
+
+
+def _sampled_threads(run):
+    profiler = SamplingProfiler(interval=0.002)
+    profiler.start()
+    try:
+        run()
+    finally:
+        profiler.stop()
+    return {name: len(stacks) for name, stacks, _ in profiler.samples.values()}
+
+
+def test_idle_priority_executor_workers_are_not_sampled():
+    executor = PriorityExecutor(workers=4)
+    try:
+        sampled = _sampled_threads(lambda: time.sleep(0.2))
+    finally:
+        executor.shutdown()
+    assert not [name for name in sampled if name.startswith("PriorityExecutor-")]
+    assert sampled.get("MainThread", 0) > 0
+
+
+def test_busy_priority_executor_worker_is_sampled():
+    executor = PriorityExecutor(workers=4)
+    try:
+        sampled = _sampled_threads(lambda: executor.submit("background", time.sleep, 0.2).result())
+    finally:
+        executor.shutdown()
+    workers = [name for name in sampled if name.startswith("PriorityExecutor-")]
+    # Only the one running the task, not the three idle ones
+    assert len(workers) == 1
+
+
+def test_idle_thread_pool_workers_are_not_sampled():
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        for future in [pool.submit(lambda: None) for _ in range(3)]:
+            future.result()
+        sampled = _sampled_threads(lambda: time.sleep(0.1))
+    assert not [name for name in sampled if name.startswith("ThreadPoolExecutor-")]
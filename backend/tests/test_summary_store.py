@@ -0,0 +1,27 @@
+from services.summary_store import SummaryStore
+
+
+def _store(tmp_path, monkeypatch, sources):
+    monkeypatch.setenv("CHROMA_DB_PATH", str(tmp_path))
+    store = SummaryStore()
+    for source in sources:
+        store.mark_ingested("default", source, "hash")
+    return store
+
+
+def test_mentioned_sources_match_whole_names(tmp_path, monkeypatch):
+    store = _store(tmp_path, monkeypatch, ["q3_report.pdf", "old.csv", "sales-plan.pdf"])
+    assert store.mentioned_sources("default", "summarize q3 report") == ["q3_report.pdf"]
+    assert store.mentioned_sources("default", "Summarize Q3_REPORT.PDF and old") == ["q3_report.pdf", "old.csv"]
+    assert store.mentioned_sources("default", "what about q3 reporting") == []
+    assert store.mentioned_sources("default", "any golden insights") == []
+    assert store.mentioned_sources("default", "outline the sales plan") == ["sales-plan.pdf"]
+
+
+def test_mentioned_sources_follow_new_and_deleted_sources(tmp_path, monkeypatch):
+    store = _store(tmp_path, monkeypatch, ["old.csv"])
+    assert store.mentioned_sources("default", "summarize old and new") == ["old.csv"]
+    store.mark_ingested("default", "new.csv", "hash")
+    store.delete("default", "old.csv")
+    assert store.mentioned_sources("default", "summarize old and new") == ["new.csv"]
+    assert store.mentioned_sources("other", "summarize old and new") == []
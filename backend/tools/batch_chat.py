@@ -0,0 +1,82 @@
+"""Run a file of canned questions through /chat/batch.
+
+Questions come from a text file (one per line), a JSON list, or a CSV column.
+Results are written as NDJSON as they stream back, with per-query timings.
+
+Usage (from backend/):
+    python -m tools.batch_chat questions.txt --out answers.ndjson --concurrency 8
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from typing import List
+
+import httpx
+
+
+def load_queries(path: str, column: str = "query") -> List[str]:
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8") as f:
+        if ext == ".json":
+            data = json.load(f)
+            return [q if isinstance(q, str) else q[column] for q in data]
+        if ext == ".csv":
+            return [row[column] for row in csv.DictReader(f) if row.get(column, "").strip()]
+        return [line.strip() for line in f if line.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a list of questions via /chat/batch")
+    parser.add_argument("queries_file", help=".txt (one per line), .json list, or .csv")
+    parser.add_argument("--column", default="query", help="CSV column / JSON key holding the question")
+    parser.add_argument("--url", default=os.getenv("API_URL", "http://localhost:8000"))
+    parser.add_argument("--out", help="NDJSON output file (default: stdout)")
+    parser.add_argument("--namespace", help="Namespace to search")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, help="Concurrent LLM calls on the server")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Queries per request")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    args = parser.parse_args(argv)
+
+    queries = load_queries(args.queries_file, args.column)
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    start = time.perf_counter()
+    done = errors = 0
+    try:
+        with httpx.Client(base_url=args.url, timeout=args.timeout) as client:
+            for offset in range(0, len(queries), args.chunk_size):
+                payload = {
+                    "queries": queries[offset:offset + args.chunk_size],
+                    "namespace": args.namespace,
+                    "k": args.k,
+                    "max_concurrency": args.concurrency,
+                }
+                with client.stream("POST", "/chat/batch", json=payload) as response:
+                    if response.status_code != 200:
+                        response.read()
+                        raise SystemExit(f"Batch request failed ({response.status_code}): {response.text}")
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        record = json.loads(line)
+                        if "summary" in record:
+                            continue
+                        record["index"] += offset
+                        done += 1
+                        errors += 1 if "error" in record else 0
+                        out.write(json.dumps(record) + "\n")
+                        out.flush()
+                        print(f"\r{done}/{len(queries)} answered, {errors} errors", end="", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"\nDone: {done} queries in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.2f}/s), "
+          f"{errors} errors", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
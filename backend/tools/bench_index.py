@@ -0,0 +1,217 @@
+"""Conformance check and benchmark for the vector index backends.
+
+Every backend first runs the same behavioural checks (add/query/get/delete/
+count, metadata filters, persistence across reopen), then is timed on a
+synthetic clustered corpus: bulk insert, single-query latency and recall@k
+against exact search.
+
+The local-float16 / local-int8 / local-pq kinds use compressed vector codes
+with full-precision re-scoring; for them the table also shows the memory the
+codes save and recall without re-scoring ("raw"), i.e. the quantizer alone.
+
+Usage (from backend/):
+    python -m tools.bench_index --n 50000 --dim 384 --queries 200
+    python -m tools.bench_index --backends local-flat,local-float16,local-int8,local-pq
+"""
+import time
+import shutil
+import argparse
+import tempfile
+from typing import List, Dict, Any, Callable
+
+import numpy as np
+
+from services.index_backends import ChromaIndexBackend, LocalIndexBackend
+from tools.loadgen import percentile
+
+
+COMPRESSED_KINDS = {"local-float16": "float16", "local-int8": "int8", "local-pq": "pq"}
+
+
+def _open_backend(kind: str, path: str):
+    if kind == "chroma":
+        return ChromaIndexBackend(path)
+    return LocalIndexBackend(path, compression=COMPRESSED_KINDS.get(kind, "none"))
+
+
+def _open_collection(kind: str, path: str, name: str, train_size: int = 32):
+    collection = _open_backend(kind, path).get_or_create_collection(name)
+    if kind == "local-flat":
+        collection.hnsw_threshold = float("inf")
+    elif kind == "local-hnsw":
+        collection.hnsw_threshold = 0
+    elif kind in COMPRESSED_KINDS:
+        # Train as soon as there is a sample, so the checks exercise the compressed path
+        collection.train_size = train_size
+    return collection
+
+
+def check_backend(kind: str) -> List[str]:
+    """Run the shared conformance checks; returns a list of failures"""
+    failures = []
+
+    def expect(condition: bool, message: str):
+        if not condition:
+            failures.append(message)
+
+    path = tempfile.mkdtemp(prefix=f"index-check-{kind}-")
+    try:
+        rng = np.random.default_rng(7)
+        vectors = rng.normal(size=(60, 8)).astype(np.float32)
+        ids = [f"chunk-{i}" for i in range(60)]
+        metadatas = [{"source": f"file{i % 3}.pdf", "chunk_id": i} for i in range(60)]
+        documents = [f"document text {i}" for i in range(60)]
+
+        collection = _open_collection(kind, path, "conformance")
+        collection.add(ids=ids, embeddings=vectors.tolist(), metadatas=metadatas, documents=documents)
+        expect(collection.count() == 60, "count after add")
+
+        result = collection.query(query_embeddings=[vectors[10].tolist()], n_results=3,
+                                  include=["documents", "metadatas", "distances"])
+        expect(result["ids"][0][0] == "chunk-10", "nearest neighbour of a stored vector is itself")
+        expect(result["documents"][0][0] == "document text 10", "documents returned with query")
+        expect(result["distances"][0][0] < 1e-3, "self distance is ~0")
+        expect(result["distances"][0] == sorted(result["distances"][0]), "distances ascending")
+
+        filtered = collection.query(query_embeddings=[vectors[10].tolist()], n_results=5,
+                                    where={"source": "file2.pdf"},
+                                    include=["metadatas", "distances"])
+        expect(len(filtered["metadatas"][0]) == 5, "filtered query returns k rows")
+        expect(all(m["source"] == "file2.pdf" for m in filtered["metadatas"][0]), "where filter respected")
+
+        got = collection.get(where={"source": "file0.pdf"}, include=["metadatas"])
+        expect(len(got["ids"]) == 20, "get by where")
+
+        collection.delete(where={"source": "file0.pdf"})
+        expect(collection.count() == 40, "count after delete")
+        result = collection.query(query_embeddings=[vectors[0].tolist()], n_results=40,
+                                  include=["metadatas"])
+        expect(all(m["source"] != "file0.pdf" for m in result["metadatas"][0]), "deleted rows not returned")
+
+        reopened = _open_collection(kind, path, "conformance") if kind == "chroma" else \
+            _open_backend(kind, path).get_collection("conformance")
+        expect(reopened.count() == 40, "count survives reopen")
+        result = reopened.query(query_embeddings=[vectors[11].tolist()], n_results=1,
+                                include=["documents"])
+        expect(result["ids"][0] == ["chunk-11"], "query after reopen")
+    except ImportError:
+        raise
+    except Exception as e:
+        failures.append(f"raised {type(e).__name__}: {e}")
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+    return failures
+
+
+def synthetic_corpus(n: int, dim: int, seed: int = 0):
+    """Clustered unit vectors, roughly like sentence embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 200), dim)).astype(np.float32)
+    assignment = rng.integers(0, len(centers), size=n)
+    vectors = centers[assignment] + 0.35 * rng.normal(size=(n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def _timed(fn: Callable) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _recall(collection, queries: np.ndarray, truth: np.ndarray, k: int):
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k,
+                                  include=["distances"])
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(int(i) for i in result["ids"][0]) & set(expected.tolist()))
+    return hits / (len(queries) * k), latencies
+
+
+def bench_backend(kind: str, vectors: np.ndarray, queries: np.ndarray,
+                  truth: np.ndarray, k: int, batch: int, train_size: int) -> Dict[str, Any]:
+    path = tempfile.mkdtemp(prefix=f"index-bench-{kind}-")
+    try:
+        collection = _open_collection(kind, path, "bench", train_size)
+        ids = [str(i) for i in range(len(vectors))]
+        metadatas = [{"source": f"file{i % 50}.pdf"} for i in range(len(vectors))]
+
+        def insert():
+            for start in range(0, len(vectors), batch):
+                end = start + batch
+                collection.add(ids=ids[start:end], embeddings=vectors[start:end].tolist(),
+                               metadatas=metadatas[start:end], documents=ids[start:end])
+
+        insert_seconds = _timed(insert)
+
+        recall, latencies = _recall(collection, queries, truth, k)
+        row = {
+            "backend": kind,
+            "insert_s": insert_seconds,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "recall": recall,
+            "recall_raw": None,
+            "vector_mb": len(vectors) * vectors.shape[1] * 4 / 1e6,
+        }
+        if kind in COMPRESSED_KINDS:
+            stats = collection.index_stats()
+            row["vector_mb"] = stats["resident_vector_bytes"] / 1e6
+            rerank_factor, collection.rerank_factor = collection.rerank_factor, 0
+            row["recall_raw"], _ = _recall(collection, queries, truth, k)
+            collection.rerank_factor = rerank_factor
+        return row
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check and benchmark vector index backends")
+    parser.add_argument("--backends", default="chroma,local-flat,local-hnsw")
+    parser.add_argument("--n", type=int, default=20000, help="Corpus size")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=1000, help="Insert batch size")
+    parser.add_argument("--train-size", type=int, default=4096, help="Quantizer training sample (compressed kinds)")
+    parser.add_argument("--skip-bench", action="store_true", help="Only run conformance checks")
+    args = parser.parse_args(argv)
+
+    kinds = [k.strip() for k in args.backends.split(",") if k.strip()]
+    available = []
+    for kind in kinds:
+        try:
+            failures = check_backend(kind)
+        except ImportError as e:
+            print(f"[skip] {kind}: {e}")
+            continue
+        if failures:
+            print(f"[FAIL] {kind}: " + "; ".join(failures))
+        else:
+            print(f"[ ok ] {kind}")
+        available.append(kind)
+
+    if args.skip_bench or not available:
+        return
+
+    vectors = synthetic_corpus(args.n, args.dim)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, len(vectors), size=args.queries)] + \
+        0.05 * rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+    scores = queries @ vectors.T
+    truth = np.argsort(-scores, axis=1)[:, :args.k]
+
+    print(f"\n{'backend':<14} {'insert s':>9} {'p50 ms':>8} {'p95 ms':>8} {'recall@' + str(args.k):>9} "
+          f"{'raw':>6} {'vector MB':>10}")
+    for kind in available:
+        row = bench_backend(kind, vectors, queries, truth, args.k, args.batch, args.train_size)
+        raw = f"{row['recall_raw']:.3f}" if row["recall_raw"] is not None else "-"
+        print(f"{row['backend']:<14} {row['insert_s']:>9.2f} {row['p50_ms']:>8.2f} "
+              f"{row['p95_ms']:>8.2f} {row['recall']:>9.3f} {raw:>6} {row['vector_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
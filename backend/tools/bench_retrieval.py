@@ -0,0 +1,134 @@
+"""Benchmark flat vs hierarchical (two-stage) retrieval.
+
+Builds a synthetic corpus shaped like ingested documents: each source has a
+topic, each section of a source a sub-topic, and each chunk is a noisy point
+around its section. Queries are noisy copies of random chunks. For flat
+search and for hierarchical search at several candidate-section counts the
+table shows query latency, recall@k against exact flat search, and how many
+of the top k come from the query's own source.
+
+Usage (from backend/):
+    python -m tools.bench_retrieval --sources 2000 --chunks-per-source 100
+    python -m tools.bench_retrieval --backend local-hnsw --candidates 8,32,128
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from typing import List, Dict, Any
+
+import numpy as np
+
+from services.section_index import HierarchicalRetriever
+from tools.bench_index import _open_collection
+from tools.loadgen import percentile
+
+
+def document_corpus(sources: int, chunks_per_source: int, section_chunks: int, dim: int,
+                    spread: float = 0.8, noise: float = 1.5, seed: int = 0):
+    """(vectors, metadatas) for `sources` files of `chunks_per_source` chunks each.
+
+    `spread` is how far sections stray from their source's topic and `noise`
+    how far chunks stray from their section, both relative to the topic scale.
+    """
+    rng = np.random.default_rng(seed)
+    n = sources * chunks_per_source
+    source_of = np.repeat(np.arange(sources), chunks_per_source)
+    chunk_of = np.tile(np.arange(chunks_per_source), sources)
+    topics = rng.normal(size=(sources, dim)).astype(np.float32)
+    sections_per_source = -(-chunks_per_source // section_chunks)
+    subtopics = topics[:, None, :] + spread * rng.normal(size=(sources, sections_per_source, dim)).astype(np.float32)
+    vectors = subtopics[source_of, chunk_of // section_chunks] + noise * rng.normal(size=(n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    metadatas = [{"source": f"doc{s}.pdf", "chunk_id": int(c)} for s, c in zip(source_of, chunk_of)]
+    return vectors, metadatas
+
+
+def _measure(search, queries: np.ndarray, truth: np.ndarray, query_sources: List[str], k: int) -> Dict[str, Any]:
+    latencies = []
+    hits = 0
+    same_source = 0
+    for query, expected, source in zip(queries, truth, query_sources):
+        start = time.perf_counter()
+        result = search(query)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(int(i) for i in result["ids"]) & set(expected.tolist()))
+        same_source += sum(1 for m in result["metadatas"] if m["source"] == source)
+    total = len(queries) * k
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "recall": hits / total,
+        "same_source": same_source / total,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark flat vs hierarchical retrieval")
+    parser.add_argument("--backend", default="local-flat", help="chroma, local-flat or local-hnsw")
+    parser.add_argument("--sources", type=int, default=1000)
+    parser.add_argument("--chunks-per-source", type=int, default=100)
+    parser.add_argument("--section-chunks", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--chunk-noise", type=float, default=1.5, help="Chunk spread around its section")
+    parser.add_argument("--noise", type=float, default=0.08, help="Query noise around the source chunk")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--candidates", default="8,32,128", help="Candidate section counts to try")
+    args = parser.parse_args(argv)
+
+    vectors, metadatas = document_corpus(args.sources, args.chunks_per_source, args.section_chunks, args.dim,
+                                         noise=args.chunk_noise)
+    rng = np.random.default_rng(1)
+    picks = rng.integers(0, len(vectors), size=args.queries)
+    queries = vectors[picks] + args.noise * rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+    query_sources = [metadatas[i]["source"] for i in picks]
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+
+    path = tempfile.mkdtemp(prefix="retrieval-bench-")
+    try:
+        collection = _open_collection(args.backend, os.path.join(path, "index"), "bench")
+        ids = [str(i) for i in range(len(vectors))]
+        start = time.perf_counter()
+        for offset in range(0, len(vectors), 1000):
+            collection.add(ids=ids[offset:offset + 1000], embeddings=vectors[offset:offset + 1000].tolist(),
+                           metadatas=metadatas[offset:offset + 1000], documents=ids[offset:offset + 1000])
+        insert_seconds = time.perf_counter() - start
+
+        retriever = HierarchicalRetriever(os.path.join(path, "sections"))
+        retriever.section_chunks = args.section_chunks
+        start = time.perf_counter()
+        index = retriever.index_for("bench", collection)
+        build_seconds = time.perf_counter() - start
+        stats = index.stats()
+        print(f"{len(vectors)} chunks in {args.sources} sources / {stats['sections']} sections; "
+              f"insert {insert_seconds:.1f}s, section index build {build_seconds:.2f}s")
+
+        def flat(query):
+            result = collection.query(query_embeddings=[query.tolist()], n_results=args.k,
+                                      include=["metadatas", "distances"])
+            return {"ids": result["ids"][0], "metadatas": result["metadatas"][0]}
+
+        rows = [("flat", _measure(flat, queries, truth, query_sources, args.k))]
+        retriever.enabled = True
+        retriever.min_chunks = 0
+        for candidates in [int(c) for c in args.candidates.split(",") if c.strip()]:
+            retriever.candidate_sections = candidates
+
+            def hierarchical(query):
+                result = retriever.search("bench", collection, [query], args.k)
+                return {"ids": result["ids"][0], "metadatas": result["metadatas"][0]}
+
+            rows.append((f"hier-{candidates}", _measure(hierarchical, queries, truth, query_sources, args.k)))
+
+        print(f"\n{'search':<12} {'p50 ms':>8} {'p95 ms':>8} {'recall@' + str(args.k):>9} {'same src':>9}")
+        for name, row in rows:
+            print(f"{name:<12} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['recall']:>9.3f} "
+                  f"{row['same_source']:>9.3f}")
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""Offline retrieval evaluation: sweep chunking, k and backends against a golden set.
+
+The corpus is data/hero_vida_sales_data.csv plus a handful of synthetic PDFs
+(strategy briefs with one checkable fact per section, padded with prose
+that shares their vocabulary). Every golden question names the source that
+answers it and the evidence strings that answer must contain; a retrieved
+chunk counts as relevant only if it is from that source *and* contains all
+of the evidence, so chunking that splits an answer apart is penalised.
+
+For each configuration (embedding model x vector backend x CHUNK_SIZE x
+CHUNK_OVERLAP) the corpus is ingested through DocumentProcessor and
+VectorStore into a fresh temporary index, then every question is asked at
+each k. Reported side by side:
+
+  recall@k  questions with a relevant chunk in the top k
+  src@k     questions with any chunk of the right source in the top k
+  MRR       mean reciprocal rank of the first relevant chunk (0 if none in top k)
+  chunks, index MB (on disk), ingest s, query p50/p95 ms
+
+Backends are chroma, local, or local-<compression> (float16, int8, pq).
+
+Usage (from backend/):
+    python -m tools.eval_retrieval
+    python -m tools.eval_retrieval --chunk-sizes 300,600,1000,2000 --overlaps 0,100,200 --k 1,3,5,10
+    python -m tools.eval_retrieval --backends chroma,local,local-int8 --json eval.json
+"""
+import os
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import calendar
+import tempfile
+import itertools
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from tools.loadgen import percentile
+
+DATA_CSV = os.path.join(os.path.dirname(__file__), "..", "..", "data", "hero_vida_sales_data.csv")
+
+# Synthetic strategy documents: (file, title, [(heading, fact, question, evidence)])
+SYNTHETIC_PDFS = [
+    ("vida_battery_brief.pdf", "Vida Battery and Powertrain Brief", [
+        ("Battery pack", "The Vida V1 Pro carries a removable battery pack with a usable capacity of 3.94 kWh.",
+         "What is the battery capacity of the Vida V1 Pro?", ["3.94 kWh"]),
+        ("Charging time", "With the portable charger the pack goes from zero to eighty percent in 5 hours 55 minutes.",
+         "How long does it take to charge the battery to 80 percent at home?", ["5 hours 55 minutes"]),
+        ("Certified range", "The certified IDC range of the V1 Pro is 165 km on a single charge.",
+         "What is the certified range on one charge?", ["165 km"]),
+        ("Battery warranty", "Battery packs are covered by a warranty of 5 years or 50,000 km, whichever comes first.",
+         "How long is the battery warranty?", ["5 years or 50,000 km"]),
+        ("Thermal management", "Cells are held below 45 degrees Celsius by a passive aluminium heat spreader.",
+         "What keeps the battery cells from overheating?", ["aluminium heat spreader"]),
+    ]),
+    ("vida_charging_network.pdf", "Vida Fast Charging Network Plan", [
+        ("Bengaluru rollout", "Bengaluru will host 420 fast charging points by the end of the first quarter.",
+         "How many fast chargers are planned for Bengaluru?", ["420 fast charging points"]),
+        ("Partner operators", "Charging points are operated jointly with Ather Grid under a shared access agreement.",
+         "Which operator runs the charging points with Vida?", ["Ather Grid"]),
+        ("Pune and Jaipur", "Pune and Jaipur each receive 150 chargers in the second phase of the rollout.",
+         "How many chargers will Pune get?", ["Pune and Jaipur each receive 150 chargers"]),
+        ("Pricing", "Fast charging is priced at 1.5 rupees per minute for Vida owners after the free period.",
+         "What does fast charging cost per minute?", ["1.5 rupees per minute"]),
+    ]),
+    ("vida_marketing_strategy.pdf", "Vida Marketing Strategy 2024", [
+        ("Youth campaign", "The Ride The Future campaign targets college students in twelve metro cities.",
+         "Which campaign targets college students?", ["Ride The Future"]),
+        ("Budget split", "Sixty percent of the 2024 marketing budget goes to digital channels and forty percent to showrooms.",
+         "How is the marketing budget split between digital and showrooms?", ["Sixty percent"]),
+        ("Test rides", "Doorstep test rides are booked through the app and completed within 48 hours of the request.",
+         "How quickly are doorstep test rides completed?", ["within 48 hours"]),
+        ("Corporate fleet", "A corporate fleet programme offers leasing to delivery companies with 36 month terms.",
+         "What lease term is offered to delivery fleets?", ["36 month terms"]),
+    ]),
+    ("vida_dealer_expansion.pdf", "Vida Dealer Network Expansion Report", [
+        ("South region", "The South region adds 38 experience centres, the largest expansion of any region.",
+         "How many experience centres are added in the South region?", ["38 experience centres"]),
+        ("Service hubs", "Every new dealer must operate a service hub within 15 km of the showroom.",
+         "How far from the showroom can a service hub be?", ["within 15 km"]),
+        ("Tier two cities", "Tier two cities such as Indore and Coimbatore receive franchise dealers from June.",
+         "When do tier two cities get franchise dealers?", ["from June"]),
+    ]),
+    ("vida_customer_feedback.pdf", "Vida Customer Feedback Summary", [
+        ("Net promoter score", "The net promoter score among V1 owners rose to 62 in the last survey.",
+         "What is the net promoter score of V1 owners?", ["rose to 62"]),
+        ("Top complaint", "The most common complaint is the weight of the removable battery when carried upstairs.",
+         "What do customers complain about most?", ["weight of the removable battery"]),
+        ("App ratings", "The companion app holds an average rating of 4.3 stars across both stores.",
+         "How is the companion app rated?", ["4.3 stars"]),
+    ]),
+]
+
+# Shared-vocabulary filler so that sources are not trivially separable
+FILLER = [
+    "Hero Vida continues to invest in the electric scooter segment across India.",
+    "The team reviews progress every quarter against the plan agreed with the board.",
+    "Customer expectations around reliability, range and service keep rising.",
+    "Dealers, partners and the product group coordinate closely on launch timing.",
+    "Revenue growth in premium and mid segments depends on this programme.",
+    "Market share gains in the North and West regions inform the next steps.",
+    "Feedback from early owners has shaped several product and service decisions.",
+    "The rollout is staged so that lessons from one city carry over to the next.",
+    "Costs are tracked monthly and compared with the marketing spend of the period.",
+    "Sustainability remains a core part of the Vida brand promise to riders.",
+]
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(text: str, width: int = 90) -> List[str]:
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    return lines + ([line] if line else [])
+
+
+def write_pdf(path: str, pages: List[List[str]]):
+    """Write a minimal text-only PDF (Helvetica, one text object per page)"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for lines in pages:
+        stream = "BT /F1 10 Tf 14 TL 50 790 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        page_refs.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {len(page_refs)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def build_corpus(directory: str, seed: int = 0) -> List[Dict[str, Any]]:
+    """Write the corpus files into `directory`; returns the golden set"""
+    rng = np.random.default_rng(seed)
+    golden = []
+    for filename, title, sections in SYNTHETIC_PDFS:
+        pages, lines = [], [title, ""]
+        for heading, fact, question, evidence in sections:
+            # The fact sits at a random position among filler, so chunk boundaries matter
+            paragraph = list(rng.choice(FILLER, size=6, replace=False))
+            paragraph.insert(int(rng.integers(0, len(paragraph) + 1)), fact)
+            lines += [heading] + _wrap(" ".join(paragraph)) + [""]
+            if len(lines) > 45:
+                pages.append(lines)
+                lines = []
+            golden.append({"question": question, "source": filename, "evidence": evidence})
+        if lines:
+            pages.append(lines)
+        write_pdf(os.path.join(directory, filename), pages)
+
+    csv_name = os.path.basename(DATA_CSV)
+    shutil.copy(DATA_CSV, os.path.join(directory, csv_name))
+    df = pd.read_csv(DATA_CSV)
+    # The file also holds other tables below the monthly sales; ask only about the monthly rows
+    df = df[df["Month"].isin(list(calendar.month_name)[1:])]
+    templates = [
+        ("How many units were sold in {Month} {Year}?", "Units_Sold"),
+        ("What was the revenue in lakhs for {Month} {Year}?", "Revenue_INR_Lakhs"),
+        ("Which marketing initiative ran in {Month} {Year}?", "Key_Initiatives"),
+        ("What market share did Vida have in {Month} {Year}?", "Market_Share_Percent"),
+    ]
+    for i, (_, row) in enumerate(df.iloc[::3].iterrows()):
+        question, column = templates[i % len(templates)]
+        golden.append({
+            "question": question.format(**row),
+            "source": csv_name,
+            # Same "col: value" lines DocumentProcessor writes for CSV rows
+            "evidence": [f"Month: {row['Month']}", f"Year: {row['Year']}", f"{column}: {row[column]}"],
+        })
+    return golden
+
+
+def _relevant(doc: Dict[str, Any], item: Dict[str, Any]) -> bool:
+    # PDF text comes back line-wrapped, so compare with whitespace collapsed
+    content = " ".join(doc["content"].split())
+    return item["source"] in doc["sources"] and all(" ".join(e.split()) in content for e in item["evidence"])
+
+
+def _disk_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def _configure(backend: str, model: str, db_path: str) -> Dict[str, Optional[str]]:
+    """Set the env a fresh VectorStore reads; returns the previous values"""
+    kind, _, compression = backend.partition("-")
+    settings = {
+        "CHROMA_DB_PATH": db_path,
+        "VECTOR_BACKEND": kind,
+        "LOCAL_INDEX_COMPRESSION": compression or "none",
+        "EMBEDDING_MODEL": model,
+    }
+    previous = {key: os.environ.get(key) for key in settings}
+    os.environ.update(settings)
+    return previous
+
+
+async def evaluate(config: Dict[str, Any], corpus_dir: str, golden: List[Dict[str, Any]], ks: List[int],
+                   models: Dict[str, Any]) -> List[Dict[str, Any]]:
+    from services.document_processor import DocumentProcessor
+    from services.vector_store import VectorStore
+
+    db_path = tempfile.mkdtemp(prefix="eval-index-")
+    previous = _configure(config["backend"], config["model"], db_path)
+    try:
+        processor = DocumentProcessor()
+        processor.chunk_size = config["chunk_size"]
+        processor.chunk_overlap = config["chunk_overlap"]
+        processor.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=config["chunk_size"], chunk_overlap=config["chunk_overlap"],
+            length_function=len, separators=["\n\n", "\n", " ", ""]
+        )
+        store = VectorStore()
+        # Load each embedding model once for the whole sweep
+        store.models = models
+        await store.initialize()
+
+        start = time.perf_counter()
+        chunks = 0
+        for filename in sorted(os.listdir(corpus_dir)):
+            documents = await processor.process_document(os.path.join(corpus_dir, filename), filename)
+            result = await store.add_documents(documents, filename)
+            chunks += result["stored"]
+        ingest_seconds = time.perf_counter() - start
+        index_bytes = _disk_bytes(db_path)
+
+        rows = []
+        for k in ks:
+            latencies, hits, source_hits, reciprocal_ranks = [], 0, 0, []
+            for item in golden:
+                start = time.perf_counter()
+                results = await store.similarity_search(item["question"], k=k)
+                latencies.append(time.perf_counter() - start)
+                rank = next((i + 1 for i, doc in enumerate(results) if _relevant(doc, item)), None)
+                hits += rank is not None
+                reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+                source_hits += any(item["source"] in doc["sources"] for doc in results)
+            rows.append({
+                **config,
+                "k": k,
+                "chunks": chunks,
+                "index_mb": index_bytes / 1e6,
+                "ingest_s": ingest_seconds,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "recall": hits / len(golden),
+                "source_recall": source_hits / len(golden),
+                "mrr": sum(reciprocal_ranks) / len(golden),
+            })
+        return rows
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(db_path, ignore_errors=True)
+
+
+def _ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def _names(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    corpus_dir = tempfile.mkdtemp(prefix="eval-corpus-")
+    try:
+        golden = build_corpus(corpus_dir, args.seed)
+        print(f"{len(golden)} golden questions over {len(os.listdir(corpus_dir))} files")
+        models: Dict[str, Any] = {}
+        rows = []
+        header = (f"\n{'model':<20} {'backend':<12} {'size':>5} {'ovl':>4} {'k':>3} {'chunks':>6} {'idx MB':>7} "
+                  f"{'ingest s':>8} {'p50 ms':>7} {'p95 ms':>7} {'recall':>6} {'src':>5} {'MRR':>5}")
+        print(header)
+        skipped = set()
+        for model, backend, size, overlap in itertools.product(
+                _names(args.models), _names(args.backends), _ints(args.chunk_sizes), _ints(args.overlaps)):
+            if overlap >= size or backend in skipped:
+                continue
+            config = {"model": model, "backend": backend, "chunk_size": size, "chunk_overlap": overlap}
+            try:
+                config_rows = await evaluate(config, corpus_dir, golden, sorted(_ints(args.k)), models)
+            except ImportError as e:
+                print(f"[skip] {backend}: {e}")
+                skipped.add(backend)
+                continue
+            for row in config_rows:
+                rows.append(row)
+                print(f"{model[-20:]:<20} {backend:<12} {size:>5} {overlap:>4} {row['k']:>3} {row['chunks']:>6} "
+                      f"{row['index_mb']:>7.2f} {row['ingest_s']:>8.2f} {row['p50_ms']:>7.2f} {row['p95_ms']:>7.2f} "
+                      f"{row['recall']:>6.3f} {row['source_recall']:>5.2f} {row['mrr']:>5.3f}")
+        return rows
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality and latency across configurations")
+    parser.add_argument("--chunk-sizes", default="500,1000,2000", help="CHUNK_SIZE values to sweep")
+    parser.add_argument("--overlaps", default="0,200", help="CHUNK_OVERLAP values to sweep")
+    parser.add_argument("--k", default="1,3,5", help="Result counts to evaluate")
+    parser.add_argument("--backends", default="local", help="chroma, local or local-<compression>")
+    parser.add_argument("--models", default=os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"),
+                        help="Embedding models to sweep")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic PDFs")
+    parser.add_argument("--json", help="Also write every row to this JSON file")
+    args = parser.parse_args(argv)
+
+    rows = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
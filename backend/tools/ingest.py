@@ -0,0 +1,249 @@
+"""Offline bulk ingestion of a directory or zip archive of PDFs and CSVs.
+
+Files are parsed with DocumentProcessor across a process pool, their chunks
+are embedded in large batches and written straight into the VectorStore at
+CHROMA_DB_PATH (the API server should not be writing to the same path).
+
+A JSON-lines checkpoint journal records every file as it is written, so an
+interrupted run can simply be started again: finished files are skipped and a
+file whose write was cut off half-way is deleted and re-ingested.
+
+Usage (from backend/):
+    python -m tools.ingest /data/archive --workers 8 --batch-size 1024
+    python -m tools.ingest /data/archive.zip --namespace finance
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import zipfile
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterator
+
+from dotenv import load_dotenv
+
+SUPPORTED_EXTENSIONS = (".pdf", ".csv")
+
+
+def discover_files(root: str) -> Iterator[Dict[str, Any]]:
+    """Yield ingestible files with a cheap identity key used by the journal"""
+    if zipfile.is_zipfile(root):
+        with zipfile.ZipFile(root) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                    continue
+                yield {
+                    "source": info.filename,
+                    "archive": root,
+                    "key": f"{info.filename}|{info.file_size}|{info.CRC}",
+                }
+        return
+
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, filename)
+            stat = os.stat(path)
+            source = os.path.relpath(path, root).replace(os.sep, "/")
+            yield {
+                "source": source,
+                "path": path,
+                "key": f"{source}|{stat.st_size}|{int(stat.st_mtime)}",
+            }
+
+
+def parse_file(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Process-pool worker: read, hash and chunk one file"""
+    from services.document_processor import DocumentProcessor
+
+    tmp_path = None
+    try:
+        if "archive" in item:
+            with zipfile.ZipFile(item["archive"]) as archive:
+                content = archive.read(item["source"])
+            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(item["source"])[1]) as tmp_file:
+                tmp_file.write(content)
+                tmp_path = tmp_file.name
+            path = tmp_path
+        else:
+            path = item["path"]
+            with open(path, "rb") as f:
+                content = f.read()
+
+        content_hash = hashlib.sha256(content).hexdigest()
+        processor = DocumentProcessor()
+        chunks = asyncio.run(processor.process_document(path, item["source"]))
+        for chunk in chunks:
+            chunk["metadata"]["content_hash"] = content_hash
+            chunk["metadata"]["file_size"] = len(content)
+        return {**item, "chunks": chunks, "content_hash": content_hash, "size": len(content)}
+    except Exception as e:
+        return {**item, "error": f"{type(e).__name__}: {e}"}
+    finally:
+        if tmp_path:
+            os.unlink(tmp_path)
+
+
+class Journal:
+    """Append-only checkpoint log: {"key", "source", "status": writing|done|failed, ...}"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.status: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.status[record["key"]] = record
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, records: List[Dict[str, Any]]):
+        for record in records:
+            self.status[record["key"]] = record
+            self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+class Progress:
+    def __init__(self, total: int, skipped: int):
+        self.total = total
+        self.skipped = skipped
+        self.done = 0
+        self.failed = 0
+        self.chunks = 0
+        self.duplicates = 0
+        self.start = time.perf_counter()
+
+    def print(self, final: bool = False):
+        elapsed = time.perf_counter() - self.start
+        rate = self.done / elapsed if elapsed else 0.0
+        line = (f"\r[{self.done + self.failed}/{self.total}] {rate:.1f} files/s, "
+                f"{self.chunks} chunks ({self.duplicates} duplicates), {self.failed} failed, {self.skipped} skipped")
+        print(line + ("\n" if final else ""), end="", file=sys.stderr, flush=True)
+
+
+async def flush(vector_store, journal: Journal, pending: List[Dict[str, Any]], namespace: str, progress: Progress):
+    """Embed and write a batch of parsed files, checkpointing around the write"""
+    if not pending:
+        return
+    journal.write([{"key": p["key"], "source": p["source"], "status": "writing"} for p in pending])
+    written = await vector_store.add_documents_batch([(p["chunks"], p["source"]) for p in pending], namespace)
+    duplicates = written["duplicates_by_source"]
+    journal.write([
+        {"key": p["key"], "source": p["source"], "status": "done",
+         "chunks": len(p["chunks"]), "duplicates": duplicates.get(p["source"], 0),
+         "content_hash": p["content_hash"]}
+        for p in pending
+    ])
+    progress.done += len(pending)
+    progress.chunks += sum(len(p["chunks"]) for p in pending)
+    progress.duplicates += written["duplicates"]
+    pending.clear()
+
+
+async def run(args) -> Progress:
+    from services.vector_store import VectorStore
+
+    vector_store = VectorStore()
+    await vector_store.initialize()
+    namespace = vector_store.normalize_namespace(args.namespace)
+    journal = Journal(args.journal or os.path.join(vector_store.db_path, f"ingest_journal_{namespace}.jsonl"))
+
+    items = list(discover_files(args.root))
+    written_sources = {r["source"] for r in journal.status.values() if r["status"] in ("writing", "done")}
+    todo: List[Dict[str, Any]] = []
+    skipped = 0
+    for item in items:
+        previous = journal.status.get(item["key"])
+        if previous and previous["status"] == "done":
+            skipped += 1
+            continue
+        if previous and previous["status"] == "failed" and not args.retry_failed:
+            skipped += 1
+            continue
+        if item["source"] in written_sources:
+            # Interrupted mid-write, or the file changed since it was ingested:
+            # drop whatever version of it reached the index before re-ingesting
+            await vector_store.delete_by_source(item["source"], namespace)
+        todo.append(item)
+
+    progress = Progress(len(items), skipped)
+    pending: List[Dict[str, Any]] = []
+    pending_chunks = 0
+    loop = asyncio.get_event_loop()
+
+    # Files are already parsed one per process; don't also split each file across processes
+    os.environ.setdefault("CHUNK_SPLIT_WORKERS", "1")
+    try:
+        # Spawned, not forked: this process already runs the embedding model's threads
+        with ProcessPoolExecutor(max_workers=args.workers,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            queue = iter(todo)
+            in_flight = set()
+            # Keep a bounded window of files in the pool so memory stays flat
+            for item in queue:
+                in_flight.add(loop.run_in_executor(pool, parse_file, item))
+                if len(in_flight) >= args.workers * 2:
+                    break
+            while in_flight:
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if "error" in result:
+                        journal.write([{"key": result["key"], "source": result["source"],
+                                        "status": "failed", "error": result["error"]}])
+                        progress.failed += 1
+                    else:
+                        pending.append(result)
+                        pending_chunks += len(result["chunks"])
+                    next_item = next(queue, None)
+                    if next_item is not None:
+                        in_flight.add(loop.run_in_executor(pool, parse_file, next_item))
+                if pending_chunks >= args.batch_size:
+                    await flush(vector_store, journal, pending, namespace, progress)
+                    pending_chunks = 0
+                progress.print()
+        await flush(vector_store, journal, pending, namespace, progress)
+    finally:
+        progress.print(final=True)
+        journal.close()
+        vector_store.close()
+    return progress
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory or zip of PDF/CSV files")
+    parser.add_argument("root", help="Directory or .zip archive")
+    parser.add_argument("--namespace", help="Target namespace (default: default)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Parser processes")
+    parser.add_argument("--batch-size", type=int, default=1024, help="Chunks per embed/write batch")
+    parser.add_argument("--db-path", help="Override CHROMA_DB_PATH")
+    parser.add_argument("--journal", help="Checkpoint journal path (default: inside the DB path)")
+    parser.add_argument("--retry-failed", action="store_true", help="Retry files that failed previously")
+    args = parser.parse_args(argv)
+    if args.db_path:
+        os.environ["CHROMA_DB_PATH"] = args.db_path
+
+    progress = asyncio.run(run(args))
+    elapsed = time.perf_counter() - progress.start
+    print(f"Ingested {progress.done} files ({progress.chunks} chunks) in {elapsed:.1f}s, "
+          f"{progress.failed} failed, {progress.skipped} skipped", file=sys.stderr)
+    if progress.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Fault-injection scenarios for the LLM scheduler.
+
+Drives StubGeminiService (real LLMScheduler + FaultInjectingModel) through
+transient errors, a slow tail and a full outage, prints what happened and
+exits non-zero if retries, hedging or the circuit breaker misbehave.
+
+Usage (from backend/):
+    python -m tools.llm_faults
+"""
+import sys
+import time
+import asyncio
+from typing import List, Dict, Any
+
+from services.priority_executor import PriorityExecutor
+from tools.loadgen import percentile
+from tools.stub_llm import FaultInjectingModel, StubGeminiService
+
+DOCS = [{
+    "content": "Hero Vida V1 Pro sold 1,200 units in the North region. Revenue grew 18% year on year.",
+    "source": "sales.csv",
+}]
+
+
+def make_service(model: FaultInjectingModel, workers: int = 8, **scheduler_settings) -> StubGeminiService:
+    # Each scenario gets its own executor, so LLM concurrency is `workers` and nothing carries over
+    executor = PriorityExecutor(workers=workers, limits={"llm": workers}).view("llm")
+    service = StubGeminiService(model, executor)
+    for name, value in scheduler_settings.items():
+        if name in ("failure_threshold", "cooldown"):
+            setattr(service.scheduler.breaker, name, value)
+        else:
+            setattr(service.scheduler, name, value)
+    return service
+
+
+async def timed_calls(service: StubGeminiService, n: int, concurrency: int = 8) -> List[Dict[str, Any]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            text = await service.generate_response("units sold in North", DOCS)
+            return {"latency": time.perf_counter() - start, "fallback": not text.startswith("Stub answer")}
+
+    return await asyncio.gather(*[one() for _ in range(n)])
+
+
+async def scenario_transient_errors(checks: List[str]):
+    model = FaultInjectingModel(mean_ms=20, distribution="fixed", error_rate=0.3, seed=1)
+    service = make_service(model, backoff_base=0.01, backoff_max=0.05, hedge_enabled=False,
+                           failure_threshold=1000)
+    results = await timed_calls(service, 200)
+    fallbacks = sum(r["fallback"] for r in results)
+    stats = service.scheduler.get_stats()
+    print(f"transient 30% errors: {200 - fallbacks}/200 answered, {stats['retries']} retries, "
+          f"{model.calls} model calls")
+    if fallbacks > 2:
+        checks.append(f"transient errors: {fallbacks} requests fell back despite retries")
+    if stats["retries"] == 0:
+        checks.append("transient errors: no retries recorded")
+
+
+async def scenario_slow_tail(checks: List[str]):
+    p99 = {}
+    for hedge in (False, True):
+        model = FaultInjectingModel(mean_ms=30, distribution="uniform", spread=0.2,
+                                    slow_rate=0.05, slow_factor=20, seed=2)
+        service = make_service(model, workers=16, hedge_enabled=hedge, hedge_min_delay=0.01,
+                               hedge_min_samples=20)
+        # Warm the latency tracker so the hedge deadline is known
+        await timed_calls(service, 40)
+        results = await timed_calls(service, 300)
+        p99[hedge] = percentile([r["latency"] for r in results], 99) * 1000
+        stats = service.scheduler.get_stats()
+        print(f"slow tail, hedging {'on ' if hedge else 'off'}: p50 "
+              f"{percentile([r['latency'] for r in results], 50) * 1000:.0f} ms, p99 {p99[hedge]:.0f} ms, "
+              f"{stats['hedges']} hedges, {stats['hedge_wins']} hedge wins")
+    if p99[True] >= p99[False]:
+        checks.append(f"slow tail: hedging did not reduce p99 ({p99[True]:.0f} vs {p99[False]:.0f} ms)")
+
+
+async def scenario_outage(checks: List[str]):
+    model = FaultInjectingModel(mean_ms=20, distribution="fixed", outage=True, seed=3)
+    service = make_service(model, backoff_base=0.01, backoff_max=0.02, hedge_enabled=False,
+                           failure_threshold=5, cooldown=0.5)
+    results = await timed_calls(service, 50, concurrency=1)
+    calls_during_outage = model.calls
+    fast = [r["latency"] for r in results[10:]]
+    print(f"outage: breaker {service.scheduler.breaker.state}, {calls_during_outage} model calls for 50 "
+          f"requests, fallback p95 {percentile(fast, 95) * 1000:.1f} ms")
+    if service.scheduler.breaker.state != "open":
+        checks.append("outage: circuit breaker did not open")
+    if calls_during_outage > 10:
+        checks.append(f"outage: {calls_during_outage} calls reached the failing model")
+    if not all(r["fallback"] for r in results):
+        checks.append("outage: expected extractive fallback answers")
+
+    model.outage = False
+    await asyncio.sleep(0.6)
+    recovered = await timed_calls(service, 5, concurrency=1)
+    print(f"recovery: breaker {service.scheduler.breaker.state}, "
+          f"{sum(not r['fallback'] for r in recovered)}/5 answered by the model")
+    if service.scheduler.breaker.state != "closed":
+        checks.append("recovery: circuit breaker did not close after cooldown")
+
+
+async def run() -> List[str]:
+    failures: List[str] = []
+    await scenario_transient_errors(failures)
+    await scenario_slow_tail(failures)
+    await scenario_outage(failures)
+    return failures
+
+
+def main():
+    failures = asyncio.run(run())
+    if failures:
+        print("\nFAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nAll fault-injection scenarios passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""Asyncio load generator for the /chat and /upload endpoints.
+
+Starts the app locally with a stub LLM (tools.stub_app) unless --url is
+given, then sweeps a list of offered request rates. Arrivals are open-loop
+(Poisson) so a slow server cannot slow the generator down; latency is
+measured from the scheduled arrival time, which includes any wait for a
+free client connection.
+
+Usage (from backend/):
+    python -m tools.loadgen --rates 1,2,5,10,20 --duration 20 --workers 2
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import subprocess
+from typing import List, Dict, Any, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_UPLOAD_FILE = os.path.join(os.path.dirname(BACKEND_DIR), "data", "hero_vida_sales_data.csv")
+
+DEFAULT_QUERIES = [
+    "What are the total units sold by region?",
+    "Which product model generates the most revenue?",
+    "Summarize sales performance for the latest year",
+    "How do enterprise customers compare to individual buyers?",
+    "What is Hero Vida's market strategy?",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def start_local_server(args) -> subprocess.Popen:
+    """Launch uvicorn serving tools.stub_app with the requested worker count"""
+    env = os.environ.copy()
+    env.update({
+        "STUB_LLM_DISTRIBUTION": args.llm_distribution,
+        "STUB_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "STUB_LLM_SPREAD": str(args.llm_spread),
+        "STUB_LLM_ERROR_RATE": str(args.llm_error_rate),
+        "STUB_LLM_SLOW_RATE": str(args.llm_slow_rate),
+        # The stub runs on the shared executor's llm class, like the real service
+        "TASK_LIMIT_LLM": str(args.llm_workers),
+    })
+    env.setdefault("TASK_WORKERS", str(max(10, args.llm_workers + 4)))
+    if args.max_queue_wait_ms is not None:
+        env["ADMISSION_MAX_QUEUE_WAIT_MS"] = str(args.max_queue_wait_ms)
+    if args.chroma_db_path:
+        env["CHROMA_DB_PATH"] = args.chroma_db_path
+    # All load comes from one client; per-client quotas would cap it long before the server does
+    env.setdefault("ADMISSION_CLIENT_RATE", "0")
+    command = [
+        sys.executable, "-m", "uvicorn", "tools.stub_app:app",
+        "--host", "127.0.0.1", "--port", str(args.port),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+
+
+async def wait_until_healthy(client: httpx.AsyncClient, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get("/health")
+            if response.status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"Server did not become healthy within {timeout:.0f}s")
+
+
+class LoadGenerator:
+    def __init__(self, client: httpx.AsyncClient, queries: List[str], upload_bytes: bytes,
+                 upload_name: str, upload_ratio: float, concurrency: int):
+        self.client = client
+        self.queries = queries
+        self.upload_bytes = upload_bytes
+        self.upload_name = upload_name
+        self.upload_ratio = upload_ratio
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one_request(self, scheduled: float, results: List[Dict[str, Any]]):
+        is_upload = random.random() < self.upload_ratio
+        async with self.semaphore:
+            try:
+                if is_upload:
+                    response = await self.client.post(
+                        "/upload",
+                        files={"files": (self.upload_name, self.upload_bytes, "text/csv")},
+                    )
+                else:
+                    response = await self.client.post(
+                        "/chat", json={"query": random.choice(self.queries)}
+                    )
+                ok = response.status_code == 200
+                status = response.status_code
+                retry_after = response.headers.get("Retry-After")
+            except httpx.HTTPError as e:
+                ok = False
+                status = type(e).__name__
+                retry_after = None
+        results.append({
+            "endpoint": "upload" if is_upload else "chat",
+            "latency": time.monotonic() - scheduled,
+            "ok": ok,
+            "status": status,
+            "retry_after": retry_after,
+        })
+
+    async def run_step(self, rate: float, duration: float) -> Dict[str, Any]:
+        """Offer `rate` req/s for `duration` seconds and summarize the outcome"""
+        results: List[Dict[str, Any]] = []
+        tasks = []
+        start = time.monotonic()
+        next_arrival = start
+        while next_arrival < start + duration:
+            delay = next_arrival - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self._one_request(next_arrival, results)))
+            next_arrival += random.expovariate(rate)
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - start
+        return summarize_step(rate, elapsed, results)
+
+
+def summarize_step(rate: float, elapsed: float, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    ok_latencies = [r["latency"] for r in results if r["ok"]]
+    errors = [r for r in results if not r["ok"]]
+    statuses: Dict[str, int] = {}
+    for r in errors:
+        statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+    # Requests turned away by admission control, which must all say when to come back
+    shed = [r for r in errors if r["status"] in (429, 503)]
+    shed_latencies = [r["latency"] for r in shed]
+    summary = {
+        "offered_rps": rate,
+        "requests": len(results),
+        "throughput_rps": len(ok_latencies) / elapsed if elapsed else 0.0,
+        "error_rate": len(errors) / len(results) if results else 0.0,
+        "errors_by_status": statuses,
+        "shed": len(shed),
+        "shed_without_retry_after": sum(1 for r in shed if not r["retry_after"]),
+        "shed_p95_ms": percentile(shed_latencies, 95) * 1000,
+        "p50_ms": percentile(ok_latencies, 50) * 1000,
+        "p95_ms": percentile(ok_latencies, 95) * 1000,
+        "p99_ms": percentile(ok_latencies, 99) * 1000,
+        "mean_ms": (sum(ok_latencies) / len(ok_latencies) * 1000) if ok_latencies else 0.0,
+    }
+    for endpoint in ("chat", "upload"):
+        latencies = [r["latency"] for r in results if r["ok"] and r["endpoint"] == endpoint]
+        summary[f"{endpoint}_p95_ms"] = percentile(latencies, 95) * 1000
+    return summary
+
+
+def find_saturation(steps: List[Dict[str, Any]], slo_ms: float,
+                    max_error_rate: float) -> Optional[Dict[str, Any]]:
+    """First step where throughput stops tracking the offered rate or an SLO breaks"""
+    for step in steps:
+        if (step["throughput_rps"] < 0.9 * step["offered_rps"]
+                or step["error_rate"] > max_error_rate
+                or step["p95_ms"] > slo_ms):
+            return step
+    return None
+
+
+def print_report(steps: List[Dict[str, Any]], saturation: Optional[Dict[str, Any]]):
+    header = (f"{'offered':>8} {'thruput':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} "
+              f"{'shed':>6} {'reqs':>6}")
+    print(header)
+    print("-" * len(header))
+    for step in steps:
+        print(f"{step['offered_rps']:>8.1f} {step['throughput_rps']:>8.2f} "
+              f"{step['p50_ms']:>9.0f} {step['p95_ms']:>9.0f} {step['p99_ms']:>9.0f} "
+              f"{step['error_rate']:>6.1%} {step['shed']:>6} {step['requests']:>6}")
+    if saturation:
+        print(f"\nSaturation at ~{saturation['offered_rps']:.1f} req/s "
+              f"(throughput {saturation['throughput_rps']:.2f} req/s, p95 {saturation['p95_ms']:.0f} ms)")
+    else:
+        print("\nNo saturation observed in the swept range")
+
+
+async def run(args) -> Dict[str, Any]:
+    queries = DEFAULT_QUERIES
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    with open(args.upload_file, "rb") as f:
+        upload_bytes = f.read()
+    upload_name = os.path.basename(args.upload_file)
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        args.port = args.port or _free_port()
+        server = start_local_server(args)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+            await wait_until_healthy(client)
+            if args.seed:
+                # Make sure /chat has something to retrieve before measuring
+                await client.post("/upload", files={"files": (upload_name, upload_bytes, "text/csv")})
+
+            generator = LoadGenerator(client, queries, upload_bytes, upload_name,
+                                      args.upload_ratio, args.concurrency)
+            steps = []
+            for rate in args.rates:
+                step = await generator.run_step(rate, args.duration)
+                steps.append(step)
+                print(f"  {rate:.1f} req/s -> {step['throughput_rps']:.2f} req/s, "
+                      f"p95 {step['p95_ms']:.0f} ms, errors {step['error_rate']:.1%}, shed {step['shed']} "
+                      f"({step['shed_without_retry_after']} without Retry-After)", flush=True)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    saturation = find_saturation(steps, args.slo_ms, args.max_error_rate)
+    return {"config": {k: v for k, v in vars(args).items()}, "steps": steps, "saturation": saturation}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test /chat and /upload with a stub LLM")
+    parser.add_argument("--url", help="Target an already running server instead of starting one")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--rates", type=lambda s: [float(r) for r in s.split(",")],
+                        default=[1, 2, 5, 10, 20], help="Comma-separated offered rates (req/s)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per rate step")
+    parser.add_argument("--concurrency", type=int, default=64, help="Max in-flight requests")
+    parser.add_argument("--upload-ratio", type=float, default=0.0, help="Fraction of requests sent to /upload")
+    parser.add_argument("--upload-file", default=DEFAULT_UPLOAD_FILE)
+    parser.add_argument("--queries-file", help="One query per line")
+    parser.add_argument("--no-seed", dest="seed", action="store_false", help="Skip the initial upload")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--slo-ms", type=float, default=5000.0, help="p95 latency marking saturation")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--chroma-db-path", help="CHROMA_DB_PATH for the local server")
+    parser.add_argument("--llm-distribution", default="lognormal",
+                        choices=["fixed", "uniform", "exponential", "lognormal"])
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-spread", type=float, default=0.5)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of calls failing with 429/503")
+    parser.add_argument("--llm-slow-rate", type=float, default=0.0, help="Fraction of calls 10x slower")
+    parser.add_argument("--llm-workers", type=int, default=2, help="LLM concurrency (TASK_LIMIT_LLM) of the local server")
+    parser.add_argument("--max-queue-wait-ms", type=float,
+                        help="ADMISSION_MAX_QUEUE_WAIT_MS of the local server (shed /chat beyond this LLM backlog)")
+    parser.add_argument("--json-out", help="Write the full report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    print()
+    print_report(report["steps"], report["saturation"])
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Export or import binary VectorStore snapshots.
+
+Usage (from backend/):
+    python -m tools.snapshot export /backups/hero_vida --namespace default --dtype float16
+    python -m tools.snapshot import /backups/hero_vida
+    python -m tools.snapshot verify /backups/hero_vida
+"""
+import sys
+import time
+import json
+import asyncio
+import argparse
+
+from dotenv import load_dotenv
+
+from services.snapshot import read_manifest, SnapshotError
+
+
+async def run(args):
+    if args.command == "verify":
+        start = time.perf_counter()
+        manifest = read_manifest(args.path, verify=True)
+        print(json.dumps(manifest, indent=2))
+        print(f"Checksums OK ({time.perf_counter() - start:.2f}s)", file=sys.stderr)
+        return
+
+    from services.vector_store import VectorStore
+
+    vector_store = VectorStore()
+    await vector_store.initialize()
+    start = time.perf_counter()
+    if args.command == "export":
+        manifest = await vector_store.export_snapshot(args.path, args.namespace, args.dtype)
+        size = sum(f["bytes"] for f in manifest["files"].values())
+        print(f"Exported {manifest['count']} chunks ({size / 1024 / 1024:.1f} MB) from "
+              f"'{manifest['namespace']}' in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    else:
+        result = await vector_store.import_snapshot(args.path, args.namespace, verify=not args.no_verify)
+        print(f"Imported {result['imported']} chunks into '{result['namespace']}' "
+              f"in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Export/import VectorStore snapshots")
+    parser.add_argument("command", choices=["export", "import", "verify"])
+    parser.add_argument("path", help="Snapshot directory")
+    parser.add_argument("--namespace", help="Namespace to export / import into (import defaults to the snapshot's)")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32",
+                        help="Embedding precision in the snapshot")
+    parser.add_argument("--no-verify", action="store_true", help="Skip checksum verification on import")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run(args))
+    except SnapshotError as e:
+        sys.exit(f"Snapshot error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""ASGI entry point serving the real app with GeminiService replaced by a stub.
+
+Run with: uvicorn tools.stub_app:app --workers 2
+Latency is configured through the STUB_LLM_* environment variables.
+"""
+import os
+
+# main.py builds a GeminiService at import time, which insists on an API key
+os.environ.setdefault("GOOGLE_API_KEY", "stub")
+
+import main
+from tools.stub_llm import StubGeminiService
+
+main.gemini_service = StubGeminiService()
+main.admission.llm_scheduler = main.gemini_service.scheduler
+app = main.app
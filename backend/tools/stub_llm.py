@@ -0,0 +1,105 @@
+import os
+import math
+import time
+import random
+import threading
+
+from services.gemini_service import GeminiService
+from services.llm_scheduler import LLMScheduler
+
+
+class InjectedModelError(Exception):
+    """Fake API error carrying an HTTP-style status code like google.api_core errors"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FaultInjectingModel:
+    """Stand-in for genai.GenerativeModel with configurable latency and faults.
+
+    Latency is drawn from `distribution` ("fixed", "uniform", "exponential" or
+    "lognormal") with the given mean; `slow_rate` of calls take `slow_factor`
+    times longer (tail latency); `error_rate` of calls raise a transient 429/503
+    after their latency. `outage` makes every call fail with 503 until cleared.
+    """
+
+    def __init__(self, mean_ms: float = 800.0, distribution: str = "lognormal", spread: float = 0.5,
+                 error_rate: float = 0.0, slow_rate: float = 0.0, slow_factor: float = 10.0,
+                 outage: bool = False, seed=None):
+        self.mean_ms = mean_ms
+        self.distribution = distribution
+        self.spread = spread
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_factor = slow_factor
+        self.outage = outage
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def sample_latency(self) -> float:
+        """Draw one latency in seconds from the configured distribution"""
+        mean = self.mean_ms / 1000.0
+        with self.lock:
+            if mean <= 0:
+                latency = 0.0
+            elif self.distribution == "fixed":
+                latency = mean
+            elif self.distribution == "uniform":
+                latency = self.random.uniform(mean * (1 - self.spread), mean * (1 + self.spread))
+            elif self.distribution == "exponential":
+                latency = self.random.expovariate(1.0 / mean)
+            else:
+                # lognormal with the requested mean; spread is sigma of the underlying normal
+                mu = math.log(mean) - self.spread ** 2 / 2
+                latency = self.random.lognormvariate(mu, self.spread)
+            if self.slow_rate and self.random.random() < self.slow_rate:
+                latency *= self.slow_factor
+        return latency
+
+    def generate_content(self, prompt: str) -> FakeResponse:
+        with self.lock:
+            self.calls += 1
+            fail = self.outage or (self.error_rate and self.random.random() < self.error_rate)
+            code = 503 if self.outage else self.random.choice([429, 503])
+        time.sleep(self.sample_latency())
+        if fail:
+            raise InjectedModelError(code, f"{code} injected fault")
+        return FakeResponse(f"Stub answer based on a {len(prompt)}-character prompt.")
+
+
+class StubGeminiService(GeminiService):
+    """GeminiService backed by a FaultInjectingModel, configured from STUB_LLM_* variables.
+
+    Only the model is replaced: calls still go through the real LLMScheduler
+    on the shared executor's `llm` class, so retries, hedging, the circuit
+    breaker, TASK_LIMIT_LLM and the queue that admission control watches are
+    exercised exactly as in production. Pass `executor` to run on a private
+    executor view instead.
+    """
+
+    def __init__(self, model: FaultInjectingModel = None, executor=None):
+        self.fake_model = model or FaultInjectingModel(
+            mean_ms=float(os.getenv("STUB_LLM_LATENCY_MS", 800)),
+            distribution=os.getenv("STUB_LLM_DISTRIBUTION", "lognormal"),
+            spread=float(os.getenv("STUB_LLM_SPREAD", 0.5)),
+            error_rate=float(os.getenv("STUB_LLM_ERROR_RATE", 0.0)),
+            slow_rate=float(os.getenv("STUB_LLM_SLOW_RATE", 0.0)),
+            slow_factor=float(os.getenv("STUB_LLM_SLOW_FACTOR", 10.0)),
+        )
+        super().__init__()
+        if executor is not None:
+            self.executor = executor
+            self.scheduler = LLMScheduler(self._call_model, executor)
+            self.background_scheduler = LLMScheduler(self._call_model, executor)
+
+    def _create_models(self):
+        # No API key, no real model; the fake one ignores system instructions, so every kind shares it
+        return {"rag": self.fake_model}
@@ -127,6 +127,7 @@ function App() {
         {activeTab === 'stats' && (
           <div className="tab-content">
             <DatabaseStats 
+              apiBaseUrl={API_BASE_URL}
               stats={stats}
               onRefresh={fetchStats}
               onClear={handleClearDatabase}
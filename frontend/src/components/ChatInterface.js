@@ -15,6 +15,7 @@ const ChatInterface = ({ apiBaseUrl }) => {
   ]);
   const [inputValue, setInputValue] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const [sessionId, setSessionId] = useState(null);
   const messagesEndRef = useRef(null);
   const inputRef = useRef(null);
 
@@ -42,9 +43,14 @@ const ChatInterface = ({ apiBaseUrl }) => {
 
     try {
       const response = await axios.post(`${apiBaseUrl}/chat`, {
-        query: inputValue
+        query: inputValue,
+        session_id: sessionId
       });
 
+      if (response.data.session_id) {
+        setSessionId(response.data.session_id);
+      }
+
       const botMessage = {
         id: Date.now() + 1,
         type: 'bot',
@@ -75,6 +81,7 @@ const ChatInterface = ({ apiBaseUrl }) => {
   };
 
   const handleClearChat = () => {
+    setSessionId(null);
     setMessages([
       {
         id: 1,
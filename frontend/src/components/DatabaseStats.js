@@ -1,8 +1,50 @@
-import React from 'react';
+import React, { useCallback, useEffect, useState } from 'react';
+import axios from 'axios';
 import { Database, FileText, RefreshCw, Trash2, AlertTriangle } from 'lucide-react';
 import './DatabaseStats.css';
 
-const DatabaseStats = ({ stats, onRefresh, onClear, isLoading }) => {
+const PAGE_SIZE = 50;
+
+const formatSize = (bytes) => {
+  if (bytes >= 1024 * 1024) return `${(bytes / 1024 / 1024).toFixed(1)} MB`;
+  if (bytes >= 1024) return `${(bytes / 1024).toFixed(1)} KB`;
+  return `${bytes} B`;
+};
+
+const DatabaseStats = ({ apiBaseUrl, stats, onRefresh, onClear, isLoading }) => {
+  const [documents, setDocuments] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [sort, setSort] = useState('name');
+  const [isLoadingDocuments, setIsLoadingDocuments] = useState(false);
+
+  // One page of /documents at a time; a cursor continues the current listing
+  const fetchDocuments = useCallback(async (cursor = null) => {
+    setIsLoadingDocuments(true);
+    try {
+      const response = await axios.get(`${apiBaseUrl}/documents`, {
+        params: {
+          sort,
+          order: sort === 'name' ? 'asc' : 'desc',
+          limit: PAGE_SIZE,
+          ...(cursor ? { cursor } : {}),
+        },
+      });
+      setDocuments((previous) => (cursor ? [...previous, ...response.data.documents] : response.data.documents));
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error('Error fetching documents:', error);
+    } finally {
+      setIsLoadingDocuments(false);
+    }
+  }, [apiBaseUrl, sort]);
+
+  // Start over whenever the stats are refreshed or the sort changes
+  useEffect(() => {
+    if (stats) {
+      fetchDocuments();
+    }
+  }, [stats, fetchDocuments]);
+
   if (!stats) {
     return (
       <div className="stats-container">
@@ -80,21 +122,39 @@ const DatabaseStats = ({ stats, onRefresh, onClear, isLoading }) => {
         </div>
       </div>
 
-      {stats.sources && stats.sources.length > 0 && (
+      {documents.length > 0 && (
         <div className="sources-section">
-          <h3>Uploaded Documents</h3>
+          <div className="sources-header">
+            <h3>Uploaded Documents</h3>
+            <select
+              className="sources-sort"
+              value={sort}
+              onChange={(e) => setSort(e.target.value)}
+            >
+              <option value="name">Name</option>
+              <option value="size">Largest first</option>
+              <option value="ingested_at">Newest first</option>
+            </select>
+          </div>
           <div className="sources-list">
-            {stats.sources.map((source, index) => (
-              <div key={index} className="source-item">
+            {documents.map((doc) => (
+              <div key={doc.source} className="source-item">
                 <FileText className="source-icon" />
-                <span className="source-name">{source}</span>
-                <span className="source-type">
-                  {source.toLowerCase().endsWith('.pdf') ? 'PDF' :
-                   source.toLowerCase().endsWith('.csv') ? 'CSV' : 'Unknown'}
-                </span>
+                <span className="source-name">{doc.source}</span>
+                <span className="source-size">{formatSize(doc.size)}</span>
+                <span className="source-type">{doc.type.toUpperCase()}</span>
               </div>
             ))}
           </div>
+          {nextCursor && (
+            <button
+              className="load-more-button"
+              onClick={() => fetchDocuments(nextCursor)}
+              disabled={isLoadingDocuments}
+            >
+              {isLoadingDocuments ? 'Loading...' : `Load more (${documents.length} of ${stats.total_documents})`}
+            </button>
+          )}
         </div>
       )}
 
@@ -76,12 +76,18 @@ const FileUpload = ({ apiBaseUrl, onUploadSuccess }) => {
     }
   };
 
+  const uploadResultMessage = (result) => {
+    const failedCount = result.failed ? result.failed.length : 0;
+    const processed = `Successfully processed ${result.files.length} files (${result.total_chunks} chunks)`;
+    return failedCount ? `${processed}, ${failedCount} failed` : processed;
+  };
+
   const getStatusMessage = () => {
     switch (uploadStatus) {
       case 'uploading':
         return 'Processing files...';
       case 'success':
-        return uploadResult ? `Successfully processed ${uploadResult.files.length} files (${uploadResult.total_chunks} chunks)` : 'Upload successful!';
+        return uploadResult ? uploadResultMessage(uploadResult) : 'Upload successful!';
       case 'error':
         return error || 'Upload failed';
       default:
@@ -141,6 +147,13 @@ const FileUpload = ({ apiBaseUrl, onUploadSuccess }) => {
                 <span className="chunk-count">{file.chunks} chunks</span>
               </div>
             ))}
+            {(uploadResult.failed || []).map((file, index) => (
+              <div key={`failed-${index}`} className="result-item failed">
+                <AlertCircle size={16} />
+                <span>{file.filename}</span>
+                <span className="chunk-count">{file.error}</span>
+              </div>
+            ))}
           </div>
         )}
       </div>